@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from build_docs import sphinx_command, SOURCE_DIR
+
+
+# Lines of the sphinx-build output that explain why a phase did not run in parallel
+FALLBACK_MARKERS = ("parallel build:", "assuming it isn't", "not safe for parallel")
+
+
+# -------------------- Build Benchmark --------------------
+def time_build(builder: str, jobs: int, lang: str = None, sphinx_opts: List[str] = None) -> Dict:
+    """One clean build (fresh doctrees and output) with `jobs` processes; wall time and fallback notes"""
+    work_dir = tempfile.mkdtemp(prefix="build_bench_")
+    try:
+        command = sphinx_command(builder, os.path.join(work_dir, "out"), os.path.join(work_dir, "doctrees"), lang,
+                                 sphinx_opts, jobs)
+        start = time.perf_counter()
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=SOURCE_DIR)
+        elapsed = time.perf_counter() - start
+        output = process.stdout.decode("utf-8", errors="replace")
+        return {
+            "builder": builder,
+            "jobs": jobs,
+            "secs": elapsed,
+            "returncode": process.returncode,
+            "fallbacks": sorted({line.strip() for line in output.splitlines()
+                                 if any(marker in line for marker in FALLBACK_MARKERS)}),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_build_benchmark(builders: List[str], job_counts: List[int], lang: str = None, sphinx_opts: List[str] = None,
+                        repeat: int = 1) -> List[Dict]:
+    """Best-of-`repeat` clean build time of every builder for every job count, with speed-up over serial"""
+    results = []
+    for builder in builders:
+        serial_secs = None
+        for jobs in job_counts:
+            runs = [time_build(builder, jobs, lang, sphinx_opts) for _ in range(max(1, repeat))]
+            best = min(runs, key=lambda run: run["secs"])
+            if jobs == 1:
+                serial_secs = best["secs"]
+            best["speedup"] = serial_secs / best["secs"] if serial_secs and best["secs"] else None
+            best["efficiency"] = best["speedup"] / jobs if best["speedup"] else None
+            results.append(best)
+    return results
+
+
+# -------------------- Command Line Interface & Main Function --------------------
+def parse_args():
+    """Parse command line arguments"""
+    cpus = multiprocessing.cpu_count()
+    parser = argparse.ArgumentParser(description="Compare serial and parallel (-j N) clean Sphinx builds of the docs.")
+    parser.add_argument('--formats', default='html,latex', help="Comma-separated builders to time (default: html,latex)")
+    parser.add_argument('--jobs', default=",".join(str(jobs) for jobs in sorted({1, 2, cpus})),
+                        help=f"Comma-separated -j values; 1 is always included as the baseline "
+                             f"(default: 1,2,{cpus} = CPU count)")
+    parser.add_argument('--lang', help="Language to build (default: the sources' language)")
+    parser.add_argument('--repeat', type=int, default=1, help="Builds per configuration, the fastest counts (default: 1)")
+    parser.add_argument('--sphinx-opts', default='', help="Extra options passed to every sphinx-build call")
+    parser.add_argument('--json-out', help="Also write all results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    builders = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    job_counts = sorted({1} | {int(jobs) for jobs in args.jobs.split(',') if jobs.strip()})
+
+    print(f"Clean builds of {SOURCE_DIR} on {multiprocessing.cpu_count()} CPUs (best of {max(1, args.repeat)}):")
+    results = run_build_benchmark(builders, job_counts, args.lang, args.sphinx_opts.split(), args.repeat)
+    print(f"  {'builder':<10} {'jobs':>5} {'secs':>8} {'speed-up':>9} {'efficiency':>11}  status")
+    for result in results:
+        status = "ok" if result["returncode"] == 0 else f"exit code {result['returncode']}"
+        print(f"  {result['builder']:<10} {result['jobs']:>5} {result['secs']:>8.2f} {result['speedup']:>8.2f}x "
+              f"{result['efficiency']:>10.0%}  {status}")
+        for line in result["fallbacks"]:
+            print(f"      {line}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json_out}")
+
+
+if __name__ == '__main__':
+    main()
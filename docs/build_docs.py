@@ -0,0 +1,491 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Tuple
+
+
+# -------------------- Paths (mirror conf.py) --------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(SCRIPT_DIR, "source")
+BUILDDIR = os.path.join(SOURCE_DIR, "build")
+DOCTREE_ROOT = os.path.join(BUILDDIR, "doctrees")
+LOG_DIR = os.path.join(BUILDDIR, "logs")
+POT_DIR = os.path.join(BUILDDIR, "gettext")
+LOCALE_DIR = os.path.join(SOURCE_DIR, "locale")
+VALIDATE_ROOT = os.path.join(BUILDDIR, "validate")
+SOURCE_SUFFIXES = (".rst", ".md")
+
+# Builders whose output does not depend on the target language
+LANGUAGE_NEUTRAL_FORMATS = ("gettext",)
+# Preferred builder to read the sources of a language (first one present is used)
+PRIMARY_FORMATS = ("html", "dirhtml", "singlehtml", "latex", "epub")
+# Failures of a parallel sphinx-build that a serial run avoids (extension state that cannot cross processes)
+_PARALLEL_FAILURE_RE = re.compile(r"SphinxParallelError|PicklingError|[Cc]an(?:'|no)t pickle|parallel (?:read|write) failed")
+
+
+# -------------------- Build Targets --------------------
+class BuildTarget:
+    """One command of the build graph; it starts once all targets in `deps` have succeeded"""
+
+    def __init__(self, name: str, command: List[str], deps: Tuple[str, ...] = (), doctree_snapshot: Tuple[str, str] = None):
+        self.name = name
+        self.command = command
+        self.deps = deps
+        # (shared doctree dir, private copy) refreshed right before the command runs
+        self.doctree_snapshot = doctree_snapshot
+        self.elapsed = 0.0
+        self.returncode = None
+
+
+def output_dir(fmt: str, lang: str = None) -> str:
+    """Same layout as build_languange_version.sh: build/<format>/<lang> (build/gettext for templates)"""
+    if fmt in LANGUAGE_NEUTRAL_FORMATS:
+        return os.path.join(BUILDDIR, fmt)
+    return os.path.join(BUILDDIR, fmt, lang)
+
+
+def sphinx_command(builder: str, out_dir: str, doctree_dir: str, lang: str = None,
+                   sphinx_opts: List[str] = None, jobs: int = None) -> List[str]:
+    command = ["sphinx-build", "-b", builder, "-d", doctree_dir]
+    if lang:
+        command += ["-D", f"language={lang}"]
+    if jobs and jobs > 1:
+        command += ["-j", str(jobs)]
+    return command + list(sphinx_opts or []) + [SOURCE_DIR, out_dir]
+
+
+def serial_command(command: List[str]) -> List[str]:
+    """The same sphinx-build command without -j"""
+    if "-j" not in command:
+        return command
+    position = command.index("-j")
+    return command[:position] + command[position + 2:]
+
+
+def resolve_jobs(jobs: str, max_workers: int, langs: List[str], formats: List[str]) -> int:
+    """
+    Processes per sphinx-build: an integer as given, or for "auto" the CPUs left to each of the
+    builds that run at the same time (one per language, plus gettext) so they do not oversubscribe.
+    """
+    if jobs != "auto":
+        return max(1, int(jobs))
+    concurrent = len([lang for lang in langs if any(fmt not in LANGUAGE_NEUTRAL_FORMATS for fmt in formats)])
+    concurrent += len([fmt for fmt in formats if fmt in LANGUAGE_NEUTRAL_FORMATS])
+    return max(1, multiprocessing.cpu_count() // max(1, min(max_workers, concurrent)))
+
+
+def plan_targets(langs: List[str], formats: List[str], sphinx_opts: List[str] = None,
+                 jobs: int = None) -> List[BuildTarget]:
+    """
+    Build graph for every (language, format) pair.
+    Each language parses its sources once: the primary builder (HTML if requested) reads into the
+    shared doctree cache build/doctrees/<lang>; the other builders of that language start from a
+    snapshot of that cache, so they only write. Languages and gettext run concurrently.
+    Incremental rebuilds come from Sphinx itself: the doctree cache and outputs persist between
+    runs, and every document depends on its sources and on its compiled .mo catalog.
+    With jobs > 1 every sphinx-build also reads (and where the builder allows, writes) with that
+    many processes (-j); a build that fails for parallel-only reasons is retried serially.
+    """
+    targets = []
+    builders = [fmt if fmt != "pdf" else "latex" for fmt in formats]
+    builders = list(dict.fromkeys(builders))  # dedupe, keep order
+
+    for fmt in builders:
+        if fmt in LANGUAGE_NEUTRAL_FORMATS:
+            targets.append(BuildTarget(fmt, sphinx_command(fmt, output_dir(fmt), os.path.join(DOCTREE_ROOT, fmt),
+                                                           sphinx_opts=sphinx_opts, jobs=jobs)))
+
+    for lang in langs:
+        lang_builders = [fmt for fmt in builders if fmt not in LANGUAGE_NEUTRAL_FORMATS]
+        if not lang_builders:
+            continue
+        shared_doctrees = os.path.join(DOCTREE_ROOT, lang)
+        primary = next((fmt for fmt in PRIMARY_FORMATS if fmt in lang_builders), lang_builders[0])
+
+        primary_name = f"{primary}-{lang}"
+        targets.append(BuildTarget(primary_name, sphinx_command(primary, output_dir(primary, lang), shared_doctrees,
+                                                                lang, sphinx_opts, jobs)))
+        for fmt in lang_builders:
+            if fmt == primary:
+                continue
+            private_doctrees = f"{shared_doctrees}.{fmt}"
+            targets.append(BuildTarget(f"{fmt}-{lang}",
+                                       sphinx_command(fmt, output_dir(fmt, lang), private_doctrees, lang, sphinx_opts,
+                                                      jobs),
+                                       deps=(primary_name,), doctree_snapshot=(shared_doctrees, private_doctrees)))
+
+        if "pdf" in formats:
+            targets.append(BuildTarget(f"pdf-{lang}", ["make", "-C", output_dir("latex", lang), "all-pdf"],
+                                       deps=(f"latex-{lang}",)))
+    return targets
+
+
+# -------------------- Parallel Execution --------------------
+def run_target(target: BuildTarget, verbose: bool = False) -> BuildTarget:
+    """Run a target's command, logging its output to build/logs/<name>.log"""
+    start = time.perf_counter()
+    if target.doctree_snapshot:
+        shared_doctrees, private_doctrees = target.doctree_snapshot
+        # A private copy keeps concurrent builders from rewriting the shared environment pickle
+        if os.path.exists(private_doctrees):
+            shutil.rmtree(private_doctrees)
+        if os.path.exists(shared_doctrees):
+            shutil.copytree(shared_doctrees, private_doctrees)
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{target.name}.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        log.write(" ".join(target.command) + "\n\n")
+        log.flush()
+        target.returncode = _run_logged(target.command, log, verbose)
+
+    if target.returncode not in (0, 127) and serial_command(target.command) != target.command:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as log:
+            parallel_failure = _PARALLEL_FAILURE_RE.search(log.read())
+        if parallel_failure:
+            # Fallback for extensions that claim parallel safety but break across processes
+            print(f"  {target.name}: parallel build failed ({parallel_failure.group(0)}), retrying serially")
+            target.command = serial_command(target.command)
+            with open(log_path, "a", encoding="utf-8") as log:
+                log.write("\n\nRetrying serially: " + " ".join(target.command) + "\n\n")
+                log.flush()
+                target.returncode = _run_logged(target.command, log, verbose)
+    target.elapsed = time.perf_counter() - start
+    return target
+
+
+def _run_logged(command: List[str], log, verbose: bool = False) -> int:
+    try:
+        process = subprocess.run(command, stdout=None if verbose else log, stderr=subprocess.STDOUT, cwd=SOURCE_DIR)
+        return process.returncode
+    except OSError as e:
+        log.write(f"Failed to start: {str(e)}\n")
+        return 127
+
+
+def run_targets(targets: List[BuildTarget], max_workers: int, verbose: bool = False) -> bool:
+    """Run the build graph with up to max_workers concurrent commands; returns True if all succeeded"""
+    by_name = {target.name: target for target in targets}
+    waiting = list(targets)
+    done, failed = set(), set()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while waiting or running:
+            for target in list(waiting):
+                if any(dep in failed for dep in target.deps):
+                    print(f"  Skipped {target.name}: dependency failed")
+                    failed.add(target.name)
+                    waiting.remove(target)
+                elif all(dep in done for dep in target.deps):
+                    print(f"  Started {target.name}: {' '.join(target.command)}")
+                    running[executor.submit(run_target, target, verbose)] = target.name
+                    waiting.remove(target)
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                target = by_name[running.pop(future)]
+                future.result()
+                if target.returncode == 0:
+                    done.add(target.name)
+                    print(f"  Finished {target.name} in {target.elapsed:.1f}s")
+                else:
+                    failed.add(target.name)
+                    print(f"  Error: {target.name} failed with exit code {target.returncode} "
+                          f"(see {os.path.join(LOG_DIR, target.name + '.log')})")
+    return not failed
+
+
+# -------------------- Targeted Translation Validation --------------------
+# Builder of the validation builds: the same one that maintains the cached environment it reuses
+VALIDATE_BUILDER = "html"
+_WARNING_RE = re.compile(r"^(?P<location>.*?): (?P<kind>WARNING|ERROR|SEVERE|CRITICAL): (?P<message>.*)$")
+
+
+def _translations(po_file) -> Dict[Tuple[str, str], Tuple]:
+    """(msgctxt, msgid) -> translated value of every entry Sphinx would use"""
+    return {
+        (entry.msgctxt, entry.msgid): (entry.msgstr, tuple(sorted(entry.msgstr_plural.items())))
+        for entry in po_file if not entry.obsolete and entry.translated()
+    }
+
+
+def changed_translations(lang: str, since: str = "HEAD") -> List[Tuple[str, "polib.POEntry"]]:
+    """(po_path, entry) of every translation of lang that differs from git revision `since` (all of new catalogs)"""
+    import polib
+
+    changes = []
+    catalog_root = os.path.join(LOCALE_DIR, lang, "LC_MESSAGES")
+    for root, _, files in os.walk(catalog_root):
+        for file in sorted(files):
+            if not file.endswith(".po"):
+                continue
+            po_path = os.path.join(root, file)
+            relative = os.path.relpath(po_path, SOURCE_DIR).replace(os.sep, "/")
+            process = subprocess.run(["git", "show", f"{since}:./{relative}"], cwd=SOURCE_DIR,
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            previous = _translations(polib.pofile(process.stdout.decode("utf-8"))) if process.returncode == 0 else {}
+            po_file = polib.pofile(po_path)
+            for key, value in _translations(po_file).items():
+                if previous.get(key) != value:
+                    changes.append((po_path, po_file.find(key[1], msgctxt=key[0])))
+    return changes
+
+
+def _source_file(path: str) -> str:
+    """Existing source file for a docname-like path (with or without suffix), or None"""
+    # Normalized first: the gettext directory in the relative paths may not exist (yet)
+    path = os.path.normpath(path)
+    for candidate in (path,) + tuple(path + suffix for suffix in SOURCE_SUFFIXES):
+        if candidate.endswith(SOURCE_SUFFIXES) and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def entry_locations(entry, po_path: str, lang: str) -> List[Tuple[str, int]]:
+    """(source file, line) pairs of an entry's occurrences (relative to the gettext output, as Sphinx writes them)"""
+    catalog_dir = os.path.dirname(os.path.relpath(po_path, os.path.join(LOCALE_DIR, lang, "LC_MESSAGES")))
+    locations = []
+    for path, line in entry.occurrences:
+        for base in (POT_DIR, os.path.join(POT_DIR, catalog_dir)):
+            source = _source_file(os.path.join(base, path))
+            if source:
+                locations.append((source, int(line) if str(line).isdigit() else None))
+                break
+    return locations
+
+
+def catalog_documents(po_path: str, lang: str, locations: List[Tuple[str, int]]) -> List[str]:
+    """
+    Source files of the documents that use a catalog: its own document with gettext_compact = False,
+    otherwise the documents its messages were extracted from.
+    """
+    docname = os.path.splitext(os.path.relpath(po_path, os.path.join(LOCALE_DIR, lang, "LC_MESSAGES")))[0]
+    source = _source_file(os.path.join(SOURCE_DIR, docname))
+    if source:
+        return [source]
+    return sorted({path for path, _ in locations})
+
+
+def parse_warnings(log_text: str) -> List[Dict]:
+    """Sphinx warnings as {path, line, translated, kind, message} (continuation lines are dropped)"""
+    warnings = []
+    for line in log_text.splitlines():
+        match = _WARNING_RE.match(line.strip())
+        if not match:
+            continue
+        parts = match.group("location").split(":")
+        numbers = [int(part) for part in parts[1:] if part.isdigit()]
+        warnings.append({
+            "path": os.path.normpath(parts[0]) if parts[0] else None,
+            "line": numbers[0] if numbers else None,
+            # Sphinx marks problems inside a translated message as <path>:<line>:<translated>:<n>
+            "translated": "<translated>" in parts,
+            "kind": match.group("kind"),
+            "message": match.group("message"),
+        })
+    return warnings
+
+
+def blame_entry(warning: Dict, located: List[Tuple[str, int, Dict]]) -> Dict:
+    """
+    Changed entry a warning belongs to: the one at the warning's line, or for warnings Sphinx marks as
+    raised inside a translated message, the closest entry above it in the same file.
+    """
+    candidates = [(line, change) for path, line, change in located if path == warning["path"] and line is not None]
+    if not candidates or warning["line"] is None:
+        return None
+    exact = [change for line, change in candidates if line == warning["line"]]
+    if exact or not warning["translated"]:
+        return exact[0] if exact else None
+    above = [(line, change) for line, change in candidates if line <= warning["line"]]
+    return max(above, key=lambda item: item[0])[1] if above else None
+
+
+def plan_validation(langs: List[str], since: str = "HEAD", sphinx_opts: List[str] = None,
+                    jobs: int = None) -> List[Tuple[BuildTarget, Dict]]:
+    """
+    One warnings-as-errors build per language of just the documents whose translations changed,
+    writing to build/validate/<lang> from a copy of that language's cached environment.
+    Returns (target, plan) pairs; plan holds the changed entries and their locations for the report.
+    """
+    planned = []
+    for lang in langs:
+        if lang.lower() == "en":
+            continue
+        changes, located, documents = [], [], set()
+        for po_path, entry in changed_translations(lang, since):
+            locations = entry_locations(entry, po_path, lang)
+            change = {"catalog": os.path.relpath(po_path, SOURCE_DIR), "msgctxt": entry.msgctxt,
+                      "msgid": entry.msgid, "msgstr": entry.msgstr, "occurrences": entry.occurrences, "warnings": []}
+            changes.append(change)
+            located.extend((path, line, change) for path, line in locations)
+            documents.update(catalog_documents(po_path, lang, locations))
+        print(f"  {lang}: {len(changes)} changed translations in {len(documents)} documents (since {since})")
+        if not documents:
+            continue
+
+        scratch = os.path.join(VALIDATE_ROOT, lang)
+        shutil.rmtree(os.path.join(scratch, VALIDATE_BUILDER), ignore_errors=True)
+        os.makedirs(scratch, exist_ok=True)
+        warnings_path = os.path.join(scratch, "warnings.log")
+        if os.path.exists(warnings_path):
+            os.remove(warnings_path)
+        shared_doctrees = os.path.join(DOCTREE_ROOT, lang)
+        if not os.path.exists(shared_doctrees):
+            print(f"  Warning: no cached environment for {lang} in {shared_doctrees}, every document will be read")
+        opts = list(sphinx_opts or []) + ["-W", "--keep-going", "-w", warnings_path]
+        command = sphinx_command(VALIDATE_BUILDER, os.path.join(scratch, VALIDATE_BUILDER),
+                                 os.path.join(scratch, "doctrees"), lang, opts, jobs) + sorted(documents)
+        target = BuildTarget(f"validate-{lang}", command,
+                             doctree_snapshot=(shared_doctrees, os.path.join(scratch, "doctrees")))
+        planned.append((target, {"lang": lang, "changes": changes, "located": located, "documents": sorted(documents),
+                                 "warnings_path": warnings_path}))
+    return planned
+
+
+def report_validation(target: BuildTarget, plan: Dict, strict: bool = False) -> bool:
+    """
+    Attribute the build's warnings to changed entries, print them and write build/validate/<lang>/report.json.
+    Warnings of unchanged text (usually already in the full build) only fail the validation when strict.
+    """
+    log_text = ""
+    if os.path.exists(plan["warnings_path"]):
+        with open(plan["warnings_path"], "r", encoding="utf-8", errors="replace") as f:
+            log_text = f.read()
+    unattributed = []
+    for warning in parse_warnings(log_text):
+        change = blame_entry(warning, plan["located"])
+        if change is not None:
+            change["warnings"].append(warning)
+        else:
+            unattributed.append(warning)
+
+    failed = [change for change in plan["changes"] if change["warnings"]]
+    # Without any warning, a non-zero exit code means sphinx-build itself failed
+    crashed = target.returncode != 0 and not failed and not unattributed
+    ok = not failed and not crashed and not (strict and unattributed)
+    print(f"\nValidation of {plan['lang']}: {len(plan['changes'])} changed translations, "
+          f"{len(plan['documents'])} documents rebuilt in {target.elapsed:.1f}s, {len(failed)} entries with warnings")
+    for change in failed:
+        print(f"  {change['catalog']}: {json.dumps(change['msgid'][:80], ensure_ascii=False)}")
+        for warning in change["warnings"]:
+            location = os.path.relpath(warning["path"], SOURCE_DIR) if warning["path"] else "?"
+            print(f"    {location}:{warning['line'] or '?'}: {warning['kind']}: {warning['message']}")
+    if unattributed:
+        print(f"  {len(unattributed)} other warnings not caused by a changed translation"
+              + (":" if strict else " (listed in the report, fatal with --validate-strict)"))
+    for warning in unattributed if strict else []:
+        location = os.path.relpath(warning["path"], SOURCE_DIR) if warning["path"] else "?"
+        print(f"    {location}:{warning['line'] or '?'}: {warning['kind']}: {warning['message']}")
+    if crashed:
+        print(f"  Error: sphinx-build failed with exit code {target.returncode} "
+              f"(see {os.path.join(LOG_DIR, target.name + '.log')})")
+
+    report_path = os.path.join(os.path.dirname(plan["warnings_path"]), "report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"lang": plan["lang"], "ok": ok, "returncode": target.returncode, "documents": plan["documents"],
+                   "failed_entries": failed, "other_warnings": unattributed}, f, ensure_ascii=False, indent=2)
+    print(f"  Report written to {report_path}")
+    return ok
+
+
+def validate_translations(langs: List[str], since: str = "HEAD", sphinx_opts: List[str] = None,
+                          max_workers: int = None, verbose: bool = False, jobs: int = None,
+                          strict: bool = False) -> bool:
+    """
+    Rebuild only the documents with changed translations, warnings as errors; True if no changed
+    translation raised a warning (with strict, if the rebuilt documents raised none at all)
+    """
+    print(f"Validating translations changed since {since}")
+    planned = plan_validation(langs, since, sphinx_opts, jobs)
+    if not planned:
+        print("Nothing to validate")
+        return True
+    start = time.perf_counter()
+    run_targets([target for target, _ in planned], max_workers or len(planned), verbose)
+    results = [report_validation(target, plan, strict) for target, plan in planned]
+    print(f"\nValidation finished in {time.perf_counter() - start:.1f}s")
+    return all(results)
+
+
+def print_build_report(targets: List[BuildTarget], wall_secs: float):
+    serial_secs = sum(target.elapsed for target in targets)
+    print("\nBuild summary:")
+    for target in targets:
+        status = "ok" if target.returncode == 0 else ("skipped" if target.returncode is None else "failed")
+        print(f"  {target.name:<20} {target.elapsed:8.1f}s  {status}")
+    print(f"  Wall time {wall_secs:.1f}s vs {serial_secs:.1f}s of serial build time "
+          f"({serial_secs / wall_secs if wall_secs else 0:.1f}x)")
+
+
+# -------------------- Command Line Interface & Main Function --------------------
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Build all languages and output formats of the docs in parallel.")
+    parser.add_argument('--langs', default='en,zh_CN',
+                        help="Comma-separated languages to build (default: en,zh_CN)")
+    parser.add_argument('--formats', default='html',
+                        help="Comma-separated formats: any Sphinx builder (html, dirhtml, latex, epub, gettext, ...) "
+                             "or pdf (latex + latexmk) (default: html)")
+    parser.add_argument('--max-workers', type=int, default=multiprocessing.cpu_count(),
+                        help=f"Concurrent sphinx-build processes (default: CPU count, {multiprocessing.cpu_count()})")
+    parser.add_argument('--jobs', default='1',
+                        help="Processes per sphinx-build (-j): a number, or 'auto' to share the CPUs among the "
+                             "builds running at the same time (default: 1, serial)")
+    parser.add_argument('--sphinx-opts', default='',
+                        help="Extra options passed to every sphinx-build call (e.g. \"-q -W\")")
+    parser.add_argument('--clean', action='store_true',
+                        help="Remove cached doctrees and outputs of the selected targets first (full rebuild)")
+    parser.add_argument('--verbose', action='store_true',
+                        help="Stream sphinx-build output to the console instead of build/logs")
+    parser.add_argument('--validate-translations', action='store_true',
+                        help="Instead of building, rebuild only the documents whose translations changed (warnings "
+                             "as errors, into build/validate/<lang>) and report the warnings per PO entry")
+    parser.add_argument('--validate-strict', action='store_true',
+                        help="Also fail validation on warnings not caused by a changed translation")
+    parser.add_argument('--since', default='HEAD',
+                        help="Git revision the changed translations are compared against (default: HEAD)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    langs = [lang.strip() for lang in args.langs.split(',') if lang.strip()]
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    if not formats:
+        raise ValueError("No formats given. Check --formats argument.")
+
+    jobs = resolve_jobs(args.jobs, args.max_workers, langs, formats)
+    if args.validate_translations:
+        ok = validate_translations(langs, args.since, args.sphinx_opts.split(), args.max_workers, args.verbose, jobs,
+                                   args.validate_strict)
+        sys.exit(0 if ok else 1)
+
+    targets = plan_targets(langs, formats, args.sphinx_opts.split(), jobs)
+    if args.clean:
+        for target in targets:
+            if target.command[0] == "sphinx-build":
+                # Output directory and doctree cache of the target
+                shutil.rmtree(target.command[-1], ignore_errors=True)
+                shutil.rmtree(target.command[target.command.index("-d") + 1], ignore_errors=True)
+
+    print(f"Building {len(targets)} targets with up to {args.max_workers} parallel workers"
+          + (f", {jobs} processes each" if jobs > 1 else ""))
+    start = time.perf_counter()
+    ok = run_targets(targets, args.max_workers, args.verbose)
+    print_build_report(targets, time.perf_counter() - start)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@
 #   - Translation templates: source/build/gettext
 #   - English documentation: source/build/html/en
 #   - Chinese documentation: source/build/html/zh_CN
+# Requires: DEEPSEEK_API_KEY in the environment for the auto-translation step
 
 # ========================== 1. Core Path Configuration ===========================
 date "+%Y-%m-%d %H:%M:%S"
@@ -14,6 +15,8 @@ POT_DIR="$BUILDDIR/gettext"      # Directory for translation templates
 HTML_ROOT="$BUILDDIR/html"       # Root directory for HTML output
 LOCALE_DIR="$SOURCE_DIR/locale"  # Directory for translation files (.po)
 TRANSLATOR_SCRIPT="$SOURCE_DIR/translator.py"  # Path to the translation script
+BUILD_SCRIPT="$SCRIPT_DIR/build_docs.py"        # Parallel multi-language Sphinx build orchestrator
+TM_PATH="$BUILDDIR/translation_memory.sqlite"   # Translation memory reused across runs
 LANGUAGES=("en" "zh_CN")         # List of supported languages
 
 # ========================== 2. Utility Functions ===========================
@@ -31,13 +34,9 @@ check_path() {
     fi
 }
 
-clean_old_doc() {
-    local lang=$1
-    local doc_path="${HTML_ROOT}/${lang}"
-    if [ -d "$doc_path" ]; then
-        echo " Cleaning old ${lang} documentation: ${doc_path}"
-        rm -rf "$doc_path"
-    fi
+join_by_comma() {
+    local IFS=","
+    echo "$*"
 }
 
 # ========================== 3. Pre-checks (Optimized I/O) ===========================
@@ -46,7 +45,7 @@ check_command "sphinx-build"
 check_command "sphinx-intl"
 check_command "python3"
 
-REQUIRED_PATHS=("$SOURCE_DIR" "$SOURCE_DIR/conf.py" "$TRANSLATOR_SCRIPT")
+REQUIRED_PATHS=("$SOURCE_DIR" "$SOURCE_DIR/conf.py" "$TRANSLATOR_SCRIPT" "$BUILD_SCRIPT")
 for path in "${REQUIRED_PATHS[@]}"; do
     check_path "$path"
 done
@@ -64,20 +63,16 @@ if [ $? -ne 0 ]; then
 fi
 echo " Translation templates extracted successfully: ${POT_DIR}"
 
-# ========================== 5. Generate Translations and HTML ===========================
-echo -e "\n Starting translation and HTML generation (output to ${HTML_ROOT})..."
+# ========================== 5. Generate Translations ===========================
+echo -e "\n Starting translation (output to ${LOCALE_DIR})..."
 for lang in "${LANGUAGES[@]}"; do
     lang_name=$( [ "$lang" = "en" ] && echo "English" || echo "Chinese" )
-    current_doc_path="${HTML_ROOT}/${lang}"
 
     echo -e "\n====================================================================="
-    echo " Processing [${lang_name}] documentation (Final path: ${current_doc_path})"
+    echo " Processing [${lang_name}] translations"
     echo "====================================================================="
 
-    echo -e "\n1/4  Cleaning old documentation files"
-    clean_old_doc "$lang"
-
-    echo -e "\n2/4  Updating ${lang_name} translation files"
+    echo -e "\n1/2  Updating ${lang_name} translation files"
     sphinx-intl update -p "$POT_DIR" -l "$lang" -d "$LOCALE_DIR"
     if [ $? -ne 0 ]; then
         echo " Error: Failed to update ${lang_name} translation files!"
@@ -85,22 +80,28 @@ for lang in "${LANGUAGES[@]}"; do
     fi
     echo " ${lang_name} translation files updated: ${LOCALE_DIR}/${lang}/LC_MESSAGES/"
 
-    echo -e "\n3/4  Auto-translating ${lang_name} content"
+    echo -e "\n2/2  Auto-translating ${lang_name} content"
     if [ "$READTHEDOCS" = "True" ]; then
         python3 "$TRANSLATOR_SCRIPT" \
             --locale-dir "$LOCALE_DIR" \
             --target-langs "$lang" \
-            --batch-size 10 \
-            --max-chars 12000 \
-            --sleep 0.3 \
+            --batch-size 40 \
+            --max-input-tokens 16000 \
+            --journal \
+            --tm-path "$TM_PATH" \
+            --delta \
+            --delta-pot-dir "$POT_DIR" \
             --no-backup
     else
         python3 "$TRANSLATOR_SCRIPT" \
             --locale-dir "$LOCALE_DIR" \
             --target-langs "$lang" \
-            --batch-size 10 \
-            --max-chars 8000 \
-            --sleep 1.0
+            --batch-size 40 \
+            --max-input-tokens 16000 \
+            --journal \
+            --tm-path "$TM_PATH" \
+            --delta \
+            --delta-pot-dir "$POT_DIR"
     fi
 
     if [ $? -ne 0 ]; then
@@ -108,24 +109,40 @@ for lang in "${LANGUAGES[@]}"; do
         exit 1
     fi
     echo " ${lang_name} auto-translation completed successfully!"
+done
 
-    echo -e "\n4/4  Building ${lang_name} HTML documentation"
-    # Core modification: Restore HTML build command, with RTD environment check to avoid duplicate builds
-    if [ "$READTHEDOCS" != "True" ]; then
-        # Local environment: Run sphinx-build to generate HTML
-        sphinx-build -b html -D language="$lang" "$SOURCE_DIR" "$current_doc_path"
-        if [ $? -ne 0 ]; then
-            echo " Error: Failed to build ${lang_name} HTML documentation!"
-            exit 1
-        fi
-        echo " ${lang_name} HTML documentation built: ${current_doc_path}/index.html"
-    else
-        # RTD environment: Skip build (handled automatically by the platform)
-        echo " Skipping HTML build (will be handled by Read the Docs)"
+# ========================== 5b. Validate Changed Translations ===========================
+# Set VALIDATE_TRANSLATIONS=1 (e.g. on translation PRs) to rebuild just the documents whose
+# translations changed, with warnings as errors, before the full build
+if [ "$VALIDATE_TRANSLATIONS" = "1" ]; then
+    echo -e "\n Validating changed translations..."
+    python3 "$BUILD_SCRIPT" --langs "$(join_by_comma "${LANGUAGES[@]}")" --validate-translations
+    if [ $? -ne 0 ]; then
+        echo " Error: Changed translations break the build! Report: ${BUILDDIR}/validate/<lang>/report.json"
+        exit 1
     fi
-done
+fi
+
+# ========================== 6. Build HTML Documentation ===========================
+# All languages build concurrently; doctrees and outputs are kept, so only documents whose
+# sources or compiled translations changed are rebuilt (set CLEAN_BUILD=1 for a full rebuild)
+echo -e "\n Building HTML documentation for all languages (output to ${HTML_ROOT})..."
+if [ "$READTHEDOCS" != "True" ]; then
+    BUILD_ARGS=(--langs "$(join_by_comma "${LANGUAGES[@]}")" --formats html --jobs auto)
+    if [ "$CLEAN_BUILD" = "1" ]; then
+        BUILD_ARGS+=(--clean)
+    fi
+    python3 "$BUILD_SCRIPT" "${BUILD_ARGS[@]}"
+    if [ $? -ne 0 ]; then
+        echo " Error: Failed to build HTML documentation! Logs: ${BUILDDIR}/logs"
+        exit 1
+    fi
+else
+    # RTD environment: Skip build (handled automatically by the platform)
+    echo " Skipping HTML build (will be handled by Read the Docs)"
+fi
 
-# ========================== 6. Completion Notification ===========================
+# ========================== 7. Completion Notification ===========================
 echo -e "\n"
 echo "====================================================================="
 echo " All documentation generated successfully!"
@@ -0,0 +1,45 @@
+"""
+Local Sphinx extension with the project-specific setup of the ArkAngel documentation.
+
+It keeps no state in the build environment, so it is declared safe for parallel reading and
+writing (sphinx-build -j). The other extensions declare their own safety; Sphinx falls back to
+serial reading or writing for those that do not, and this extension reports which phase does and why.
+"""
+from typing import Dict, List
+
+from sphinx.util import logging
+
+__version__ = "1.0"
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_PHASES = ("read", "write")
+
+
+def parallel_unsafe_extensions(app, phase: str) -> List[str]:
+    """Loaded extensions that do not declare parallel_<phase>_safe = True"""
+    return sorted(name for name, extension in app.extensions.items()
+                  if not getattr(extension, f"parallel_{phase}_safe", None))
+
+
+def report_parallel_safety(app):
+    """With -j, say which phases run serially (Sphinx falls back on its own, this tells why)"""
+    if app.parallel <= 1:
+        return
+    for phase in PARALLEL_PHASES:
+        unsafe = parallel_unsafe_extensions(app, phase)
+        if unsafe:
+            logger.info(f"parallel build: {phase} phase runs serially because of {', '.join(unsafe)}")
+    if not app.builder.allow_parallel:
+        logger.info(f"parallel build: the {app.builder.name} builder writes serially, only reading runs in parallel")
+
+
+def setup(app) -> Dict:
+    # Add custom page width
+    app.add_css_file("_static/style.css")
+    app.connect("builder-inited", report_parallel_safety)
+    return {
+        "version": __version__,
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
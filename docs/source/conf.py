@@ -18,6 +18,8 @@ import shlex
 import re
 import yaml
 # sys.path.insert(0, os.path.abspath('.'))
+# Local extensions (arkangel_docs holds the project-specific setup)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '_ext'))
 
 import sphinx_rtd_theme
 #import sphinx_book_theme
@@ -105,6 +107,7 @@ extensions = [
     'sphinx.ext.autosectionlabel',
     'sphinxcontrib.rsvgconverter',
     'm2r2',
+    'arkangel_docs',
 ]
 
 # Add any paths that contain templates here, relative to this directory.
@@ -183,10 +186,6 @@ html_static_path = ['_static']
 #
 # html_sidebars = {}
 
-# Add custom page width
-def setup(app):
-  app.add_css_file("_static/style.css")
-
 
 # -- Options for HTMLHelp output ---------------------------------------------
 
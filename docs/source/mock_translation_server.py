@@ -0,0 +1,284 @@
+import json
+import re
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+# -------------------- Prompt Parsing --------------------
+_ENTRY_HEADER_RE = re.compile(r"^### Entry (\d+) *$", re.MULTILINE)
+_SINGULAR_RE = re.compile(r"Singular Text to Translate:\n(.*?)\n(?:\nPlural Text to Translate:\n(.*?)\n)?\n\n-{50}", re.DOTALL)
+_COMPACT_ENTRY_RE = re.compile(r'^(\d+)(?: \(context "(?:[^"\\]|\\.)*"\))?: (".*)$', re.MULTILINE)
+_DECODER = json.JSONDecoder()
+
+
+def _extract_legacy_entries(prompt: str) -> Dict[str, Tuple[str, str]]:
+    entries = {}
+    headers = list(_ENTRY_HEADER_RE.finditer(prompt))
+    for pos, header in enumerate(headers):
+        block_end = headers[pos + 1].start() if pos + 1 < len(headers) else len(prompt)
+        block = prompt[header.start():block_end]
+        match = _SINGULAR_RE.search(block)
+        if match:
+            entries[header.group(1)] = (match.group(1), match.group(2))
+        else:
+            entries[header.group(1)] = (f"entry {header.group(1)}", None)
+    return entries
+
+
+def _extract_compact_entries(prompt: str) -> Dict[str, Tuple[str, str]]:
+    entries = {}
+    for match in _COMPACT_ENTRY_RE.finditer(prompt):
+        rest = match.group(2)
+        try:
+            msgid, end = _DECODER.raw_decode(rest)
+            msgid_plural = None
+            if rest[end:].startswith(" | plural: "):
+                msgid_plural = _DECODER.raw_decode(rest, end + len(" | plural: "))[0]
+        except ValueError:
+            msgid, msgid_plural = f"entry {match.group(1)}", None
+        entries[match.group(1)] = (msgid, msgid_plural)
+    return entries
+
+
+def extract_entries(prompt: str) -> Dict[str, Tuple[str, str]]:
+    """Map entry numbers of a translator prompt (compact or legacy layout) to (msgid, msgid_plural)"""
+    if _ENTRY_HEADER_RE.search(prompt):
+        return _extract_legacy_entries(prompt)
+    return _extract_compact_entries(prompt)
+
+
+def mock_translate(text: str) -> str:
+    """Deterministic stand-in translation that keeps all markup intact"""
+    return f"【译】{text}"
+
+
+# -------------------- Mock Server --------------------
+class MockTranslationServer(ThreadingHTTPServer):
+    """
+    Local OpenAI-compatible chat completions endpoint for offline tests and throughput benchmarks.
+    Latency, server errors, 429 responses, truncated replies and malformed JSON are injected at
+    configurable rates.
+    """
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2, latency_per_entry: float = 0.0,
+                 jitter: float = 0.1, error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 truncate_rate: float = 0.0, malformed_rate: float = 0.0, seed: int = None):
+        super().__init__((host, port), MockRequestHandler)
+        self.latency = latency
+        self.latency_per_entry = latency_per_entry
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "connections": 0, "errors": 0, "rate_limited": 0, "truncated": 0,
+                      "malformed": 0, "entries": 0, "bytes_in": 0, "bytes_out": 0}
+        self.seen_prefixes = set()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.stats)
+
+    def process_request(self, request, client_address):
+        self.count("connections")
+        super().process_request(request, client_address)
+
+    def cached_prefix_chars(self, prompt: str, block_chars: int = 256) -> int:
+        """Emulate provider prefix caching: length of the longest block-aligned prefix seen before"""
+        cached = 0
+        with self.lock:
+            for end in range(block_chars, len(prompt) + 1, block_chars):
+                prefix_hash = hash(prompt[:end])
+                if prefix_hash in self.seen_prefixes and cached == end - block_chars:
+                    cached = end
+                self.seen_prefixes.add(prefix_hash)
+        return cached
+
+    def draw_outcome(self) -> str:
+        """Pick the fate of one request according to the configured rates"""
+        with self.lock:
+            roll = self.random.random()
+        for outcome, rate in (("rate_limited", self.rate_limit_rate), ("errors", self.error_rate),
+                              ("truncated", self.truncate_rate), ("malformed", self.malformed_rate)):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return "ok"
+
+    def start_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count("bytes_out", len(body))
+
+    def _send_stream(self, request: Dict, content: str, finish_reason: str, usage: Dict, truncated: bool = False):
+        """Send the completion as server-sent events; a truncated reply drops the connection mid-way"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        created = int(time.time())
+        base = {"id": f"mock-{int(time.time() * 1000)}", "object": "chat.completion.chunk", "created": created,
+                "model": request.get("model", "mock")}
+        piece_len = 24
+        for pos in range(0, len(content), piece_len):
+            chunk = dict(base, choices=[{"index": 0, "delta": {"content": content[pos:pos + piece_len]},
+                                         "finish_reason": None}])
+            data = f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+            self.wfile.write(data)
+            self.server.count("bytes_out", len(data))
+        if truncated:
+            return
+        final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=usage))}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        server.count("requests")
+        server.count("bytes_in", len(raw))
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        request = json.loads(raw or b"{}")
+        prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+        entries = extract_entries(prompt)
+
+        outcome = server.draw_outcome()
+        if outcome == "rate_limited":
+            server.count("rate_limited")
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                            headers={"Retry-After": str(server.retry_after)})
+            return
+
+        delay = server.latency + server.latency_per_entry * len(entries)
+        delay += server.random.uniform(-server.jitter, server.jitter) * delay
+        time.sleep(max(0.0, delay))
+
+        if outcome == "errors":
+            server.count("errors")
+            self._send_json(500, {"error": {"message": "Internal server error", "type": "server_error"}})
+            return
+
+        translations = {}
+        for key, (msgid, msgid_plural) in entries.items():
+            value = {"translation": mock_translate(msgid)}
+            if msgid_plural is not None:
+                value["plural"] = [mock_translate(msgid), mock_translate(msgid_plural)]
+            translations[key] = value
+        content = json.dumps(translations, ensure_ascii=False)
+        finish_reason = "stop"
+        server.count("entries", len(entries))
+
+        if outcome == "truncated":
+            server.count("truncated")
+            content = content[:len(content) // 2]
+            finish_reason = "length"
+        elif outcome == "malformed":
+            server.count("malformed")
+            content = "Here are the translations:\n" + content.replace('"}', '"', 1)
+
+        completion_tokens = len(content) // 3
+        prompt_tokens = len(prompt) // 4
+        cached_tokens = server.cached_prefix_chars(prompt) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens,
+                 "prompt_cache_hit_tokens": cached_tokens, "prompt_cache_miss_tokens": prompt_tokens - cached_tokens}
+
+        if request.get("stream"):
+            self._send_stream(request, content, finish_reason, usage, truncated=outcome == "truncated")
+            return
+
+        self._send_json(200, {
+            "id": f"mock-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+
+
+# -------------------- Command Line Interface & Main Function --------------------
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible mock server for translator.py.")
+    parser.add_argument('--host', default='127.0.0.1', help="Bind address (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument('--latency', type=float, default=0.2, help="Base seconds per response (default: 0.2)")
+    parser.add_argument('--latency-per-entry', type=float, default=0.0,
+                        help="Extra seconds per translated entry (default: 0)")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Relative latency jitter (default: 0.1)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of HTTP 429 responses")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help="Fraction of replies cut off mid-JSON")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Fraction of replies with broken JSON")
+    parser.add_argument('--seed', type=int, help="Random seed for reproducible fault injection")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = MockTranslationServer(
+        host=args.host, port=args.port, latency=args.latency, latency_per_entry=args.latency_per_entry,
+        jitter=args.jitter, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, truncate_rate=args.truncate_rate, malformed_rate=args.malformed_rate,
+        seed=args.seed
+    )
+    print(f"Mock translation server listening on {server.base_url}")
+    print(f"  Use with: DEEPSEEK_BASE_URL={server.base_url} python translator.py ...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served: {json.dumps(server.snapshot())}")
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
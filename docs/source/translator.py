@@ -1,4 +1,5 @@
 import os
+import sys
 import polib
 import time
 import json
@@ -6,42 +7,367 @@ import argparse
 import re
 import subprocess
 import multiprocessing
-from openai import OpenAI
-from typing import List, Dict, Tuple, Any
+import hashlib
+import functools
+import difflib
+import unicodedata
+import random
+import sqlite3
+import struct
+import array
+import cProfile
+import threading
+from collections import deque, Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Tuple, Any, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # The SDK pulls in the whole HTTP client stack; it is only imported once a request is sent
+    from openai import OpenAI
+
+
+DEEPSEEK_MODEL = "deepseek-chat"
+# Worker processes are always spawned, whatever the platform default is
+MP_CONTEXT = multiprocessing.get_context("spawn")
 
 
 # -------------------- Initialize DeepSeek Client --------------------
-def init_client():
-    """Initialize OpenAI-compatible client for DeepSeek API with hardcoded API key."""
-    # Hardcoded API Key
-    api_key = "sk-70406818a671408b80f43720b7978aab"
+API_KEY_MISSING = "DeepSeek API key is not set: export DEEPSEEK_API_KEY or list the endpoints with --endpoints"
+
+
+def init_client(pool_size: int = None, keepalive_secs: float = None, http2: bool = False, endpoints: List[Dict] = None):
+    """
+    Initialize OpenAI-compatible client for DeepSeek API with the API key from DEEPSEEK_API_KEY.
+    DEEPSEEK_BASE_URL overrides the default endpoint (e.g. to target a local mock server).
+    The client keeps its connections alive between requests, so create it once per worker and reuse it.
+    pool_size, keepalive_secs and http2 tune the underlying HTTP connection pool (SDK defaults otherwise).
+    With endpoint specs (see load_endpoint_specs) an EndpointPool over all of them is returned instead.
+    """
+    if endpoints:
+        return EndpointPool([
+            Endpoint(spec["name"], create_api_client(spec["api_key"], spec["base_url"], pool_size, keepalive_secs, http2),
+                     weight=spec["weight"], model=spec["model"], rate_limiter=spec["rate_limiter"])
+            for spec in endpoints
+        ])
+
+    api_key = os.environ.get("DEEPSEEK_API_KEY")
     if not api_key:
-        raise EnvironmentError("DeepSeek API Key is not set (check hardcoded value in init_client())")
+        raise EnvironmentError(API_KEY_MISSING)
     
     # Configure DeepSeek API endpoint (OpenAI-compatible base URL)
-    client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-    return client
+    base_url = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+    return create_api_client(api_key, base_url, pool_size, keepalive_secs, http2)
+
+
+def create_api_client(api_key: str, base_url: str, pool_size: int = None, keepalive_secs: float = None,
+                      http2: bool = False) -> "OpenAI":
+    from openai import OpenAI
+
+    # Retries are handled by call_deepseek and the shared rate limiter, not by the SDK
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                  http_client=build_http_client(pool_size, keepalive_secs, http2))
+
+
+def build_http_client(pool_size: int = None, keepalive_secs: float = None, http2: bool = False):
+    """Pooled keep-alive HTTP client for the SDK, or None to keep the SDK's own defaults"""
+    if pool_size is None and keepalive_secs is None and not http2:
+        return None
+    from openai import DefaultHttpxClient
+
+    # Limits come from the HTTP library the installed SDK is built on (httpx, or httpx2 in newer releases)
+    http_module = next((sys.modules[cls.__module__.split(".")[0]] for cls in DefaultHttpxClient.__mro__
+                        if hasattr(sys.modules.get(cls.__module__.split(".")[0]), "Limits")), None)
+    if http_module is None:
+        print("  Warning: Cannot tune the HTTP connection pool of this openai SDK, using its defaults")
+        return None
+    limits = http_module.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive_secs if keepalive_secs is not None else 5.0
+    )
+    try:
+        return DefaultHttpxClient(limits=limits, http2=http2)
+    except ImportError:
+        # HTTP/2 needs the optional h2 package
+        print("  Warning: HTTP/2 support is not installed (pip install h2), using HTTP/1.1")
+        return DefaultHttpxClient(limits=limits)
+
+
+# -------------------- Endpoint Pool (Load Balancing & Failover) --------------------
+ENDPOINT_COOLDOWN_BASE_SECS = 1.0
+ENDPOINT_COOLDOWN_CAP_SECS = 60.0
+# Rejected keys and wrong URLs do not recover within a run
+ENDPOINT_DISABLE_SECS = 600.0
+ENDPOINT_DISABLE_STATUSES = (401, 403, 404)
+
+
+def load_endpoint_specs(path: str, requests_per_minute: float = None, tokens_per_minute: float = None) -> List[Dict]:
+    """
+    Read a JSON list (or {"endpoints": [...]}) of OpenAI-compatible endpoints, for example
+      {"name": "deepseek-a", "base_url": "https://api.deepseek.com", "api_key_env": "DEEPSEEK_KEY_A", "weight": 2}
+      {"name": "local", "base_url": "http://localhost:8000/v1", "model": "qwen2.5-7b-instruct", "rpm": 600}
+    "api_key" (or the variable named by "api_key_env") defaults to "none" for servers that ignore it,
+    "model" to DEEPSEEK_MODEL and "weight" to 1. "rpm"/"tpm" limit one endpoint (requests_per_minute /
+    tokens_per_minute otherwise); the limiters are created here, so worker processes share them.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("endpoints", [])
+
+    specs = []
+    for position, item in enumerate(data, start=1):
+        if isinstance(item, str):
+            item = {"base_url": item}
+        if not item.get("base_url"):
+            raise ValueError(f"Endpoint {position} in {path} has no base_url")
+        api_key = item.get("api_key")
+        if item.get("api_key_env"):
+            api_key = os.environ.get(item["api_key_env"])
+            if not api_key:
+                raise EnvironmentError(f"API key of endpoint {position} in {path} is not set ({item['api_key_env']})")
+        weight = float(item.get("weight", 1.0))
+        if weight <= 0:
+            raise ValueError(f"Endpoint {position} in {path} needs a positive weight")
+        rpm = item.get("rpm", requests_per_minute)
+        tpm = item.get("tpm", tokens_per_minute)
+        specs.append({
+            "name": item.get("name") or f"endpoint-{position}",
+            "base_url": item["base_url"],
+            "api_key": api_key or "none",
+            "model": item.get("model"),
+            "weight": weight,
+            "rate_limiter": RateLimiter(rpm, tpm) if rpm or tpm else None,
+        })
+    if not specs:
+        raise ValueError(f"No endpoints found in {path}")
+    return specs
+
+
+class Endpoint:
+    """One backend of an EndpointPool: its client, weight, optional model and rate limiter, load and health"""
+
+    def __init__(self, name: str, client: "OpenAI", weight: float = 1.0, model: str = None,
+                 rate_limiter: "RateLimiter" = None):
+        self.name = name
+        self.client = client
+        self.weight = weight
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+
+class EndpointPool:
+    """
+    Several OpenAI-compatible endpoints (accounts, regions or self-hosted servers) used as one client
+    by call_deepseek. Every request goes to the healthy endpoint with the fewest outstanding requests
+    per unit of weight. A failed request takes its endpoint out of rotation for an exponentially
+    growing cooldown (at least its Retry-After) and is retried on another endpoint right away.
+    Load and health are shared by the threads of a process.
+    """
+
+    def __init__(self, endpoints: List[Endpoint]):
+        self.endpoints = endpoints
+        self.lock = threading.Lock()
+
+    def acquire(self, avoid: Endpoint = None) -> Endpoint:
+        """Reserve an endpoint for one request, preferring any other healthy endpoint over `avoid`"""
+        with self.lock:
+            now = time.time()
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.unhealthy_until <= now]
+            candidates = [endpoint for endpoint in healthy if endpoint is not avoid] or healthy
+            if candidates:
+                least_load = min((endpoint.outstanding + 1) / endpoint.weight for endpoint in candidates)
+                endpoint = random.choice([endpoint for endpoint in candidates
+                                          if (endpoint.outstanding + 1) / endpoint.weight == least_load])
+            else:
+                # All endpoints are cooling down: take the one that recovers first
+                endpoint = min(self.endpoints, key=lambda endpoint: endpoint.unhealthy_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, failed: bool = False, retry_after: float = None, disable: bool = False):
+        """End a request; a failure puts the endpoint into cooldown (a long one with disable)"""
+        with self.lock:
+            endpoint.outstanding -= 1
+            if not failed:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if disable:
+                cooldown = ENDPOINT_DISABLE_SECS
+            else:
+                cooldown = max(retry_after or 0, min(ENDPOINT_COOLDOWN_CAP_SECS,
+                                                     ENDPOINT_COOLDOWN_BASE_SECS * 2 ** (endpoint.consecutive_failures - 1)))
+        self.cool_down(endpoint, cooldown)
+
+    def cool_down(self, endpoint: Endpoint, delay_secs: float):
+        """Keep new requests away from an endpoint for delay_secs"""
+        with self.lock:
+            endpoint.unhealthy_until = max(endpoint.unhealthy_until, time.time() + delay_secs)
+        if len(self.endpoints) > 1:
+            print(f"  Endpoint {endpoint.name} out of rotation for {delay_secs:.1f} seconds")
+
+    def has_alternative(self, endpoint: Endpoint) -> bool:
+        """True if another endpoint is healthy, so a failed request can move on without backing off"""
+        with self.lock:
+            now = time.time()
+            return any(other is not endpoint and other.unhealthy_until <= now for other in self.endpoints)
+
+    def summary(self) -> str:
+        with self.lock:
+            return ", ".join(f"{endpoint.name} {endpoint.requests} requests ({endpoint.failures} failed)"
+                             for endpoint in self.endpoints)
+
+
+# -------------------- Token Estimation --------------------
+# CJK ideographs/kana/hangul/full-width forms are roughly one token each, alphanumeric runs
+# about four characters per token, and every other visible character (markup) its own token.
+_TOKEN_PIECE_RE = re.compile(r"[\u3000-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]|[A-Za-z0-9_]+|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative, dependency-free token estimate for mixed English/CJK/reStructuredText text"""
+    count = 0
+    for match in _TOKEN_PIECE_RE.finditer(text):
+        piece = match.group(0)
+        count += (len(piece) + 3) // 4 if piece.isascii() and piece[0].isalnum() else 1
+    return count
+
+
+def get_tokenizer(name: str = "heuristic"):
+    """
+    Return a callable(text) -> token count.
+    Supported names: 'heuristic' (built-in estimate), 'tiktoken[:encoding]' and 'hf:<tokenizer.json>'
+    (e.g. the tokenizer published with the DeepSeek model, loaded via the 'tokenizers' package).
+    """
+    if callable(name):
+        return name
+    if not name or name == "heuristic":
+        return estimate_tokens
+
+    if name.startswith("tiktoken"):
+        try:
+            import tiktoken
+        except ImportError as e:
+            raise ImportError("Tokenizer 'tiktoken' requested but not installed (pip install tiktoken)") from e
+        encoding = tiktoken.get_encoding(name.partition(":")[2] or "cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+    if name.startswith("hf:"):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("Tokenizer 'hf' requested but 'tokenizers' is not installed (pip install tokenizers)") from e
+        tokenizer = Tokenizer.from_file(name[3:])
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    raise ValueError(f"Unknown tokenizer: {name} (expected 'heuristic', 'tiktoken[:encoding]' or 'hf:<path>')")
 
 
 # -------------------- Utility Functions --------------------
-def chunk_entries(entries: List[polib.POEntry], batch_size: int, max_chars: int) -> List[List[polib.POEntry]]:
+MAX_OUTPUT_TOKENS = 8192
+
+
+def chunk_entries(
+    entries: List[polib.POEntry],
+    batch_size: int,
+    max_chars: int = None,
+    max_input_tokens: int = 16000,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    target_lang: str = "zh_CN",
+    po_path: str = "",
+    entry_po_paths: List[str] = None,
+    tokenizer="heuristic",
+    output_ratio: float = 1.3,
+    prompt_format: str = "compact",
+    glossary: "Glossary" = None,
+    mask_markup: bool = False
+) -> List[List[polib.POEntry]]:
     """
-    Chunk PO entries by both entry count and character limit to fit API token constraints.
+    Chunk PO entries into batches that fit both the prompt (input) and completion (output) token budgets.
+    Input cost includes the fixed prompt header/footer and the per-entry framing produced by
+    build_prompt_for_batch (in the compact layout, a source document line whenever the document changes);
+    output cost is the expected translation size (source tokens * output_ratio) plus its JSON framing.
+    With a glossary, each term line a batch needs (and the glossary heading) is charged to the input once.
+    With mask_markup, entries are costed as sent, with their inline markup replaced by placeholders.
+    batch_size (entries) and max_chars (source characters) remain as extra caps.
     """
+    count_tokens = get_tokenizer(tokenizer)
+    fixed_input = count_tokens(build_prompt_for_batch([], po_path, target_lang, prompt_format=prompt_format,
+                                                      mask_markup=mask_markup))
+    output_framing = count_tokens('"9999": {"translation": ""},')
+    glossary_heading_input = count_tokens(GLOSSARY_HEADING) + 1
+
+    def glossary_input(term_inputs, batch_terms):
+        """Input tokens of the glossary lines an entry adds to a batch that already lists batch_terms"""
+        new_inputs = [cost for term, cost in term_inputs.items() if term not in batch_terms]
+        return sum(new_inputs) + (glossary_heading_input if new_inputs and not batch_terms else 0)
+
+    # Keep headroom for the JSON object braces and estimation error
+    output_budget = int(max_output_tokens * 0.95)
+
     batches = []
     current_batch = []
     current_char_count = 0
+    current_input = fixed_input
+    current_output = 0
+    current_label = None
+    current_terms = {}
 
-    for entry in entries:
+    for pos, batch_entry in enumerate(entries):
+        entry = mask_entry(batch_entry) if mask_markup else batch_entry
+        entry_po_path = entry_po_paths[pos] if entry_po_paths else po_path
         entry_char_est = len(entry.msgid) + (len(entry.msgid_plural) if entry.msgid_plural else 0)
-        
-        if current_batch and (len(current_batch) >= batch_size or current_char_count + entry_char_est > max_chars):
+        if prompt_format == "legacy":
+            label = None
+            entry_input = count_tokens("\n".join(build_prompt_entry_parts(entry, len(current_batch) + 1, entry_po_path))) + 1
+        else:
+            label = prompt_source_label(entry, entry_po_path)
+            entry_input = count_tokens(build_compact_entry_line(entry, len(current_batch) + 1)) + 1
+            label_input = count_tokens(f"# {label}") + 1
+        # Glossary line cost of each term of the entry; only terms new to the batch are charged
+        entry_terms = glossary.entry_terms(entry, target_lang) if glossary else {}
+        term_inputs = {term: count_tokens(line) + 1
+                       for term, line in zip(entry_terms, build_glossary_lines(entry_terms)[1:])}
+
+        source_tokens = count_tokens(entry.msgid)
+        if entry.msgid_plural:
+            # Singular translation plus a plural array covering both forms
+            source_tokens = 2 * source_tokens + count_tokens(entry.msgid_plural) + output_framing
+        entry_output = int(source_tokens * output_ratio) + output_framing
+
+        if current_batch and (
+            len(current_batch) >= batch_size
+            or (max_chars and current_char_count + entry_char_est > max_chars)
+            or current_input + entry_input + (label_input if label != current_label else 0)
+            + glossary_input(term_inputs, current_terms) > max_input_tokens
+            or current_output + entry_output > output_budget
+        ):
             batches.append(current_batch)
             current_batch = []
             current_char_count = 0
-        
-        current_batch.append(entry)
+            current_input = fixed_input
+            current_output = 0
+            current_label = None
+            current_terms = {}
+
+        if label != current_label:
+            entry_input += label_input
+            current_label = label
+        entry_input += glossary_input(term_inputs, current_terms)
+        current_terms.update(term_inputs)
+        current_batch.append(batch_entry)
         current_char_count += entry_char_est
+        current_input += entry_input
+        current_output += entry_output
 
     if current_batch:
         batches.append(current_batch)
@@ -61,154 +387,2098 @@ def save_response_debug(po_path: str, batch_index: int, target_lang: str, conten
     print(f"  Saved raw response to {debug_filename}")
 
 
-# -------------------- Check if Compilation is Needed (Skip Unmodified Files) --------------------
+# -------------------- Check if Compilation is Needed (Content-Hash Based) --------------------
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def catalog_content_hash(po_file: polib.POFile) -> str:
+    """
+    Hash of everything that ends up in the compiled MO file (metadata and translated entries).
+    Entry digests are summed, so the result does not depend on entry order and a streamed catalog
+    is hashed in a single pass without holding its entries.
+    """
+    entries_sum = 0
+    for entry in po_file:
+        if not entry.translated():
+            continue
+        plural = sorted((str(k), v) for k, v in entry.msgstr_plural.items()) if entry.msgid_plural else None
+        record = [entry.msgctxt, entry.msgid, entry.msgid_plural, entry.msgstr, plural]
+        entries_sum += int.from_bytes(hashlib.sha256(json.dumps(record, ensure_ascii=False).encode("utf-8")).digest(), "big")
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sorted(po_file.metadata.items()), ensure_ascii=False).encode("utf-8"))
+    digest.update((entries_sum % (1 << 256)).to_bytes(32, "big"))
+    return digest.hexdigest()
+
+
+def _stamp_path(mo_path: str) -> str:
+    return f"{mo_path}.hash"
+
+
+def _read_compile_stamp(mo_path: str) -> Dict[str, str]:
+    if not os.path.exists(mo_path):
+        return {}
+    try:
+        with open(_stamp_path(mo_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_compile_stamp(mo_path: str, po_sha: str, content_sha: str):
+    with open(_stamp_path(mo_path), "w", encoding="utf-8") as f:
+        json.dump({"po_sha256": po_sha, "content_sha256": content_sha}, f)
+
+
 def needs_compilation(po_path: str) -> bool:
-    """Check if PO file needs recompilation by comparing modification time with MO file"""
+    """
+    Cheap check whether the PO file changed since its MO file was last compiled.
+    Compares the PO file's content hash (not mtime, which a git checkout resets) with the stamp
+    written next to the MO file.
+    """
     mo_path = os.path.splitext(po_path)[0] + ".mo"
-    if not os.path.exists(mo_path):
-        return True
-    return os.path.getmtime(po_path) > os.path.getmtime(mo_path)
+    return _read_compile_stamp(mo_path).get("po_sha256") != _file_sha256(po_path)
 
 
-def compile_po_to_mo(po_path: str, verbose: bool = True) -> bool:
-    """Compile .po file to binary .mo file using msgfmt"""
-    if not needs_compilation(po_path):
+def compile_po_to_mo(po_path: str, verbose: bool = True, po_file: polib.POFile = None,
+                     use_msgfmt: bool = False) -> bool:
+    """
+    Compile .po file to binary .mo file in-process (polib MO writer, temp file + atomic rename).
+    Compilation is skipped when the PO file, or at least the translated content it holds, is
+    unchanged since the last compile. use_msgfmt switches to the external gettext msgfmt tool.
+    """
+    mo_path = os.path.splitext(po_path)[0] + ".mo"
+    stamp = _read_compile_stamp(mo_path)
+    po_sha = _file_sha256(po_path)
+    if stamp.get("po_sha256") == po_sha:
         if verbose:
             print(f"    Skipping compilation: {os.path.basename(po_path)} (no changes)")
         return True
 
-    mo_path = os.path.splitext(po_path)[0] + ".mo"
-    
     try:
-        result = subprocess.run(
-            ["msgfmt", "-o", mo_path, po_path],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        
+        if po_file is None:
+            po_file = polib.pofile(po_path, encoding="utf-8")
+        content_sha = catalog_content_hash(po_file)
+    except Exception as e:
+        print(f"  Error: Failed to compile {os.path.basename(po_path)}")
+        print(f"    Detailed error: {str(e)}")
+        return False
+
+    if stamp.get("content_sha256") == content_sha:
+        # Only comments/occurrences changed: the MO file would be byte-identical
+        _write_compile_stamp(mo_path, po_sha, content_sha)
         if verbose:
-            print(f"    Compiled PO → MO: {os.path.basename(po_path)} → {os.path.basename(mo_path)}")
+            print(f"    Skipping compilation: {os.path.basename(po_path)} (translations unchanged)")
         return True
-    
-    except FileNotFoundError:
-        print(f"  Error: 'msgfmt' command not found. Install gettext first:")
-        print(f"         - Linux: sudo apt install gettext")
-        print(f"         - macOS: brew install gettext")
-        print(f"         - Windows: Download from https://mlocati.github.io/articles/gettext-iconv-windows.html")
-        return False
-    except subprocess.CalledProcessError as e:
-        print(f"  Error: Failed to compile {os.path.basename(po_path)}")
-        print(f"    Detailed error: {e.stderr.strip()}")
+
+    tmp_path = f"{mo_path}.tmp"
+    if use_msgfmt:
+        try:
+            subprocess.run(
+                ["msgfmt", "-o", tmp_path, po_path],
+                check=True,
+                capture_output=True,
+                text=True
+            )
+        except FileNotFoundError:
+            print(f"  Error: 'msgfmt' command not found. Install gettext first:")
+            print(f"         - Linux: sudo apt install gettext")
+            print(f"         - macOS: brew install gettext")
+            print(f"         - Windows: Download from https://mlocati.github.io/articles/gettext-iconv-windows.html")
+            return False
+        except subprocess.CalledProcessError as e:
+            print(f"  Error: Failed to compile {os.path.basename(po_path)}")
+            print(f"    Detailed error: {e.stderr.strip()}")
+            return False
+    else:
+        try:
+            po_file.save_as_mofile(tmp_path)
+        except Exception as e:
+            print(f"  Error: Failed to compile {os.path.basename(po_path)}")
+            print(f"    Detailed error: {str(e)}")
+            return False
+
+    os.replace(tmp_path, mo_path)
+    _write_compile_stamp(mo_path, po_sha, content_sha)
+    if verbose:
+        print(f"    Compiled PO → MO: {os.path.basename(po_path)} → {os.path.basename(mo_path)}")
+    return True
+
+
+def _compile_po_worker(args) -> bool:
+    po_path, verbose, use_msgfmt = args
+    return compile_po_to_mo(po_path, verbose=verbose, use_msgfmt=use_msgfmt)
+
+
+def compile_locale_dir(locale_dir: str, target_langs: List[str], max_workers: int = None,
+                       verbose: bool = False, use_msgfmt: bool = False) -> Tuple[int, int]:
+    """
+    Refresh the MO files of whole locale trees. Unchanged catalogs are filtered out with a cheap
+    hash check first; the rest are compiled in parallel. Returns (compiled/checked, failed) counts.
+    """
+    po_paths = []
+    for lang in target_langs:
+        po_root_dir = os.path.join(locale_dir, lang, "LC_MESSAGES")
+        for root, _, files in os.walk(po_root_dir):
+            po_paths.extend(os.path.join(root, file) for file in files if file.endswith(".po"))
+
+    outdated = [po_path for po_path in po_paths if needs_compilation(po_path)]
+    if len(outdated) <= 4:
+        # Not worth starting worker processes
+        results = [compile_po_to_mo(po_path, verbose=verbose, use_msgfmt=use_msgfmt) for po_path in outdated]
+    else:
+        with MP_CONTEXT.Pool(processes=max_workers or multiprocessing.cpu_count()) as pool:
+            results = pool.map(_compile_po_worker, [(po_path, verbose, use_msgfmt) for po_path in outdated])
+
+    failed = results.count(False)
+    print(f"MO refresh: {len(po_paths)} catalogs, {len(outdated) - failed} compiled or confirmed, "
+          f"{len(po_paths) - len(outdated)} unchanged, {failed} failed")
+    return len(outdated) - failed, failed
+
+
+# -------------------- Translation Memory (Persistent Cache) --------------------
+class TranslationMemory:
+    """
+    On-disk translation memory backed by SQLite.
+    Entries are keyed by a hash of (msgid, msgid_plural, msgctxt, target_lang, model) so the same
+    source string is only ever sent to the API once, across PO files, branches and interrupted runs.
+    """
+
+    def __init__(self, db_path: str):
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self.db_path = db_path
+        # Several pool workers may share the same database file
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tm ("
+            " key TEXT PRIMARY KEY,"
+            " msgid TEXT NOT NULL,"
+            " msgid_plural TEXT,"
+            " msgctxt TEXT,"
+            " target_lang TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " msgstr TEXT NOT NULL,"
+            " msgstr_plural TEXT,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(msgid: str, msgid_plural: str, msgctxt: str, target_lang: str, model: str) -> str:
+        """Stable hash of everything that determines a translation"""
+        raw = json.dumps([msgid, msgid_plural or "", msgctxt or "", target_lang, model], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def entry_key(self, entry: polib.POEntry, target_lang: str, model: str = DEEPSEEK_MODEL) -> str:
+        return self.make_key(entry.msgid, entry.msgid_plural, entry.msgctxt, target_lang, model)
+
+    def fill_entries(self, entries: List[polib.POEntry], target_lang: str,
+                     model: str = DEEPSEEK_MODEL) -> List[polib.POEntry]:
+        """Fill entries found in the cache and return the ones that still need translation"""
+        if not entries:
+            return []
+        keys = [self.entry_key(entry, target_lang, model) for entry in entries]
+        cached = {}
+        # Stay well below SQLite's bound-parameter limit
+        for pos in range(0, len(keys), 500):
+            chunk = keys[pos:pos + 500]
+            rows = self.conn.execute(
+                f"SELECT key, msgstr, msgstr_plural FROM tm WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for key, msgstr, msgstr_plural in rows:
+                cached[key] = (msgstr, msgstr_plural)
+
+        remaining = []
+        hit_keys = []
+        for key, entry in zip(keys, entries):
+            if key not in cached:
+                remaining.append(entry)
+                continue
+            msgstr, msgstr_plural = cached[key]
+            if entry.msgid_plural:
+                if not msgstr_plural:
+                    remaining.append(entry)
+                    continue
+                entry.msgstr_plural = json.loads(msgstr_plural)
+            entry.msgstr = msgstr
+            hit_keys.append(key)
+
+        if hit_keys:
+            now = time.time()
+            self.conn.executemany("UPDATE tm SET last_used = ? WHERE key = ?", [(now, key) for key in hit_keys])
+            self.conn.commit()
+        return remaining
+
+    def store_entries(self, entries: List[polib.POEntry], target_lang: str, model: str = DEEPSEEK_MODEL,
+                      overwrite: bool = True):
+        """Record translated entries (untranslated or fuzzy ones are ignored)"""
+        now = time.time()
+        # A generator, so a streamed catalog is stored without materializing its entries
+        rows = (
+            (
+                self.entry_key(entry, target_lang, model), entry.msgid, entry.msgid_plural, entry.msgctxt,
+                target_lang, model, entry.msgstr,
+                json.dumps(entry.msgstr_plural, ensure_ascii=False) if entry.msgid_plural else None,
+                now, now
+            )
+            for entry in entries if not entry.obsolete and entry.translated()
+        )
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        self.conn.executemany(f"{verb} INTO tm VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def iter_translations(self, target_lang: str, model: str = DEEPSEEK_MODEL):
+        """(msgid, msgstr) of every singular entry stored for target_lang"""
+        return self.conn.execute(
+            "SELECT msgid, msgstr FROM tm WHERE target_lang = ? AND model = ? AND msgid_plural IS NULL",
+            (target_lang, model)
+        )
+
+    def evict(self, max_entries: int = None, max_age_days: float = None) -> int:
+        """Drop entries unused for max_age_days, then the least recently used beyond max_entries"""
+        removed = 0
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            removed += self.conn.execute("DELETE FROM tm WHERE last_used < ?", (cutoff,)).rowcount
+        if max_entries is not None:
+            removed += self.conn.execute(
+                "DELETE FROM tm WHERE key IN (SELECT key FROM tm ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (max(0, max_entries),)
+            ).rowcount
+        self.conn.commit()
+        return removed
+
+    def export_jsonl(self, path: str) -> int:
+        """Export all entries to a JSONL file"""
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            rows = self.conn.execute(
+                "SELECT msgid, msgid_plural, msgctxt, target_lang, model, msgstr, msgstr_plural, created, last_used "
+                "FROM tm ORDER BY target_lang, msgid"
+            )
+            for msgid, msgid_plural, msgctxt, lang, model, msgstr, msgstr_plural, created, last_used in rows:
+                record = {
+                    "msgid": msgid, "msgid_plural": msgid_plural, "msgctxt": msgctxt,
+                    "target_lang": lang, "model": model, "msgstr": msgstr,
+                    "msgstr_plural": json.loads(msgstr_plural) if msgstr_plural else None,
+                    "created": created, "last_used": last_used
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def import_jsonl(self, path: str) -> int:
+        """Import entries from a JSONL file produced by export_jsonl (existing keys are overwritten)"""
+        now = time.time()
+        rows = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                model = record.get("model") or DEEPSEEK_MODEL
+                msgstr_plural = record.get("msgstr_plural")
+                rows.append((
+                    self.make_key(record["msgid"], record.get("msgid_plural"), record.get("msgctxt"),
+                                  record["target_lang"], model),
+                    record["msgid"], record.get("msgid_plural"), record.get("msgctxt"),
+                    record["target_lang"], model, record["msgstr"],
+                    json.dumps(msgstr_plural, ensure_ascii=False) if msgstr_plural else None,
+                    record.get("created", now), record.get("last_used", now)
+                ))
+        self.conn.executemany("INSERT OR REPLACE INTO tm VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+# -------------------- Fuzzy Matching (Near-Duplicate Reuse) --------------------
+# reStructuredText literals, roles and links are single tokens; other text splits into words and punctuation
+_FUZZY_TOKEN_RE = re.compile(r"``.+?``|:[\w:-]+:`[^`]*`|`[^`]*`_{0,2}|\w+|[^\w\s]")
+# Shortest source string (in tokens) worth a fuzzy lookup
+FUZZY_MIN_TOKENS = 4
+
+
+class FuzzyIndex:
+    """
+    Similarity index over translated singular entries, used to reuse the translation of a near-duplicate
+    source string instead of requesting a new one.
+    Candidates are the indexed strings sharing the most distinctive tokens with the query (an inverted
+    index that skips tokens found in more than max_postings strings); the best one by difflib's
+    token-level similarity ratio wins.
+    """
+
+    def __init__(self, max_postings: int = 200, max_candidates: int = 10):
+        self.max_postings = max_postings
+        self.max_candidates = max_candidates
+        self.sources = []  # msgid of each indexed string
+        self.tokens = []  # its token tuple
+        self.translations = []
+        self.postings = {}  # token -> ids of the strings containing it
+        self.known = set()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def add(self, msgid: str, msgstr: str):
+        if msgid in self.known or not msgstr:
+            return
+        tokens = tuple(_FUZZY_TOKEN_RE.findall(msgid))
+        with self.lock:
+            if msgid in self.known:
+                return
+            self.known.add(msgid)
+            if len(tokens) < FUZZY_MIN_TOKENS:
+                return
+            string_id = len(self.sources)
+            self.sources.append(msgid)
+            self.tokens.append(tokens)
+            self.translations.append(msgstr)
+            for token in set(tokens):
+                self.postings.setdefault(token, []).append(string_id)
+
+    def add_entries(self, entries):
+        """Index the translated singular entries of a catalog or batch"""
+        for entry in entries:
+            if not entry.obsolete and not entry.msgid_plural and entry.translated():
+                self.add(entry.msgid, entry.msgstr)
+
+    def best_match(self, msgid: str, threshold: float) -> Tuple[float, str, str]:
+        """(similarity, source, translation) of the closest indexed string at or above threshold, or None"""
+        tokens = _FUZZY_TOKEN_RE.findall(msgid)
+        if len(tokens) < FUZZY_MIN_TOKENS:
+            return None
+        shared = {}
+        with self.lock:
+            for token in set(tokens):
+                posting = self.postings.get(token, ())
+                if len(posting) <= self.max_postings:
+                    for string_id in posting:
+                        shared[string_id] = shared.get(string_id, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:self.max_candidates]
+
+        best = None
+        matcher = difflib.SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(tokens)
+        for string_id in candidates:
+            matcher.set_seq1(self.tokens[string_id])
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= threshold and (best is None or ratio > best[0]):
+                best = (ratio, self.sources[string_id], self.translations[string_id])
+        return best
+
+
+def token_similarity(first: str, second: str) -> float:
+    return difflib.SequenceMatcher(None, _FUZZY_TOKEN_RE.findall(first), _FUZZY_TOKEN_RE.findall(second),
+                                   autojunk=False).ratio()
+
+
+def adapt_translation(msgid: str, source: str, translation: str) -> str:
+    """
+    Carry the differences between a source string and msgid over to the source's translation when every
+    replaced piece (a path, literal or name) appears exactly once and verbatim in the translation.
+    Returns None when the translation cannot be adapted mechanically.
+    """
+    source_spans = [match.span() for match in _FUZZY_TOKEN_RE.finditer(source)]
+    target_spans = [match.span() for match in _FUZZY_TOKEN_RE.finditer(msgid)]
+    matcher = difflib.SequenceMatcher(None, [source[start:end] for start, end in source_spans],
+                                      [msgid[start:end] for start, end in target_spans], autojunk=False)
+    adapted = translation
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag != "replace":
+            return None
+        old = source[source_spans[i1][0]:source_spans[i2 - 1][1]]
+        new = msgid[target_spans[j1][0]:target_spans[j2 - 1][1]]
+        if len(old) < 2 or adapted.count(old) != 1:
+            return None
+        start = adapted.index(old)
+        end = start + len(old)
+        if (_is_word_char(old[0]) and start > 0 and _is_word_char(adapted[start - 1])) or \
+                (_is_word_char(old[-1]) and end < len(adapted) and _is_word_char(adapted[end])):
+            return None
+        adapted = adapted[:start] + new + adapted[end:]
+    return adapted
+
+
+_FUZZY_INDEXES = {}  # (translation memory path, target_lang) -> FuzzyIndex
+_FUZZY_INDEXES_LOCK = threading.Lock()
+
+
+def get_fuzzy_index(target_lang: str, memory: "TranslationMemory" = None, catalogs=()) -> FuzzyIndex:
+    """
+    Index of the given catalogs' translated entries. With a translation memory the index also covers
+    the memory and is shared by every call of the process for the language, kept current as batches land.
+    """
+    if memory is None:
+        index = FuzzyIndex()
+    else:
+        with _FUZZY_INDEXES_LOCK:
+            key = (os.path.abspath(memory.db_path), target_lang)
+            if key not in _FUZZY_INDEXES:
+                _FUZZY_INDEXES[key] = FuzzyIndex()
+                for msgid, msgstr in memory.iter_translations(target_lang):
+                    _FUZZY_INDEXES[key].add(msgid, msgstr)
+            index = _FUZZY_INDEXES[key]
+    for catalog in catalogs:
+        index.add_entries(catalog)
+    return index
+
+
+def fill_fuzzy_matches(index: FuzzyIndex, entries: List[polib.POEntry],
+                       threshold: float) -> Tuple[List[polib.POEntry], int, int]:
+    """
+    Reuse the translations of near-duplicate strings for untranslated singular entries.
+    A translation that adapt_translation() carries over completely (and no msgctxt is involved) is used
+    as-is; otherwise the closest translation is filled in and marked fuzzy for review, with the matched
+    source as previous msgid. Either way the entry is not sent to the API.
+    Returns (remaining entries, adapted count, marked count).
+    """
+    remaining = []
+    adapted_count = marked_count = 0
+    for entry in entries:
+        match = None if entry.msgid_plural else index.best_match(entry.msgid, threshold)
+        if not entry.msgid_plural and entry.previous_msgid and entry.msgstr:
+            # gettext kept the translation of the entry's previous source: the closest match if similar enough
+            ratio = token_similarity(entry.previous_msgid, entry.msgid)
+            if ratio >= threshold and (match is None or ratio >= match[0]):
+                match = (ratio, entry.previous_msgid, entry.msgstr)
+        if match is None:
+            remaining.append(entry)
+            continue
+        _, source, translation = match
+        adapted = adapt_translation(entry.msgid, source, translation) if not entry.msgctxt else None
+        if adapted is not None:
+            entry.msgstr = adapted
+            if "fuzzy" in entry.flags:
+                entry.flags.remove("fuzzy")
+            entry.previous_msgid = None
+            adapted_count += 1
+        else:
+            entry.msgstr = translation
+            if "fuzzy" not in entry.flags:
+                entry.flags.append("fuzzy")
+            entry.previous_msgid = source
+            marked_count += 1
+    return remaining, adapted_count, marked_count
+
+
+# -------------------- Write-Back Journal --------------------
+def save_po_atomic(po_file: polib.POFile, po_path: str):
+    """Save a PO file through a temporary file and an atomic rename"""
+    tmp_path = f"{po_path}.tmp"
+    po_file.save(tmp_path)
+    os.replace(tmp_path, po_path)
+
+
+class WriteBackJournal:
+    """
+    Append-only journal of applied translations for one PO file.
+    Every applied batch is appended and fsync'ed, while the .po/.mo files are only rewritten on a
+    timed checkpoint or at the end of the run. A journal left behind by an interrupted run is
+    replayed on the next start, so finished batches are never requested again.
+    """
+
+    def __init__(self, po_path: str, checkpoint_secs: float = 60.0):
+        self.po_path = po_path
+        self.path = f"{po_path}.journal"
+        self.checkpoint_secs = checkpoint_secs
+        self.last_checkpoint = time.monotonic()
+        self.pending = False
+        self.file = None
+
+    @staticmethod
+    def entry_id(entry: polib.POEntry) -> List[str]:
+        return [entry.msgctxt or "", entry.msgid, entry.msgid_plural or ""]
+
+    def replay(self, po_file: polib.POFile) -> int:
+        """Re-apply journaled translations to a freshly loaded PO file (or StreamingCatalog)"""
+        if not os.path.exists(self.path):
+            return 0
+        records = {}  # Later records of an entry win
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn final record from a crash
+                records[tuple(record["id"])] = record
+        replayed = []
+        for entry in po_file:
+            record = None if entry.obsolete else records.get(tuple(self.entry_id(entry)))
+            if record is None:
+                continue
+            entry.msgstr = record["msgstr"]
+            if record.get("msgstr_plural"):
+                entry.msgstr_plural = {int(k): v for k, v in record["msgstr_plural"].items()}
+            if record.get("fuzzy"):
+                # A fuzzy match left for review
+                if "fuzzy" not in entry.flags:
+                    entry.flags.append("fuzzy")
+                entry.previous_msgid = record.get("previous_msgid")
+            elif "fuzzy" in entry.flags:
+                entry.flags.remove("fuzzy")
+            replayed.append(entry)
+        if isinstance(po_file, StreamingCatalog):
+            po_file.track(replayed)
+        self.pending = bool(replayed)
+        return len(replayed)
+
+    def append(self, entries: List[polib.POEntry]):
+        """Durably record the translated (or fuzzy-matched) entries of one batch"""
+        lines = []
+        for entry in entries:
+            fuzzy_match = "fuzzy" in entry.flags and bool(entry.msgstr)
+            if not entry.translated() and not fuzzy_match:
+                continue
+            record = {"id": self.entry_id(entry), "msgstr": entry.msgstr}
+            if entry.msgid_plural:
+                record["msgstr_plural"] = {str(k): v for k, v in entry.msgstr_plural.items()}
+            if fuzzy_match:
+                record.update(fuzzy=True, previous_msgid=entry.previous_msgid)
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if not lines:
+            return
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write("".join(lines))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = True
+
+    def checkpoint_due(self) -> bool:
+        return self.pending and time.monotonic() - self.last_checkpoint >= self.checkpoint_secs
+
+    def checkpoint(self, po_file: polib.POFile, verbose: bool = True):
+        """Write the PO/MO files and drop the journal records they now contain"""
+        save_po_atomic(po_file, self.po_path)
+        print(f"    Saved updates to PO file: {self.po_path}")
+        compile_po_to_mo(self.po_path, verbose=verbose, po_file=po_file)
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.pending = False
+        self.last_checkpoint = time.monotonic()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# -------------------- Low-Memory (Streaming) PO Access --------------------
+class StreamEntry:
+    """
+    Compact stand-in for polib.POEntry produced by the streaming PO reader.
+    Only the fields the translation pipeline reads are kept; comments stay on disk.
+    """
+    __slots__ = ("msgctxt", "msgid", "msgid_plural", "msgstr", "msgstr_plural", "occurrences", "flags", "obsolete",
+                 "previous_msgid")
+
+    def __init__(self):
+        self.msgctxt = None
+        self.msgid = ""
+        self.msgid_plural = ""
+        self.msgstr = ""
+        self.msgstr_plural = {}
+        self.occurrences = []
+        self.flags = []
+        self.obsolete = False
+        self.previous_msgid = None
+
+    @property
+    def fuzzy(self) -> bool:
+        return "fuzzy" in self.flags
+
+    def translated(self) -> bool:
+        """Same rule as polib.POEntry.translated()"""
+        if self.obsolete or self.fuzzy:
+            return False
+        if self.msgstr != "":
+            return True
+        if self.msgstr_plural:
+            return all(value != "" for value in self.msgstr_plural.values())
         return False
 
 
+_PO_KEYWORD_RE = re.compile(r'^(msgctxt|msgid_plural|msgid|msgstr(?:\[(\d+)\])?)\s*"(.*)"$')
+
+
+def _is_header(entry: StreamEntry) -> bool:
+    return entry.msgid == "" and entry.msgctxt is None and not entry.obsolete
+
+
+def _iter_po_blocks(po_path: str):
+    """
+    Yield (entry, lines, msgstr_span) for every block of a PO file, header and obsolete entries included.
+    lines are the raw lines of the entry, from its leading comments to its trailing blank lines, and
+    msgstr_span is the [start, end) range of its msgstr lines (None for a trailing comment block).
+    """
+    entry, lines, span, field = StreamEntry(), [], None, None
+    previous_field = None  # "#| msgid" comment being read
+    with open(po_path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, start=1):
+            body = line.strip()
+            obsolete = body.startswith("#~")
+            if obsolete:
+                body = body[2:].lstrip()
+            is_comment = body.startswith("#") or (obsolete and body.startswith("|"))
+            keyword = _PO_KEYWORD_RE.match(body) if body.startswith("msg") else None
+
+            if span is not None and (is_comment or (keyword is not None and keyword.group(1) in ("msgctxt", "msgid"))):
+                # A comment or msgid after a msgstr starts the next entry
+                yield entry, lines, span
+                entry, lines, span, field = StreamEntry(), [], None, None
+                previous_field = None
+            lines.append(line)
+
+            if not body:
+                continue
+            if is_comment:
+                if body.startswith("#:"):
+                    for occurrence in body[2:].split():
+                        path, _, lineno = occurrence.rpartition(":")
+                        entry.occurrences.append((path, lineno) if path and lineno.isdigit() else (occurrence, ""))
+                elif body.startswith("#,"):
+                    entry.flags.extend(flag.strip() for flag in body[2:].split(","))
+                elif body.startswith("#|"):
+                    previous = _PO_KEYWORD_RE.match(body[2:].strip())
+                    if previous is not None:
+                        previous_field = previous.group(1)
+                        if previous_field == "msgid":
+                            entry.previous_msgid = polib.unescape(previous.group(3))
+                    elif previous_field == "msgid" and body[2:].strip().startswith('"'):
+                        entry.previous_msgid += polib.unescape(body[2:].strip()[1:-1])
+                continue
+
+            if keyword is not None:
+                name, index, value = keyword.group(1), keyword.group(2), polib.unescape(keyword.group(3))
+                entry.obsolete = obsolete
+                if name.startswith("msgstr"):
+                    field = ("msgstr_plural", int(index)) if index is not None else ("msgstr", None)
+                else:
+                    field = (name, None)
+            elif body.startswith('"') and body.endswith('"') and len(body) > 1 and field is not None:
+                value = polib.unescape(body[1:-1])
+            else:
+                raise IOError(f"Syntax error in po file {po_path} (line {line_num})")
+
+            name, index = field
+            if index is not None:
+                previous = entry.msgstr_plural.get(index, "") if keyword is None else ""
+                entry.msgstr_plural[index] = previous + value
+            else:
+                previous = (getattr(entry, name) or "") if keyword is None else ""
+                setattr(entry, name, previous + value)
+            if name.startswith("msgstr"):
+                span = [span[0] if span is not None else len(lines) - 1, len(lines)]
+
+    if span is not None or lines:
+        yield entry, lines, span
+
+
+def iter_po_entries(po_path: str):
+    """Stream the entries of a PO file one at a time (like iterating a polib.POFile, header excluded)"""
+    for entry, _, span in _iter_po_blocks(po_path):
+        if span is not None and not _is_header(entry):
+            yield entry
+
+
+def format_msgstr_lines(entry) -> List[str]:
+    """msgstr lines of an entry, wrapped the way polib.POFile.save() writes them"""
+    lines = str(polib.POEntry(msgstr=entry.msgstr, msgstr_plural=dict(entry.msgstr_plural))).split("\n")
+    start = next(pos for pos, line in enumerate(lines) if line.startswith("msgstr"))
+    return [line + "\n" for line in lines[start:] if line]
+
+
+def format_flag_lines(entry) -> List[str]:
+    """Flag and previous msgid comment lines of an entry, as polib.POFile.save() writes them"""
+    lines = str(polib.POEntry(msgid="", flags=list(entry.flags), previous_msgid=entry.previous_msgid)).split("\n")
+    return [line + "\n" for line in lines if line.startswith(("#,", "#|"))]
+
+
+def write_mo_file(mo_path: str, messages: List[Tuple[bytes, bytes]]):
+    """Write (msgid, msgstr) pairs, header first and the rest sorted, in the MO layout polib produces"""
+    # Header (7 ints), key table and value table (length and offset per message each), then the strings
+    keystart = 7 * 4 + 16 * len(messages)
+    offsets = array.array("i")
+    position = keystart
+    for msgid, _ in messages:
+        offsets.extend((len(msgid), position))
+        position += len(msgid) + 1
+    for _, msgstr in messages:
+        offsets.extend((len(msgstr), position))
+        position += len(msgstr) + 1
+
+    with open(mo_path, "wb") as f:
+        f.write(struct.pack("Iiiiiii", polib.MOFile.MAGIC, 0, len(messages), 7 * 4, 7 * 4 + len(messages) * 8,
+                            0, keystart))
+        f.write(offsets.tobytes())
+        for msgid, _ in messages:
+            f.write(msgid + b"\0")
+        for _, msgstr in messages:
+            f.write(msgstr + b"\0")
+
+
+class StreamingCatalog:
+    """
+    Low-memory stand-in for polib.POFile (--low-memory).
+    Entries are streamed from disk whenever the catalog is iterated; only tracked entries (those
+    being translated) stay in memory. save() streams the original file through and rewrites just the
+    msgstr lines of tracked entries, so every other line is kept byte for byte.
+    """
+
+    def __init__(self, po_path: str):
+        if not os.path.exists(po_path):
+            raise FileNotFoundError(f"PO file not found: {po_path}")
+        self.fpath = po_path
+        self.tracked = {}  # entry id -> StreamEntry written back on save()
+
+    def track(self, entries: List[StreamEntry]):
+        for entry in entries:
+            self.tracked[tuple(WriteBackJournal.entry_id(entry))] = entry
+
+    def release(self):
+        """Forget tracked entries once they have been saved"""
+        self.tracked = {}
+
+    def __iter__(self):
+        for entry in iter_po_entries(self.fpath):
+            yield entry if entry.obsolete else self.tracked.get(tuple(WriteBackJournal.entry_id(entry)), entry)
+
+    def untranslated_windows(self, window_size: int = None):
+        """
+        Yield the untranslated entries in windows of at most window_size entries (one window without
+        a size) and track them. The file is reopened for every window, so it can be saved in between.
+        """
+        start = 0
+        while True:
+            window, exhausted = [], True
+            entries = iter(self)
+            try:
+                for position, entry in enumerate(entries):
+                    if position < start or entry.obsolete or entry.translated():
+                        continue
+                    window.append(entry)
+                    if window_size and len(window) >= window_size:
+                        start, exhausted = position + 1, False
+                        break
+            finally:
+                entries.close()
+            if window:
+                self.track(window)
+                yield window
+            if exhausted:
+                return
+
+    def translated_entries(self) -> List[StreamEntry]:
+        return [entry for entry in self if entry.translated()]
+
+    @property
+    def metadata(self) -> Dict[str, str]:
+        """Header fields, parsed the way polib does"""
+        metadata = {}
+        for entry, _, span in _iter_po_blocks(self.fpath):
+            if span is None or not _is_header(entry):
+                continue
+            key = None
+            for line in entry.msgstr.splitlines():
+                try:
+                    key, value = line.split(":", 1)
+                    metadata[key] = value.strip()
+                except ValueError:
+                    if key is not None:
+                        metadata[key] += "\n" + line.strip()
+            break
+        return metadata
+
+    def save(self, fpath: str = None):
+        """Write the catalog with tracked translations to fpath (atomically when rewriting the file itself)"""
+        target = fpath or self.fpath
+        in_place = os.path.abspath(target) == os.path.abspath(self.fpath)
+        out_path = f"{target}.tmp" if in_place else target
+        with open(out_path, "w", encoding="utf-8") as out:
+            for entry, lines, span in _iter_po_blocks(self.fpath):
+                patched = None
+                if span is not None and not entry.obsolete:
+                    patched = self.tracked.get(tuple(WriteBackJournal.entry_id(entry)))
+                if patched is not None and (patched.msgstr or any(patched.msgstr_plural.values())):
+                    lines[span[0]:span[1]] = format_msgstr_lines(patched)
+                    if patched.fuzzy != entry.fuzzy or patched.previous_msgid:
+                        # Fuzzy matches also change the flag and previous msgid comments above the msgid
+                        first = next(pos for pos, line in enumerate(lines) if line.lstrip().startswith("msg"))
+                        comments = [line for line in lines[:first] if not line.startswith(("#,", "#|"))]
+                        lines[:first] = comments + format_flag_lines(patched)
+                out.writelines(lines)
+        if in_place:
+            os.replace(out_path, target)
+
+    def save_as_mofile(self, fpath: str):
+        """Compile to MO holding only the encoded strings of translated entries in memory"""
+        header = polib.POFile()
+        header.metadata = self.metadata
+        messages = []
+        sort_keys = {}  # Plural entries sort by msgid with context only, like polib
+        for entry in self:
+            if not entry.translated():
+                continue
+            msgid = ((entry.msgctxt + "\x04" if entry.msgctxt else "") + entry.msgid).encode("utf-8")
+            if entry.msgid_plural:
+                sort_keys[len(messages)] = msgid
+                msgid += b"\0" + entry.msgid_plural.encode("utf-8")
+                msgstr = "\0".join(entry.msgstr_plural[index] for index in sorted(entry.msgstr_plural))
+            else:
+                msgstr = entry.msgstr
+            messages.append((msgid, msgstr.encode("utf-8")))
+        order = sorted(range(len(messages)), key=lambda pos: sort_keys.get(pos, messages[pos][0]))
+        messages = [(b"", header.metadata_as_entry().msgstr.encode("utf-8"))] + [messages[pos] for pos in order]
+        write_mo_file(fpath, messages)
+
+
+class CatalogCache:
+    """
+    Parsed catalogs kept in memory between the passes of a long-running process (watch mode).
+    A catalog is reused as long as its file has the size and modification time it had when it was
+    parsed or, after the pass that wrote it, when mark_written was called.
+    """
+
+    def __init__(self):
+        self.catalogs = {}  # absolute path -> ((mtime_ns, size), POFile)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def signature(po_path: str) -> Tuple[int, int]:
+        stat = os.stat(po_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, po_path: str) -> polib.POFile:
+        key = os.path.abspath(po_path)
+        signature = self.signature(po_path)
+        with self.lock:
+            cached = self.catalogs.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        po_file = polib.pofile(po_path, encoding="utf-8")
+        with self.lock:
+            self.catalogs[key] = (signature, po_file)
+        return po_file
+
+    def mark_written(self, po_paths: List[str]):
+        """The cached catalogs of po_paths are what was just saved to them: adopt their new signatures"""
+        with self.lock:
+            for po_path in po_paths:
+                key = os.path.abspath(po_path)
+                if key in self.catalogs:
+                    try:
+                        self.catalogs[key] = (self.signature(po_path), self.catalogs[key][1])
+                    except OSError:
+                        del self.catalogs[key]
+
+    def clear(self):
+        with self.lock:
+            self.catalogs.clear()
+
+
+_CATALOG_CACHE = None  # CatalogCache used by load_catalog (watch mode only)
+
+
+def load_catalog(po_path: str, low_memory: bool = False):
+    """Open a PO file with polib (through the CatalogCache in watch mode), or as a StreamingCatalog in low-memory mode"""
+    if low_memory:
+        return StreamingCatalog(po_path)
+    if _CATALOG_CACHE is not None:
+        return _CATALOG_CACHE.load(po_path)
+    return polib.pofile(po_path, encoding="utf-8")
+
+
+# -------------------- Incremental (Delta) Mode --------------------
+DELTA_MANIFEST_NAME = ".translator_manifest.json"
+
+
+def pot_message_digest(pot_path: str) -> str:
+    """
+    Hash of the messages of a gettext template, read as text without parsing it. The creation date
+    and source references are left out, so rebuilding the POT or shifting lines keeps the digest.
+    """
+    digest = hashlib.sha256()
+    with open(pot_path, "rb") as f:
+        for line in f:
+            if line.startswith(b"#:") or line.startswith(b'"POT-Creation-Date:'):
+                continue
+            digest.update(line)
+    return digest.hexdigest()
+
+
+def git_changed_sources(source_dir: str, rev: str) -> List[str]:
+    """Documents (paths relative to source_dir, without extension) whose sources changed since rev"""
+    source_dir = os.path.abspath(source_dir)
+    result = subprocess.run(["git", "diff", "--name-only", "--relative", rev, "--", "."],
+                            cwd=source_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git diff against {rev} failed: {result.stderr.strip()}")
+    return [os.path.splitext(path)[0] for path in result.stdout.splitlines()
+            if path.endswith((".rst", ".md"))]
+
+
+class DeltaManifest:
+    """
+    Per-catalog record of the last complete translation pass: the PO file hash and the digest of
+    the POT it was built from. A catalog whose hash, template or source document is unchanged since
+    then needs neither loading nor translating. The PO hash check also catches merges by
+    sphinx-intl, hand edits and entries left untranslated by an earlier failed run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.catalogs = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.catalogs = json.load(f).get("catalogs", {})
+            except (OSError, ValueError) as e:
+                print(f"  Warning: Ignoring unreadable delta manifest {path}: {str(e)}")
+
+    @staticmethod
+    def catalog_key(po_path: str, locale_dir: str) -> str:
+        return os.path.relpath(po_path, locale_dir).replace(os.sep, "/")
+
+    @staticmethod
+    def document_name(po_path: str, locale_dir: str) -> str:
+        """manual/foo for locale/<lang>/LC_MESSAGES/manual/foo.po"""
+        key = DeltaManifest.catalog_key(po_path, locale_dir)
+        return os.path.splitext(key.split("/", 2)[2] if key.count("/") >= 2 else key)[0]
+
+    def changed_catalogs(self, tasks: List[Tuple[str, str]], locale_dir: str, pot_dir: str = None,
+                         changed_sources: List[str] = None) -> List[Tuple[str, str]]:
+        """Subset of (po_path, lang) tasks that changed since the last recorded pass"""
+        changed_sources = set(changed_sources or [])
+        selected = []
+        for po_path, lang in tasks:
+            record = self.catalogs.get(self.catalog_key(po_path, locale_dir))
+            document = self.document_name(po_path, locale_dir)
+            if record is None or record.get("po_sha256") != _file_sha256(po_path) or document in changed_sources:
+                selected.append((po_path, lang))
+                continue
+            if pot_dir:
+                pot_path = os.path.join(pot_dir, f"{document}.pot")
+                if os.path.exists(pot_path) and record.get("pot_sha256") != pot_message_digest(pot_path):
+                    selected.append((po_path, lang))
+        return selected
+
+    def record(self, po_path: str, locale_dir: str, pot_dir: str = None):
+        """Remember a catalog as complete in its current state"""
+        pot_path = os.path.join(pot_dir, f"{self.document_name(po_path, locale_dir)}.pot") if pot_dir else None
+        self.catalogs[self.catalog_key(po_path, locale_dir)] = {
+            "po_sha256": _file_sha256(po_path),
+            "pot_sha256": pot_message_digest(pot_path) if pot_path and os.path.exists(pot_path) else None,
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "catalogs": self.catalogs}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+# -------------------- Pipeline Metrics & Profiling --------------------
+# Estimated DeepSeek prices in USD per million tokens; override with --price-* when pricing changes
+PRICE_PER_M_INPUT_TOKENS = 0.28
+PRICE_PER_M_CACHED_INPUT_TOKENS = 0.028
+PRICE_PER_M_OUTPUT_TOKENS = 0.42
+
+BATCH_PHASES = ("prompt", "throttle", "network", "parse", "apply", "save", "compile")
+
+
+@contextmanager
+def timed(stats: Dict[str, Any], phase: str):
+    """Add the wall-clock time of the block to stats['<phase>_secs']"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        key = f"{phase}_secs"
+        stats[key] = stats.get(key, 0.0) + time.perf_counter() - start
+
+
+class MetricsRecorder:
+    """
+    Append-only JSONL sink for pipeline metrics. Every record is a single O_APPEND write, so the
+    recorder can be pickled into worker processes that all append to the same file.
+    """
+
+    def __init__(self, path: str, run_id: str = None, price_input: float = PRICE_PER_M_INPUT_TOKENS,
+                 price_cached_input: float = PRICE_PER_M_CACHED_INPUT_TOKENS,
+                 price_output: float = PRICE_PER_M_OUTPUT_TOKENS):
+        self.path = path
+        self.run_id = run_id or f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.price_input = price_input
+        self.price_cached_input = price_cached_input
+        self.price_output = price_output
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def estimate_cost(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        return ((prompt_tokens - cached_tokens) * self.price_input + cached_tokens * self.price_cached_input
+                + completion_tokens * self.price_output) / 1e6
+
+    def record(self, event: str, **fields):
+        record = {"run": self.run_id, "event": event, "time": round(time.time(), 3), "pid": os.getpid()}
+        record.update(fields)
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def record_batch(self, target_lang: str, po_path: str, batch_num: int, entries: int, stats: Dict[str, Any],
+                     translated: int, failed: int, error: str = None):
+        """One 'batch' record: phase timings, token usage, retries and estimated cost"""
+        prompt_tokens = stats.get("prompt_tokens") or 0
+        completion_tokens = stats.get("completion_tokens") or 0
+        cached_tokens = stats.get("cached_tokens") or 0
+        fields = {f"{phase}_secs": round(stats.get(f"{phase}_secs", 0.0), 4) for phase in BATCH_PHASES}
+        fields.update(
+            lang=target_lang,
+            po_path=po_path,
+            batch=batch_num,
+            entries=entries,
+            translated=translated,
+            failed=failed,
+            attempts=stats.get("attempts", 0),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            estimated_prompt_tokens=stats.get("estimated_prompt_tokens"),
+            cost_usd=round(self.estimate_cost(prompt_tokens, completion_tokens, cached_tokens), 6),
+        )
+        if "glossary_misses" in stats:
+            fields["glossary_misses"] = stats["glossary_misses"]
+        if stats.get("markup_rejected"):
+            fields["markup_rejected"] = stats["markup_rejected"]
+        if stats.get("endpoint"):
+            fields["endpoint"] = stats["endpoint"]
+            fields["failovers"] = stats.get("failovers", 0)
+        if error:
+            fields["error"] = error
+        self.record("batch", **fields)
+
+    def read_run(self) -> List[Dict[str, Any]]:
+        """All records of this run"""
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("run") == self.run_id:
+                    records.append(record)
+        return records
+
+    def summarize(self, wall_secs: float) -> Dict[str, Any]:
+        """Aggregate the batch and cache records of this run"""
+        records = self.read_run()
+        batches = [record for record in records if record["event"] == "batch"]
+        caches = [record for record in records if record["event"] == "cache"]
+        latencies = sorted(record["network_secs"] for record in batches if record.get("attempts"))
+
+        def percentile(fraction):
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3) if latencies else None
+
+        translated = sum(record["translated"] for record in batches)
+        summary = {
+            "wall_secs": round(wall_secs, 2),
+            "batches": len(batches),
+            "entries_sent": sum(record["entries"] for record in batches),
+            "translated": translated,
+            "failed": sum(record["failed"] for record in batches),
+            "tm_hits": sum(record["hits"] for record in caches),
+            "fuzzy_adapted": sum(record["adapted"] for record in records if record["event"] == "fuzzy"),
+            "fuzzy_marked": sum(record["marked"] for record in records if record["event"] == "fuzzy"),
+            "glossary_misses": sum(record.get("glossary_misses", 0) for record in batches),
+            "markup_rejected": sum(record.get("markup_rejected", 0) for record in batches),
+            "requests": sum(record["attempts"] for record in batches),
+            "retries": sum(max(0, record["attempts"] - 1) for record in batches),
+            "prompt_tokens": sum(record["prompt_tokens"] for record in batches),
+            "completion_tokens": sum(record["completion_tokens"] for record in batches),
+            "cached_tokens": sum(record["cached_tokens"] for record in batches),
+            "cost_usd": round(sum(record["cost_usd"] for record in batches), 4),
+            "entries_per_sec": round(translated / wall_secs, 2) if wall_secs else None,
+            "network_p50_secs": percentile(0.5),
+            "network_p95_secs": percentile(0.95),
+        }
+        for phase in BATCH_PHASES:
+            summary[f"{phase}_secs"] = round(sum(record.get(f"{phase}_secs", 0.0) for record in batches), 2)
+        endpoints = Counter(record["endpoint"] for record in batches if record.get("endpoint"))
+        if endpoints:
+            summary["endpoint_batches"] = dict(sorted(endpoints.items()))
+            summary["failovers"] = sum(record.get("failovers", 0) for record in batches)
+        return summary
+
+
+def print_metrics_summary(summary: Dict[str, Any]):
+    """Human-readable end-of-run report"""
+    print("\nRun summary:")
+    print(f"  Wall time: {summary['wall_secs']}s, {summary['translated']} entries translated "
+          f"({summary['entries_per_sec']} entries/s), {summary['failed']} failed, {summary['tm_hits']} TM hits, "
+          f"{summary['glossary_misses']} glossary misses")
+    if summary["fuzzy_adapted"] or summary["fuzzy_marked"]:
+        print(f"  Fuzzy matches: {summary['fuzzy_adapted']} adapted, {summary['fuzzy_marked']} marked fuzzy for review")
+    if summary["markup_rejected"]:
+        print(f"  Markup check: {summary['markup_rejected']} translations with broken markup rejected and retried")
+    print(f"  Requests: {summary['requests']} for {summary['batches']} batches ({summary['retries']} retries), "
+          f"network p50 {summary['network_p50_secs']}s / p95 {summary['network_p95_secs']}s")
+    print(f"  Tokens: {summary['prompt_tokens']} in ({summary['cached_tokens']} cached), "
+          f"{summary['completion_tokens']} out, estimated cost ${summary['cost_usd']}")
+    if summary.get("endpoint_batches"):
+        endpoints = ", ".join(f"{name} {count}" for name, count in summary["endpoint_batches"].items())
+        print(f"  Batches by endpoint: {endpoints} ({summary['failovers']} failovers)")
+    phases = ", ".join(f"{phase} {summary[f'{phase}_secs']}s" for phase in BATCH_PHASES)
+    print(f"  Time by phase (summed over batches): {phases}")
+
+
+def dump_profile(profiler: cProfile.Profile, profile_dir: str, name: str):
+    """Write cProfile stats for one worker (inspect with `python -m pstats <file>`)"""
+    os.makedirs(profile_dir, exist_ok=True)
+    profile_path = os.path.join(profile_dir, f"{name}.prof")
+    profiler.dump_stats(profile_path)
+    return profile_path
+
+
 # -------------------- Multiprocessing Wrapper Function --------------------
+_WORKER_RATE_LIMITER = None
+_WORKER_PROFILE_DIR = None
+_WORKER_PROFILER = None
+_WORKER_CLIENT_OPTIONS = {}
+_WORKER_CLIENT = None
+_WORKER_CLIENT_LOCK = threading.Lock()
+
+
+def init_pool_worker(rate_limiter: "RateLimiter" = None, profile_dir: str = None, client_options: Dict = None):
+    """
+    Pool initializer: share the parent's rate limiter with this worker process (and profile it if asked).
+    client_options are the init_client() arguments of the client this worker reuses for all its tasks.
+    """
+    global _WORKER_RATE_LIMITER, _WORKER_PROFILE_DIR, _WORKER_PROFILER, _WORKER_CLIENT_OPTIONS
+    _WORKER_RATE_LIMITER = rate_limiter
+    _WORKER_PROFILE_DIR = profile_dir
+    _WORKER_PROFILER = cProfile.Profile() if profile_dir else None
+    _WORKER_CLIENT_OPTIONS = client_options or {}
+
+
+def get_worker_client():
+    """Client of this worker, created when the first request is sent and reused by every later task"""
+    global _WORKER_CLIENT
+    with _WORKER_CLIENT_LOCK:
+        if _WORKER_CLIENT is None:
+            _WORKER_CLIENT = init_client(**_WORKER_CLIENT_OPTIONS)
+    return _WORKER_CLIENT
+
+
 def process_po_wrapper(args):
     """Wrapper for multiprocessing to process single PO file"""
     # 关键修改：不在参数中传递client，而是在子进程内初始化
     po_file_path, lang, translation_kwargs = args
+    if _WORKER_PROFILER is not None:
+        _WORKER_PROFILER.enable()
     try:
-        # 每个子进程单独初始化客户端
-        client = init_client()
+        # 客户端在首次发送请求时才创建（每个 worker 一次），纯缓存或无需翻译的任务不会加载 HTTP 客户端
         translate_po_file_batch(
             po_path=po_file_path,
-            client=client,
-            target_lang=lang,** translation_kwargs
+            client=None,
+            target_lang=lang,
+            rate_limiter=_WORKER_RATE_LIMITER,** translation_kwargs
         )
     except Exception as e:
         print(f"  Error processing {os.path.basename(po_file_path)}: {str(e)}")
+    finally:
+        if _WORKER_PROFILER is not None:
+            # Stats accumulate over all tasks of this worker; the file is rewritten after each one
+            _WORKER_PROFILER.disable()
+            dump_profile(_WORKER_PROFILER, _WORKER_PROFILE_DIR, f"worker-{os.getpid()}")
+
+
+# -------------------- Glossary (Terminology) --------------------
+GLOSSARY_NAME = "glossary.json"
+GLOSSARY_HEADING = "Glossary (use exactly these translations for the following terms):"
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class Glossary:
+    """
+    Term list compiled into an Aho-Corasick automaton, so all terms occurring in a text are found in a
+    single pass over it however long the list is. Matching ignores case and only accepts whole words
+    (an English plural "s" is allowed after a term).
+    The glossary file is a JSON object mapping each source term to {"<lang>": "translation"}, or to a
+    plain string used for every target language (e.g. acronyms that must stay untranslated).
+    """
+
+    def __init__(self, terms: Dict[str, Any]):
+        self.terms = {}  # lowercased term -> (term, translations)
+        self.goto = [{}]  # state -> {char: next state}
+        self.fail = [0]
+        self.output = [[]]  # state -> lowercased terms ending in this state
+        for term, translations in terms.items():
+            key = term.strip().lower()
+            if not key:
+                continue
+            self.terms[key] = (term.strip(), translations)
+            state = 0
+            for char in key:
+                if char not in self.goto[state]:
+                    self.goto[state][char] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = self.goto[state][char]
+            self.output[state].append(key)
+
+        # Failure links, breadth-first: the longest proper suffix of a state that is also a prefix
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    @classmethod
+    def load(cls, path: str) -> "Glossary":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def find_terms(self, text: str) -> List[str]:
+        """Lowercased glossary terms occurring in text, in order of first occurrence"""
+        found = {}
+        lowered = text.lower()
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for pos, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for key in output[state]:
+                start, end = pos + 1 - len(key), pos + 1
+                if _is_word_char(key[0]) and start > 0 and _is_word_char(lowered[start - 1]):
+                    continue
+                if _is_word_char(key[-1]) and end < len(lowered) and _is_word_char(lowered[end]):
+                    if lowered[end] != "s" or (end + 1 < len(lowered) and _is_word_char(lowered[end + 1])):
+                        continue
+                found.setdefault(key, None)
+        return list(found)
+
+    def translation(self, key: str, target_lang: str) -> str:
+        """Expected translation of a term for target_lang (region falls back to language), or None"""
+        translations = self.terms[key][1]
+        if isinstance(translations, str):
+            return translations
+        return translations.get(target_lang) or translations.get(target_lang.split("_")[0])
+
+    def entry_terms(self, entry: polib.POEntry, target_lang: str) -> Dict[str, str]:
+        """Source term -> expected translation for the glossary terms of one entry"""
+        text = entry.msgid + ("\n" + entry.msgid_plural if entry.msgid_plural else "")
+        terms = {}
+        for key in self.find_terms(text):
+            translation = self.translation(key, target_lang)
+            if translation:
+                terms[self.terms[key][0]] = translation
+        return terms
+
+    def terms_for_entries(self, entries: List[polib.POEntry], target_lang: str) -> Dict[str, str]:
+        """Glossary terms occurring anywhere in a batch, with their expected translations"""
+        terms = {}
+        for entry in entries:
+            terms.update(self.entry_terms(entry, target_lang))
+        return terms
+
+    def missing_terms(self, entry: polib.POEntry, target_lang: str) -> Dict[str, str]:
+        """Terms of a translated entry whose expected translation is absent from any of its msgstr forms"""
+        translations = [entry.msgstr] if not entry.msgid_plural else list((entry.msgstr_plural or {}).values())
+        translations = [text.lower() for text in translations if text]
+        return {term: expected for term, expected in self.entry_terms(entry, target_lang).items()
+                if any(expected.lower() not in text for text in translations)}
+
+
+@functools.lru_cache(maxsize=None)
+def load_glossary(path: str) -> Glossary:
+    """Glossary compiled once per process (workers only receive its path)"""
+    return Glossary.load(path)
+
+
+def build_glossary_lines(terms: Dict[str, str]) -> List[str]:
+    """Prompt lines listing the glossary terms of a batch (none if the batch has no terms)"""
+    if not terms:
+        return []
+    return [GLOSSARY_HEADING] + [f"{json.dumps(term, ensure_ascii=False)}: {json.dumps(translation, ensure_ascii=False)}"
+                                 for term, translation in terms.items()]
+
+
+def check_glossary(glossary: Glossary, entries: List[polib.POEntry], entry_po_paths: List[str],
+                   target_lang: str) -> List[Dict[str, Any]]:
+    """Glossary report records for the translated entries of a batch that do not use the expected terms"""
+    records = []
+    for entry, po_path in zip(entries, entry_po_paths):
+        if not entry.translated():
+            continue
+        missing = glossary.missing_terms(entry, target_lang)
+        if missing:
+            records.append({
+                "po_path": po_path,
+                "msgctxt": entry.msgctxt,
+                "msgid": entry.msgid,
+                "msgstr": entry.msgstr if not entry.msgid_plural else entry.msgstr_plural,
+                "missing_terms": missing,
+            })
+    return records
+
+
+# -------------------- reStructuredText Markup Masking & Validation --------------------
+# Inline constructs the model must copy verbatim. In the prompt each one is replaced by a {N} placeholder;
+# a role or hyperlink with an explicit title keeps its title translatable, only the role name and the
+# " <target>`" part are masked.
+_MASK_RE = re.compile(
+    r"``(?=\S)(?:[^`]|`(?!`))+?(?<=\S)``"                          # inline literal
+    r"|:(?:[A-Za-z][\w+.-]*:)+`[^`<>]+`"                             # role: :ref:`label`, :py:func:`name`
+    r"|:(?:[A-Za-z][\w+.-]*:)+`(?=[^`]*\s<[^`<>\s]+>`)"              # role name of a titled role
+    r"|\s<[^`<>\s]+>`(?:__?)?"                                       # target of a titled role or hyperlink
+    r"|`[^`<>]+`(?:__?)?"                                            # hyperlink reference, interpreted text
+    r"|\|[A-Za-z][\w .-]*\|(?:__?)?"                                 # substitution reference
+    r"|\[(?:#[\w-]*|\*|\d+|[A-Za-z][\w.-]*)\]_"                      # footnote and citation reference
+    r"|https?://[^\s<>`\u0080-\uffff]*[^\s<>`.,;:!?)'\"\u0080-\uffff]"  # standalone URI
+    r"|(?<![A-Za-z0-9_-])--[A-Za-z][A-Za-z0-9_-]*",                  # command line option
+    re.DOTALL
+)
+# Inline markup whose start and end strings docutils only recognises next to whitespace or punctuation
+_INLINE_MARKUP_RE = re.compile(
+    r"``(?=\S)(?:[^`]|`(?!`))+?(?<=\S)``"
+    r"|\*\*[^*\s](?:[^*]*[^*\s])?\*\*"
+    r"|(?<!\*)\*[^*\s](?:[^*]*?[^*\s])?\*(?!\*)"
+    r"|:(?:[A-Za-z][\w+.-]*:)+`[^`]+`"
+    r"|`[^`]+`(?:__?)?"
+    r"|\|[A-Za-z][\w .-]*\|(?:__?)?"
+    r"|\[(?:#[\w-]*|\*|\d+|[A-Za-z][\w.-]*)\]_",
+    re.DOTALL
+)
+_PLACEHOLDER_RE = re.compile(r"\{\d+\}")
+MARKUP_PLACEHOLDER_NOTE = "Placeholders such as {1} stand for markup: keep each of them unchanged in the translation."
+
+
+class MaskedEntry:
+    """Prompt view of an entry whose inline markup is replaced by {N} placeholders (see mask_entry)"""
+    __slots__ = ("msgctxt", "msgid", "msgid_plural", "occurrences", "placeholders")
+
+
+def mask_entry(entry: polib.POEntry) -> MaskedEntry:
+    """
+    Mask the inline markup of an entry's msgid/msgid_plural. Identical constructs share a placeholder
+    and numbering starts at {1} for every entry, so the mapping can always be recomputed from the entry.
+    Entries whose text already contains something like {1} are left as they are.
+    """
+    masked = MaskedEntry()
+    masked.msgctxt = entry.msgctxt
+    masked.occurrences = entry.occurrences
+    masked.placeholders = {}  # "{N}" -> markup
+    if _PLACEHOLDER_RE.search(entry.msgid) or (entry.msgid_plural and _PLACEHOLDER_RE.search(entry.msgid_plural)):
+        masked.msgid, masked.msgid_plural = entry.msgid, entry.msgid_plural
+        return masked
+
+    tokens = {}  # markup -> "{N}"
+
+    def placeholder(match) -> str:
+        markup = match.group(0)
+        if markup not in tokens:
+            tokens[markup] = "{" + str(len(tokens) + 1) + "}"
+            masked.placeholders[tokens[markup]] = markup
+        return tokens[markup]
+
+    masked.msgid = _MASK_RE.sub(placeholder, entry.msgid)
+    masked.msgid_plural = _MASK_RE.sub(placeholder, entry.msgid_plural) if entry.msgid_plural else entry.msgid_plural
+    return masked
+
+
+def _markup_start_ok(char: str) -> bool:
+    """docutils: an inline markup start-string follows whitespace, an opening bracket/quote or a delimiter"""
+    return char.isascii() or char.isspace() or unicodedata.category(char) in ("Ps", "Pi", "Pf", "Pd", "Po")
+
+
+def _markup_end_ok(char: str) -> bool:
+    """docutils: an inline markup end-string precedes whitespace, a closing bracket/quote or a delimiter"""
+    return char.isascii() or char.isspace() or unicodedata.category(char) in ("Pe", "Pi", "Pf", "Pd", "Po")
+
+
+def escape_markup_boundaries(text: str, source: str) -> str:
+    """
+    Insert escaped spaces where inline markup touches a non-ASCII character docutils does not accept next
+    to it, typically a CJK character: 使用``make``命令 becomes 使用\\ ``make``\\ 命令 (rendered without the
+    spaces). ASCII neighbours are left alone, as they come from the (English) source text itself.
+    Emphasis is only considered if the source text has any, so a literal asterisk is never turned into markup.
+    """
+    pieces = []
+    last = 0
+    for match in _INLINE_MARKUP_RE.finditer(text):
+        start, end = match.span()
+        if text[start] == "*" and "*" not in source:
+            continue
+        pieces.append(text[last:start])
+        if start > 0 and not _markup_start_ok(text[start - 1]):
+            pieces.append("\\ ")
+        pieces.append(match.group(0))
+        if end < len(text) and not _markup_end_ok(text[end]):
+            pieces.append("\\ ")
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+def _markup_tokens(text: str) -> List[str]:
+    return sorted(_MASK_RE.findall(text) + _PLACEHOLDER_RE.findall(text))
+
+
+def markup_errors(source: str, translation: str) -> List[str]:
+    """Markup a translation lost, duplicated or unbalanced compared with its source text (empty if intact)"""
+    errors = []
+    source_tokens, translated_tokens = _markup_tokens(source), _markup_tokens(translation)
+    if source_tokens != translated_tokens:
+        missing = Counter(source_tokens) - Counter(translated_tokens)
+        unexpected = Counter(translated_tokens) - Counter(source_tokens)
+        if missing:
+            errors.append("missing " + ", ".join(sorted(missing)))
+        if unexpected:
+            errors.append("unexpected " + ", ".join(sorted(unexpected)))
+    # Emphasis and the backquotes of titled hyperlinks are translated around, but must stay balanced
+    for marker in ("*", "`"):
+        expected = source.count(marker) - sum(token.count(marker) for token in source_tokens)
+        found = translation.count(marker) - sum(token.count(marker) for token in translated_tokens)
+        if found != expected:
+            errors.append(f"{found} '{marker}' instead of {expected}")
+    return errors
+
+
+def validate_batch_markup(entries: List[polib.POEntry], mask_markup: bool = False) -> Dict[int, str]:
+    """
+    Post-process the translated entries of a batch in one pass with the precompiled patterns above:
+    put masked markup back, escape markup that touches CJK text and check the result against the source.
+    Entries with lost, duplicated or unbalanced markup are reset to untranslated so the retry handling
+    re-sends them. Returns id(entry) -> error message of the rejected entries.
+    Markup is also put back in entries that stay untranslated, such as fuzzy or half-answered plural
+    entries, so a placeholder never reaches a saved catalog.
+    """
+    rejected = {}
+    for entry in entries:
+        if not entry.msgstr and not any((entry.msgstr_plural or {}).values()):
+            continue
+        placeholders = mask_entry(entry).placeholders if mask_markup else {}
+
+        def restore(text: str, source: str) -> str:
+            if placeholders:
+                text = _PLACEHOLDER_RE.sub(lambda match: placeholders.get(match.group(0), match.group(0)), text)
+            return escape_markup_boundaries(text, source)
+
+        errors = []
+        if entry.msgstr:
+            entry.msgstr = restore(entry.msgstr, entry.msgid)
+            errors += markup_errors(entry.msgid, entry.msgstr)
+        if entry.msgid_plural:
+            for key, text in (entry.msgstr_plural or {}).items():
+                source = entry.msgid if int(key) == 0 else entry.msgid_plural
+                entry.msgstr_plural[key] = restore(text, source)
+                errors += markup_errors(source, entry.msgstr_plural[key])
+        if errors and entry.translated():
+            rejected[id(entry)] = "Broken markup: " + "; ".join(errors)
+            entry.msgstr = ""
+            if entry.msgstr_plural:
+                entry.msgstr_plural = {key: "" for key in entry.msgstr_plural}
+    return rejected
 
 
 # -------------------- Prompt Construction --------------------
-def build_prompt_for_batch(entries: List[polib.POEntry], po_path: str, target_lang: str, start_index: int = 1) -> str:
-    """Build a structured prompt for batch translation"""
+PROMPT_FORMATS = ("compact", "legacy")
+
+
+def _translation_instruction(target_lang: str) -> str:
     if target_lang.startswith("zh"):
-        translation_instruction = "Translate the following English content into Simplified Chinese"
+        return "Translate the following English content into Simplified Chinese"
     elif target_lang.startswith("en"):
-        translation_instruction = "Translate the following non-English content into English (keep original if already in English)"
-    else:
-        translation_instruction = f"Translate the following content into {target_lang}"
-
-    prompt_parts = []
-    header = (f"You are a professional technical document translator specializing in semiconductor and FPGA fields.\n"
-              f"{translation_instruction}, while strictly preserving all reStructuredText markup (e.g., :ref:, :doc:, **bold**, ``code``, link tags).\n"
-              "DO NOT add any extra explanations—only return valid JSON (follow format requirements below).\n\n"
-              "Response Requirements (Critical):\n"
-              "1) Output a single JSON object where keys are entry numbers (as strings: e.g., \"1\", \"2\") and values are translation objects.\n"
-              "2) For singular entries (no msgid_plural): Value = {\"translation\": \"Translated text here\"}\n"
-              "3) For plural entries (with msgid_plural): Value MUST include a \"plural\" key (array of plural translations: e.g., [\"1 item\", \"2+ items\"])\n"
-              "4) Maintain consistent technical terminology. NEVER include content other than JSON (no comments, notes, or line breaks).\n\n"
-              "Entry List (Translate these):\n")
-    prompt_parts.append(header)
-
-    current_idx = start_index
-    for entry in entries:
-        occurrences = ", ".join([":".join(map(str, occ)) for occ in (entry.occurrences or [])]) or "Unknown location"
-        
-        prompt_parts.append(f"### Entry {current_idx} \n")
-        prompt_parts.append(f"PO File: {po_path} \n")
-        prompt_parts.append(f"Source Location: {occurrences} \n")
-        if entry.msgctxt:
-            prompt_parts.append(f"Context: {entry.msgctxt} \n")
-        prompt_parts.append(f"Singular Text to Translate:\n{entry.msgid}\n")
-        
-        if entry.msgid_plural:
-            prompt_parts.append(f"Plural Text to Translate:\n{entry.msgid_plural}\n")
-        
-        prompt_parts.append("\n" + "-"*50 + "\n")
-        current_idx += 1
+        return "Translate the following non-English content into English (keep original if already in English)"
+    return f"Translate the following content into {target_lang}"
+
+
+def build_prompt_header(target_lang: str, mask_markup: bool = False) -> str:
+    """Fixed instruction header shared by every batch of a target language (legacy layout)"""
+    translation_instruction = _translation_instruction(target_lang)
+    placeholder_rule = f"5) {MARKUP_PLACEHOLDER_NOTE}\n" if mask_markup else ""
+
+    return (f"You are a professional technical document translator specializing in semiconductor and FPGA fields.\n"
+            f"{translation_instruction}, while strictly preserving all reStructuredText markup (e.g., :ref:, :doc:, **bold**, ``code``, link tags).\n"
+            "DO NOT add any extra explanations—only return valid JSON (follow format requirements below).\n\n"
+            "Response Requirements (Critical):\n"
+            "1) Output a single JSON object where keys are entry numbers (as strings: e.g., \"1\", \"2\") and values are translation objects.\n"
+            "2) For singular entries (no msgid_plural): Value = {\"translation\": \"Translated text here\"}\n"
+            "3) For plural entries (with msgid_plural): Value MUST include a \"plural\" key (array of plural translations: e.g., [\"1 item\", \"2+ items\"])\n"
+            "4) Maintain consistent technical terminology. NEVER include content other than JSON (no comments, notes, or line breaks).\n"
+            f"{placeholder_rule}\n"
+            "Entry List (Translate these):\n")
+
+
+def build_compact_prompt_header(target_lang: str, mask_markup: bool = False) -> str:
+    """
+    Instruction header of the compact layout. It depends on nothing but the target language (and whether
+    markup is masked), so every request of a language starts with the same bytes and the provider's
+    prefix cache can serve it.
+    """
+    translation_instruction = _translation_instruction(target_lang)
+    placeholder_note = f"{MARKUP_PLACEHOLDER_NOTE}\n" if mask_markup else ""
+
+    return (f"You are a professional technical document translator specializing in semiconductor and FPGA fields.\n"
+            f"{translation_instruction}, strictly preserving all reStructuredText markup "
+            "(:ref:, :doc:, **bold**, ``code``, links) and keeping technical terminology consistent.\n"
+            "Input: entries grouped under \"# <source document>\" lines, one entry per line in one of the forms\n"
+            "N: \"text\"\n"
+            "N (context \"ctx\"): \"text\"\n"
+            "N: \"singular\" | plural: \"plural\"\n"
+            "Texts are JSON strings (\\n is a line break).\n"
+            f"{placeholder_note}"
+            "Output: a single JSON object and nothing else, keyed by entry number as a string, e.g.\n"
+            "{\"1\": {\"translation\": \"...\"}, \"2\": {\"translation\": \"...\", \"plural\": [\"...\", \"...\"]}}\n"
+            "Plural entries MUST include the \"plural\" array.\n\n"
+            "Entries:")
+
+
+def build_prompt_entry_parts(entry: polib.POEntry, index: int, po_path: str) -> List[str]:
+    """Prompt lines describing a single entry (legacy layout)"""
+    occurrences = ", ".join([":".join(map(str, occ)) for occ in (entry.occurrences or [])]) or "Unknown location"
+
+    parts = [
+        f"### Entry {index} \n",
+        f"PO File: {po_path} \n",
+        f"Source Location: {occurrences} \n",
+    ]
+    if entry.msgctxt:
+        parts.append(f"Context: {entry.msgctxt} \n")
+    parts.append(f"Singular Text to Translate:\n{entry.msgid}\n")
+
+    if entry.msgid_plural:
+        parts.append(f"Plural Text to Translate:\n{entry.msgid_plural}\n")
+
+    parts.append("\n" + "-"*50 + "\n")
+    return parts
+
+
+PROMPT_FOOTER_PARTS = [
+    "JSON Format Example (Replace with YOUR translations—no comments):\n",
+    "{\n",
+    '  "1": {"translation": "Device initialization steps"},\n',
+    '  "2": {"translation": "Configuration file", "plural": ["1 configuration file", "Multiple configuration files"]}\n',
+    "}\n",
+]
+
+
+_PARENT_DIR_RE = re.compile(r"^(?:\.\./)+")
+
+
+def prompt_source_label(entry: polib.POEntry, po_path: str) -> str:
+    """Source document an entry is listed under in the compact layout (line numbers are dropped)"""
+    if entry.occurrences:
+        return _PARENT_DIR_RE.sub("", entry.occurrences[0][0].replace("\\", "/"))
+    normalized = po_path.replace("\\", "/")
+    if "/LC_MESSAGES/" in normalized:
+        return normalized.split("/LC_MESSAGES/", 1)[1]
+    return os.path.basename(normalized)
+
+
+def build_compact_entry_line(entry: polib.POEntry, index: int) -> str:
+    """Single prompt line describing an entry (compact layout)"""
+    line = str(index)
+    if entry.msgctxt:
+        line += f" (context {json.dumps(entry.msgctxt, ensure_ascii=False)})"
+    line += f": {json.dumps(entry.msgid, ensure_ascii=False)}"
+    if entry.msgid_plural:
+        line += f" | plural: {json.dumps(entry.msgid_plural, ensure_ascii=False)}"
+    return line
+
+
+def build_prompt_for_batch(entries: List[polib.POEntry], po_path: str, target_lang: str, start_index: int = 1,
+                           entry_po_paths: List[str] = None, prompt_format: str = "compact",
+                           glossary: Glossary = None, mask_markup: bool = False) -> str:
+    """
+    Build a structured prompt for batch translation (entry_po_paths overrides po_path per entry).
+    With a glossary, only the terms occurring in the batch are listed, after the entries.
+    With mask_markup, inline markup is sent as {N} placeholders (see mask_entry and validate_batch_markup).
+    """
+    if mask_markup:
+        entries = [mask_entry(entry) for entry in entries]
+    glossary_lines = build_glossary_lines(glossary.terms_for_entries(entries, target_lang)) if glossary else []
+    if prompt_format == "legacy":
+        prompt_parts = [build_prompt_header(target_lang, mask_markup)]
+
+        for pos, entry in enumerate(entries):
+            entry_po_path = entry_po_paths[pos] if entry_po_paths else po_path
+            prompt_parts.extend(build_prompt_entry_parts(entry, start_index + pos, entry_po_path))
+
+        if glossary_lines:
+            prompt_parts.append("\n".join(glossary_lines) + "\n")
+        prompt_parts.extend(PROMPT_FOOTER_PARTS)
+        return "\n".join(prompt_parts)
+
+    # Everything that varies between batches comes after the shared header
+    prompt_lines = [build_compact_prompt_header(target_lang, mask_markup)]
+    current_label = None
+    for pos, entry in enumerate(entries):
+        label = prompt_source_label(entry, entry_po_paths[pos] if entry_po_paths else po_path)
+        if label != current_label:
+            prompt_lines.append(f"# {label}")
+            current_label = label
+        prompt_lines.append(build_compact_entry_line(entry, start_index + pos))
+    prompt_lines.extend(glossary_lines)
+    return "\n".join(prompt_lines) + "\n"
+
+
+def prompt_token_summary(entries: List[polib.POEntry], po_path: str, target_lang: str, start_index: int = 1,
+                         entry_po_paths: List[str] = None, prompt_format: str = "compact",
+                         tokenizer="heuristic", glossary: Glossary = None, mask_markup: bool = False) -> str:
+    """One-line input token report for a batch, compared against the other prompt layout"""
+    count_tokens = get_tokenizer(tokenizer)
+    other_format = "legacy" if prompt_format != "legacy" else "compact"
+    tokens, other_tokens = [
+        count_tokens(build_prompt_for_batch(entries, po_path, target_lang, start_index, entry_po_paths, fmt, glossary,
+                                            mask_markup))
+        for fmt in (prompt_format, other_format)
+    ]
+    per_entry = len(entries) or 1
+    summary = (f"{tokens} input tokens ({tokens / per_entry:.1f}/entry) with the {prompt_format} layout, "
+               f"{other_tokens} ({other_tokens / per_entry:.1f}/entry) with the {other_format} layout")
+    if glossary is not None:
+        glossary_text = "\n".join(build_glossary_lines(glossary.terms_for_entries(entries, target_lang)))
+        summary += f" (glossary terms: {count_tokens(glossary_text) if glossary_text else 0} tokens)"
+    if mask_markup:
+        unmasked = count_tokens(build_prompt_for_batch(entries, po_path, target_lang, start_index, entry_po_paths,
+                                                       prompt_format, glossary))
+        summary += f" ({unmasked} without markup masking)"
+    return summary
+
+
+# -------------------- Adaptive Rate Limiting --------------------
+class RateLimiter:
+    """
+    Token-bucket limiter for requests and tokens per minute, shared by every thread and (through
+    the pool initializer) every worker process. A rate-limit response pauses all workers at once,
+    and a circuit breaker stops traffic for a cooldown after repeated consecutive failures.
+    """
+    _REQUESTS, _TOKENS, _LAST_REFILL, _BLOCKED_UNTIL, _FAILURES = range(5)
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 failure_threshold: int = 5, cooldown_secs: float = 30.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.failure_threshold = failure_threshold
+        self.cooldown_secs = cooldown_secs
+        # Plain shared memory guarded by one lock works for both threads and processes
+        self.lock = MP_CONTEXT.Lock()
+        self.state = MP_CONTEXT.RawArray(
+            "d", [requests_per_minute or 0.0, tokens_per_minute or 0.0, time.time(), 0.0, 0.0]
+        )
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self.state[self._LAST_REFILL])
+        self.state[self._LAST_REFILL] = now
+        if self.requests_per_minute:
+            self.state[self._REQUESTS] = min(self.requests_per_minute,
+                                             self.state[self._REQUESTS] + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self.state[self._TOKENS] = min(self.tokens_per_minute,
+                                           self.state[self._TOKENS] + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request carrying about `tokens` tokens may be sent"""
+        while True:
+            with self.lock:
+                now = time.time()
+                self._refill(now)
+                wait = self.state[self._BLOCKED_UNTIL] - now
+                if wait <= 0:
+                    need_requests = 1 if self.requests_per_minute else 0
+                    need_tokens = min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+                    if self.state[self._REQUESTS] >= need_requests and self.state[self._TOKENS] >= need_tokens:
+                        self.state[self._REQUESTS] -= need_requests
+                        self.state[self._TOKENS] -= need_tokens
+                        return
+                    wait = max(
+                        (need_requests - self.state[self._REQUESTS]) * 60 / self.requests_per_minute
+                        if self.requests_per_minute else 0,
+                        (need_tokens - self.state[self._TOKENS]) * 60 / self.tokens_per_minute
+                        if self.tokens_per_minute else 0
+                    )
+            # Jitter keeps waiting workers from waking up in lockstep
+            time.sleep(wait + random.uniform(0, 0.1 * wait + 0.01))
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a request is known"""
+        if not self.tokens_per_minute or actual_tokens is None:
+            return
+        with self.lock:
+            self.state[self._TOKENS] += min(estimated_tokens, self.tokens_per_minute) - actual_tokens
 
-    prompt_parts.append("JSON Format Example (Replace with YOUR translations—no comments):\n")
-    prompt_parts.append("{\n")
-    prompt_parts.append('  "1": {"translation": "Device initialization steps"},\n')
-    prompt_parts.append('  "2": {"translation": "Configuration file", "plural": ["1 configuration file", "Multiple configuration files"]}\n')
-    prompt_parts.append("}\n")
+    def pause(self, delay_secs: float):
+        """Hold back every worker for delay_secs (e.g. from a Retry-After header)"""
+        with self.lock:
+            self.state[self._BLOCKED_UNTIL] = max(self.state[self._BLOCKED_UNTIL], time.time() + delay_secs)
 
-    return "\n".join(prompt_parts)
+    def record_success(self):
+        with self.lock:
+            self.state[self._FAILURES] = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.state[self._FAILURES] += 1
+            if self.state[self._FAILURES] >= self.failure_threshold:
+                self.state[self._BLOCKED_UNTIL] = max(self.state[self._BLOCKED_UNTIL], time.time() + self.cooldown_secs)
+                print(f"  Circuit breaker open: {int(self.state[self._FAILURES])} consecutive failures, "
+                      f"pausing requests for {self.cooldown_secs:.0f} seconds")
+
+
+def _parse_duration(value: str) -> float:
+    """Parse rate-limit durations such as '2', '1.5s', '250ms' or '6m0s' into seconds"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value)
+    if not parts:
+        raise ValueError(f"Unrecognized duration: {value}")
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def retry_delay_from_headers(headers) -> float:
+    """Delay requested by Retry-After / rate-limit headers, or None"""
+    if not headers:
+        return None
+    delays = []
+    if headers.get("retry-after-ms"):
+        try:
+            delays.append(float(headers["retry-after-ms"]) / 1000)
+        except ValueError:
+            pass
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if headers.get(name):
+            try:
+                delays.append(_parse_duration(headers[name]))
+            except ValueError:
+                pass
+    return max(delays) if delays else None
 
 
 # -------------------- DeepSeek API Call --------------------
-def call_deepseek(client: OpenAI, prompt: str, max_retries: int = 2, temperature: float = 0.0) -> str:
-    """Call DeepSeek API with retries for transient errors"""
+RETRY_BACKOFF_BASE_SECS = 1.0
+RETRY_BACKOFF_CAP_SECS = 60.0
+
+
+def call_deepseek(client: "OpenAI", prompt: str, max_retries: int = 5, temperature: float = 0.0,
+                  model: str = DEEPSEEK_MODEL, max_tokens: int = MAX_OUTPUT_TOKENS,
+                  rate_limiter: RateLimiter = None, stream: bool = False,
+                  on_entry: Callable[[str, Any], None] = None, stats: Dict[str, Any] = None) -> str:
+    """
+    Call DeepSeek API, paced by the shared rate limiter. Throttling and transient errors are retried
+    with jittered exponential backoff, never shorter than what Retry-After asks for.
+    With stream=True the completion is streamed and on_entry(key, value) is called for every
+    response entry as soon as it is complete; an interrupted stream returns what was received.
+    When a stats dict is given, attempts, time spent throttled and on the network, and the token
+    usage reported by the API are recorded in it.
+    With an EndpointPool as client every attempt is routed to one of its endpoints, failing over to
+    another healthy endpoint without backing off; rate_limiter then caps the pool as a whole and
+    throttling only sidelines the endpoint that was throttled.
+    """
+    stats = {} if stats is None else stats
+    estimated_tokens = estimate_tokens(prompt) * 2
+    stats["estimated_prompt_tokens"] = estimated_tokens // 2
+    pool = client if isinstance(client, EndpointPool) else None
+    endpoint = None
     for attempt in range(1, max_retries + 1):
+        if rate_limiter is not None:
+            with timed(stats, "throttle"):
+                rate_limiter.acquire(estimated_tokens)
+        api_client, request_model = client, model
+        if pool is not None:
+            endpoint = pool.acquire(avoid=endpoint)
+            api_client, request_model = endpoint.client, endpoint.model or model
+            stats["endpoint"] = endpoint.name
+            if endpoint.rate_limiter is not None:
+                with timed(stats, "throttle"):
+                    endpoint.rate_limiter.acquire(estimated_tokens)
+        stats["attempts"] = attempt
         try:
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=8192
-            )
-            return response.choices[0].message.content
+            with timed(stats, "network"):
+                raw_response = api_client.chat.completions.with_raw_response.create(
+                    model=request_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=stream,
+                    **({"stream_options": {"include_usage": True}} if stream else {})
+                )
+                if stream:
+                    content, usage = _consume_stream(raw_response.parse(), on_entry)
+                else:
+                    response = raw_response.parse()
+                    content = response.choices[0].message.content
+                    usage = getattr(response, "usage", None)
         
         except Exception as e:
             error_msg = str(e)[:100] + "..." if len(str(e)) > 100 else str(e)
             print(f"  DeepSeek API call failed (Attempt {attempt}/{max_retries}): {error_msg}")
-            
+
+            status = getattr(e, "status_code", None)
+            # A rejected key or unknown URL is a fault of the endpoint, not of the request
+            endpoint_broken = pool is not None and status in ENDPOINT_DISABLE_STATUSES
+            if status is not None and 400 <= status < 500 and status not in (408, 409, 429) and not endpoint_broken:
+                if pool is not None:
+                    pool.release(endpoint)
+                raise RuntimeError(f"API call rejected with status {status}") from e
+
+            retry_after = retry_delay_from_headers(getattr(getattr(e, "response", None), "headers", None))
+            if pool is not None:
+                pool.release(endpoint, failed=True, retry_after=retry_after, disable=endpoint_broken)
+            elif rate_limiter is not None:
+                rate_limiter.record_failure()
+                if retry_after:
+                    rate_limiter.pause(retry_after)
+
+            if attempt < max_retries and pool is not None and pool.has_alternative(endpoint):
+                stats["failovers"] = stats.get("failovers", 0) + 1
+                continue
             if attempt < max_retries:
-                sleep_time = 1 + 2 * attempt
-                print(f"  Retrying in {sleep_time} seconds...")
+                # Full jitter: spread retries of concurrent workers over the whole backoff window
+                backoff = random.uniform(0, min(RETRY_BACKOFF_CAP_SECS, RETRY_BACKOFF_BASE_SECS * 2 ** attempt))
+                sleep_time = max(backoff, retry_after or 0)
+                print(f"  Retrying in {sleep_time:.1f} seconds...")
                 time.sleep(sleep_time)
-            else:
-                raise RuntimeError(f"API call failed after {max_retries} retries") from e
+                continue
+            raise RuntimeError(f"API call failed after {max_retries} retries") from e
+
+        record_usage(stats, usage)
+        headers = raw_response.headers
+        quota_exhausted = (headers.get("x-ratelimit-remaining-requests") == "0"
+                           or headers.get("x-ratelimit-remaining-tokens") == "0")
+        if pool is not None:
+            pool.release(endpoint)
+            if endpoint.rate_limiter is not None:
+                endpoint.rate_limiter.settle(estimated_tokens, getattr(usage, "total_tokens", None))
+            # Quota of this endpoint exhausted for this window: route around it until the reset
+            retry_after = retry_delay_from_headers(headers) if quota_exhausted else None
+            if retry_after:
+                pool.cool_down(endpoint, retry_after)
+        if rate_limiter is not None:
+            rate_limiter.record_success()
+            rate_limiter.settle(estimated_tokens, getattr(usage, "total_tokens", None))
+            # Quota exhausted for this window: wait for the reset before the next request goes out
+            if quota_exhausted and pool is None:
+                retry_after = retry_delay_from_headers(headers)
+                if retry_after:
+                    rate_limiter.pause(retry_after)
+        return content
     
     raise RuntimeError("Failed to complete DeepSeek API call (unexpected path)")
 
 
+def record_usage(stats: Dict[str, Any], usage):
+    """Copy token usage of a completion into stats (cached prompt tokens as reported by DeepSeek or OpenAI)"""
+    if usage is None:
+        return
+    stats["prompt_tokens"] = getattr(usage, "prompt_tokens", None) or 0
+    stats["completion_tokens"] = getattr(usage, "completion_tokens", None) or 0
+    cached_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached_tokens is None:
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    stats["cached_tokens"] = cached_tokens or 0
+
+
+def _consume_stream(stream, on_entry: Callable[[str, Any], None] = None) -> Tuple[str, Any]:
+    """
+    Collect a streamed completion, reporting entries as they complete; keep partial text on errors.
+    Returns (content, usage), where usage is only sent with the final chunk of a complete stream.
+    """
+    parser = IncrementalEntryParser()
+    parts = []
+    usage = None
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            if on_entry is not None:
+                for key, value in parser.feed(delta):
+                    on_entry(key, value)
+    except Exception as e:
+        if not parts:
+            raise
+        print(f"  Warning: Stream interrupted after {sum(len(part) for part in parts)} characters: {str(e)[:100]}")
+    return "".join(parts), usage
+
+
 # -------------------- Parse API Response --------------------
 def parse_json_from_response(text: str) -> Any:
     """Parse JSON from API response, handling extra text"""
     try:
         return json.loads(text)
     except json.JSONDecodeError:
-        json_match = re.search(r"(\{[\s\S]*?\}|(\[)[\s\S]*?\])", text)
-        if json_match:
+        # Decode the first complete JSON value embedded in surrounding text (nested objects included)
+        decoder = json.JSONDecoder()
+        last_error = None
+        for json_start in re.finditer(r"[\{\[]", text):
             try:
-                return json.loads(json_match.group(1))
+                return decoder.raw_decode(text, json_start.start())[0]
             except json.JSONDecodeError as e:
-                raise ValueError(f"Extracted JSON fragment failed to parse: {str(e)}") from e
-        else:
-            raise ValueError("No valid JSON found in API response (model may have added extra text)")
+                last_error = last_error or e
+        if last_error is not None:
+            raise ValueError(f"Extracted JSON fragment failed to parse: {str(last_error)}") from last_error
+        raise ValueError("No valid JSON found in API response (model may have added extra text)")
+
+
+class IncrementalEntryParser:
+    """
+    Incremental parser for the top-level {"N": {...}, ...} object returned by the model.
+    Each entry is decoded as soon as its value is complete, so a streamed or truncated response
+    still yields every entry that arrived before the cut. Entries of a top-level array are keyed
+    from start_index (and ignored when start_index is None).
+    """
+
+    def __init__(self, start_index: int = None):
+        self.start_index = start_index
+        self.text = ""
+        self.pos = 0
+        self.depth = 0
+        self.top_level = None
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.key = None
+        self.value_start = None
+        self.array_count = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume more response text and return the entries completed by it"""
+        self.text += chunk
+        text = self.text
+        completed = []
+        for i in range(self.pos, len(text)):
+            ch = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.top_level == "{" and self.value_start is None:
+                        try:
+                            self.key = json.loads(text[self.string_start:i + 1])
+                        except ValueError:
+                            self.key = None
+                continue
+
+            if ch == '"':
+                if self.depth > 0:
+                    self.in_string = True
+                    self.string_start = i
+            elif ch in "{[":
+                if self.depth == 0:
+                    self.top_level = ch
+                elif self.depth == 1 and self.value_start is None:
+                    if self.top_level == "[":
+                        self.array_count += 1
+                        if self.start_index is not None:
+                            self.key = str(self.start_index + self.array_count - 1)
+                    if self.key is not None:
+                        self.value_start = i
+                self.depth += 1
+            elif ch in "}]" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 1 and self.value_start is not None:
+                    try:
+                        completed.append((self.key, json.loads(text[self.value_start:i + 1])))
+                    except ValueError:
+                        pass
+                    self.key = None
+                    self.value_start = None
+        self.pos = len(text)
+        return completed
+
+
+def salvage_json_entries(text: str, start_index: int = 1) -> Dict[str, Any]:
+    """Recover every complete entry from a truncated or otherwise broken JSON response"""
+    return dict(IncrementalEntryParser(start_index).feed(text))
+
+
+def parse_batch_response(text: str, start_index: int = 1,
+                         streamed: Dict[str, Any] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse a batch response into {entry number: translation object}.
+    Returns (parsed, complete); incomplete responses are salvaged entry by entry and raise
+    ValueError only when nothing at all could be recovered.
+    Entries the stream already reported complete (streamed) fill in whatever the text lacks.
+    """
+    try:
+        parsed = parse_json_from_response(text)
+        if isinstance(parsed, list):
+            parsed = {str(start_index + i): item for i, item in enumerate(parsed)}
+        # A fragment such as a lone {"translation": ...} object means the outer object was broken
+        if not isinstance(parsed, dict) or not any(str(key).strip().isdigit() for key in parsed):
+            raise ValueError("Response JSON is not an object keyed by entry numbers")
+        complete = True
+    except ValueError as e:
+        parsed = salvage_json_entries(text, start_index)
+        if not parsed and not streamed:
+            raise
+        complete = False
+        print(f"  Warning: Incomplete response ({str(e)[:80]}); salvaged {len(parsed or streamed)} complete entries")
+    for key, value in (streamed or {}).items():
+        parsed.setdefault(key, value)
+    return parsed, complete
+
+
+def make_entry_collector(entries: List[polib.POEntry],
+                         start_index: int) -> Tuple[Dict[str, Any], Callable[[str, Any], None]]:
+    """
+    Streaming callback that buffers the completed response entries of a batch as they arrive.
+    Returns (received, callback). The callback runs in a worker thread and never touches the
+    POEntry objects: the buffered entries are applied, unmasked and validated together with the
+    rest of the batch on the main thread, so no masked text can reach a save or checkpoint.
+    """
+    received = {}
+
+    def collect_entry(key: str, value: Any):
+        try:
+            pos = int(key) - start_index
+        except (TypeError, ValueError):
+            return
+        if 0 <= pos < len(entries) and isinstance(value, dict) and "translation" in value:
+            received[key] = value
+    return received, collect_entry
 
 
 # -------------------- Apply Translations to PO File --------------------
@@ -246,19 +2516,132 @@ def apply_translations_to_entries(entries: List[polib.POEntry], parsed: Dict[str
     return success_count, failure_count
 
 
+# -------------------- Failed-Entry Retry --------------------
+def plan_entry_retries(
+    batch_entries: List[polib.POEntry],
+    outcome: str,
+    error: str,
+    attempts: Dict[int, int],
+    last_errors: Dict[int, str],
+    max_entry_attempts: int = 3,
+    entry_errors: Dict[int, str] = None
+) -> Tuple[List[List[polib.POEntry]], List[polib.POEntry]]:
+    """
+    Decide how to re-send the entries of a finished batch that are still untranslated.
+    outcome is 'partial' (some entries came back), 'unparseable' (nothing usable in the response)
+    or 'api_error' (the request itself failed). An unparseable batch is split in half without
+    charging its entries, so one pathological entry is isolated instead of failing its neighbours;
+    in every other case each leftover entry is charged one attempt and re-sent as a single batch.
+    Entries that used up max_entry_attempts are returned as dead.
+    entry_errors (id(entry) -> error) replaces error for single entries, e.g. those rejected by validate_batch_markup.
+    Returns (retry_batches, dead_entries).
+    """
+    entry_errors = entry_errors or {}
+    failed_entries = [entry for entry in batch_entries if not entry.translated()]
+    if outcome == "unparseable" and len(failed_entries) > 1:
+        for entry in failed_entries:
+            last_errors[id(entry)] = entry_errors.get(id(entry), error)
+        middle = len(failed_entries) // 2
+        return [failed_entries[:middle], failed_entries[middle:]], []
+
+    retry_entries = []
+    dead_entries = []
+    for entry in failed_entries:
+        attempts[id(entry)] = attempts.get(id(entry), 0) + 1
+        last_errors[id(entry)] = entry_errors.get(id(entry), error)
+        if attempts[id(entry)] >= max_entry_attempts:
+            dead_entries.append(entry)
+        else:
+            retry_entries.append(entry)
+    return ([retry_entries] if retry_entries else []), dead_entries
+
+
+def _write_entry_report(name: str, target_lang: str, kind: str, records: List[Dict[str, Any]]) -> str:
+    """Write per-entry report records to responses/<lang>/<name>.<kind>.jsonl"""
+    debug_dir = os.path.join("responses", target_lang)
+    os.makedirs(debug_dir, exist_ok=True)
+
+    report_path = os.path.join(debug_dir, f"{name}.{kind}.jsonl")
+    with open(report_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return report_path
+
+
+def save_dead_letter_report(name: str, target_lang: str, records: List[Dict[str, Any]]):
+    """Write entries that exhausted their retry budget to responses/<lang>/<name>.dead_letter.jsonl"""
+    if not records:
+        return
+    report_path = _write_entry_report(name, target_lang, "dead_letter", records)
+    print(f"  {len(records)} entries could not be translated, see dead-letter report {report_path}")
+
+
+def save_glossary_report(name: str, target_lang: str, records: List[Dict[str, Any]]):
+    """Write translations that do not use the expected glossary terms to responses/<lang>/<name>.glossary.jsonl"""
+    if not records:
+        return
+    report_path = _write_entry_report(name, target_lang, "glossary", records)
+    print(f"  {len(records)} translations do not use the expected glossary terms, see {report_path}")
+
+
+def dead_letter_record(entry: polib.POEntry, po_path: str, attempts: Dict[int, int],
+                       last_errors: Dict[int, str]) -> Dict[str, Any]:
+    return {
+        "po_path": po_path,
+        "msgctxt": entry.msgctxt,
+        "msgid": entry.msgid,
+        "msgid_plural": entry.msgid_plural or None,
+        "occurrences": [":".join(map(str, occ)) for occ in (entry.occurrences or [])],
+        "attempts": attempts.get(id(entry), 0),
+        "last_error": last_errors.get(id(entry)),
+    }
+
+
 # -------------------- Core PO File Processing --------------------
+# Untranslated entries read at a time from a streamed catalog by the per-file scheduler
+LOW_MEMORY_WINDOW = 2000
+
+
 def translate_po_file_batch(
     po_path: str,
-    client: OpenAI,
+    client: "OpenAI",
     target_lang: str,
     batch_size: int = 10,
-    max_chars: int = 8000,
-    sleep_secs: float = 1.0,
+    max_chars: int = None,
+    sleep_secs: float = 0.0,
     dry_run: bool = False,
     save_backup: bool = True,
-    verbose: bool = True
+    verbose: bool = True,
+    inflight_batches: int = 1,
+    tm_path: str = None,
+    max_input_tokens: int = 16000,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    tokenizer: str = "heuristic",
+    journal: bool = False,
+    checkpoint_secs: float = 60.0,
+    max_retries: int = 5,
+    rate_limiter: RateLimiter = None,
+    stream: bool = False,
+    max_entry_attempts: int = 3,
+    prompt_format: str = "compact",
+    metrics: MetricsRecorder = None,
+    low_memory: bool = False,
+    low_memory_window: int = LOW_MEMORY_WINDOW,
+    glossary_path: str = None,
+    fuzzy_threshold: float = None,
+    mask_markup: bool = False
 ):
-    """End-to-end processing for a single PO file"""
+    """
+    End-to-end processing for a single PO file.
+    With low_memory the catalog is streamed (see StreamingCatalog) and its untranslated entries are
+    translated and written back in windows of low_memory_window entries.
+    With glossary_path the terms of each batch are listed in its prompt and the translations are
+    checked against them (see Glossary).
+    With fuzzy_threshold, entries with a near-duplicate translated source string of at least that
+    similarity reuse its translation instead of being sent (see fill_fuzzy_matches).
+    With mask_markup, inline markup is sent as placeholders and put back afterwards (see mask_entry);
+    translations with broken markup are always rejected and retried (see validate_batch_markup).
+    """
     if target_lang.strip().lower() == "en":
         repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         source_dir = os.path.join(repo_dir, "docs", "source")
@@ -273,80 +2656,855 @@ def translate_po_file_batch(
     print(f"\n[Target Language: {target_lang}] Processing PO file: {po_path}")
     
     try:
-        po_file = polib.pofile(po_path, encoding="utf-8")
+        po_file = load_catalog(po_path, low_memory)
     except Exception as e:
         print(f"  Error: Failed to load PO file: {str(e)}")
         return
 
-    untranslated_entries = [entry for entry in po_file if (not entry.obsolete) and (not entry.translated())]
-    if not untranslated_entries:
-        print(f"  No untranslated entries found. Checking compilation status...")
-        if not dry_run:
-            compile_po_to_mo(po_path, verbose=verbose)
-        return
+    write_journal = WriteBackJournal(po_path, checkpoint_secs) if journal and not dry_run else None
+    if write_journal is not None:
+        replayed = write_journal.replay(po_file)
+        if replayed:
+            print(f"  Replayed {replayed} journaled translations from {write_journal.path}")
 
-    batches = chunk_entries(untranslated_entries, batch_size=batch_size, max_chars=max_chars)
-    print(f"  Total untranslated entries: {len(untranslated_entries)} → Split into {len(batches)} batches")
-    print(f"  Batch constraints: Max {batch_size} entries / {max_chars} characters")
+    if low_memory:
+        windows = po_file.untranslated_windows(low_memory_window)
+    else:
+        windows = iter([[entry for entry in po_file if (not entry.obsolete) and (not entry.translated())]])
+    untranslated_entries = next(windows, [])
 
-    if save_backup and not dry_run:
+    if untranslated_entries and save_backup and not dry_run:
         backup_path = f"{po_path}.{target_lang}.bak"
         if not os.path.exists(backup_path) or os.path.getmtime(po_path) > os.path.getmtime(backup_path):
             po_file.save(backup_path)
             print(f"  Created/updated backup file: {backup_path}")
 
-    for batch_num, batch_entries in enumerate(batches, start=1):
-        print(f"  Processing Batch {batch_num}/{len(batches)} ({len(batch_entries)} entries)...")
-        
-        prompt = build_prompt_for_batch(
-            entries=batch_entries,
-            po_path=po_path,
-            target_lang=target_lang,
-            start_index=(batch_num - 1) * batch_size + 1
-        )
+    memory = TranslationMemory(tm_path) if tm_path else None
+    glossary = load_glossary(glossary_path) if glossary_path else None
+    dead_letters = []
+    glossary_misses = []
+    try:
+        if memory is not None and not dry_run:
+            # Seed the memory with what this catalog already has, then reuse it for the rest
+            memory.store_entries(po_file, target_lang, overwrite=False)
 
-        if dry_run:
+        while untranslated_entries is not None:
+            window_dead_letters, window_glossary_misses = _translate_po_entries(
+                po_file=po_file,
+                po_path=po_path,
+                untranslated_entries=untranslated_entries,
+                client=client,
+                target_lang=target_lang,
+                memory=memory,
+                write_journal=write_journal,
+                batch_size=batch_size,
+                max_chars=max_chars,
+                sleep_secs=sleep_secs,
+                dry_run=dry_run,
+                verbose=verbose,
+                inflight_batches=inflight_batches,
+                max_input_tokens=max_input_tokens,
+                max_output_tokens=max_output_tokens,
+                tokenizer=tokenizer,
+                max_retries=max_retries,
+                rate_limiter=rate_limiter,
+                stream=stream,
+                max_entry_attempts=max_entry_attempts,
+                prompt_format=prompt_format,
+                metrics=metrics,
+                glossary=glossary,
+                fuzzy_threshold=fuzzy_threshold,
+                mask_markup=mask_markup
+            )
+            dead_letters += window_dead_letters
+            glossary_misses += window_glossary_misses
+            if low_memory:
+                # The window has been written back; the next one is read from the updated file
+                po_file.release()
+            untranslated_entries = next(windows, None)
+            if untranslated_entries is not None:
+                print(f"  Next window of {len(untranslated_entries)} untranslated entries")
+    finally:
+        if memory is not None:
+            memory.close()
+        if write_journal is not None:
+            write_journal.close()
+
+    save_dead_letter_report(os.path.basename(po_path), target_lang, dead_letters)
+    save_glossary_report(os.path.basename(po_path), target_lang, glossary_misses)
+    print(f"[Target Language: {target_lang}] Finished processing {po_path}")
+
+
+def _translate_po_entries(po_file, po_path, untranslated_entries, client, target_lang, memory, write_journal,
+                          batch_size, max_chars, sleep_secs, dry_run, verbose, inflight_batches,
+                          max_input_tokens, max_output_tokens, tokenizer, max_retries, rate_limiter, stream,
+                          max_entry_attempts, prompt_format, metrics, glossary=None,
+                          fuzzy_threshold=None, mask_markup=False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Fill cache hits and fuzzy matches, then translate the given entries of a loaded PO file batch by batch.
+    Returns the dead-letter records of entries that exhausted their retry budget and the glossary
+    report records of translations that miss expected terms.
+    """
+    if memory is not None:
+        remaining_entries = memory.fill_entries(untranslated_entries, target_lang)
+        cache_hits = len(untranslated_entries) - len(remaining_entries)
+        if metrics is not None and not dry_run:
+            metrics.record("cache", lang=target_lang, po_path=po_path, hits=cache_hits, misses=len(remaining_entries))
+        if cache_hits:
+            print(f"  Translation memory: {cache_hits} cache hits, {len(remaining_entries)} entries left")
+            if write_journal is not None:
+                write_journal.append(untranslated_entries)
+            elif not dry_run:
+                po_file.save(po_path)
+        untranslated_entries = remaining_entries
+
+    fuzzy_index = None
+    if fuzzy_threshold and untranslated_entries:
+        fuzzy_index = get_fuzzy_index(target_lang, memory, [po_file])
+        remaining_entries, adapted, marked = fill_fuzzy_matches(fuzzy_index, untranslated_entries, fuzzy_threshold)
+        if metrics is not None and not dry_run:
+            metrics.record("fuzzy", lang=target_lang, po_path=po_path, adapted=adapted, marked=marked)
+        if adapted or marked:
+            print(f"  Fuzzy matches: {adapted} adapted, {marked} marked fuzzy for review, "
+                  f"{len(remaining_entries)} entries left")
+            remaining_ids = {id(entry) for entry in remaining_entries}
+            reused_entries = [entry for entry in untranslated_entries if id(entry) not in remaining_ids]
+            if memory is not None and not dry_run:
+                memory.store_entries(reused_entries, target_lang)
+            if write_journal is not None:
+                write_journal.append(reused_entries)
+            elif not dry_run:
+                po_file.save(po_path)
+        untranslated_entries = remaining_entries
+
+    if not untranslated_entries:
+        print(f"  No untranslated entries found. Checking compilation status...")
+        if write_journal is not None and write_journal.pending:
+            write_journal.checkpoint(po_file, verbose=verbose)
+        elif not dry_run:
+            compile_po_to_mo(po_path, verbose=verbose, po_file=po_file)
+        return [], []
+
+    batches = chunk_entries(
+        untranslated_entries,
+        batch_size=batch_size,
+        max_chars=max_chars,
+        max_input_tokens=max_input_tokens,
+        max_output_tokens=max_output_tokens,
+        target_lang=target_lang,
+        po_path=po_path,
+        tokenizer=tokenizer,
+        prompt_format=prompt_format,
+        glossary=glossary,
+        mask_markup=mask_markup
+    )
+    print(f"  Total untranslated entries: {len(untranslated_entries)} → Split into {len(batches)} batches")
+    print(f"  Batch constraints: Max {batch_size} entries / {max_input_tokens} input tokens / "
+          f"{max_output_tokens} output tokens")
+
+    if dry_run:
+        for batch_num, batch_entries in enumerate(batches, start=1):
+            print(f"  Processing Batch {batch_num}/{len(batches)} ({len(batch_entries)} entries)...")
+            start_index = (batch_num - 1) * batch_size + 1
+            prompt = build_prompt_for_batch(
+                entries=batch_entries,
+                po_path=po_path,
+                target_lang=target_lang,
+                start_index=start_index,
+                prompt_format=prompt_format,
+                glossary=glossary,
+                mask_markup=mask_markup
+            )
+            summary = prompt_token_summary(batch_entries, po_path, target_lang, start_index, None, prompt_format,
+                                           tokenizer, glossary, mask_markup)
+            print(f"  [Dry-Run] {summary}")
             print(f"  [Dry-Run] Prompt Preview (first 1500 chars):\n{prompt[:1500]}...")
-            continue
+        return [], []
 
-        try:
-            api_response = call_deepseek(client, prompt)
-        except Exception as e:
-            print(f"  Error: Batch {batch_num} API call failed: {str(e)}")
-            continue
+    inflight_batches = max(1, inflight_batches)
+    if inflight_batches > 1:
+        print(f"  Keeping up to {inflight_batches} batches in flight")
 
-        try:
-            parsed_translations = parse_json_from_response(api_response)
-        except ValueError as e:
-            print(f"  Error: Batch {batch_num} JSON parsing failed: {str(e)}")
-            save_response_debug(po_path, batch_num, target_lang, api_response)
-            continue
+    if client is None:
+        client = get_worker_client()
 
-        if isinstance(parsed_translations, list):
-            parsed_translations = {str(i + 1): item for i, item in enumerate(parsed_translations)}
+    # Requests run concurrently in a thread pool, but results are consumed strictly in
+    # batch order so the PO file is always written back in a deterministic sequence.
+    with ThreadPoolExecutor(max_workers=inflight_batches) as executor:
+        pending = deque()
+        next_batch_index = 0
 
-        success, fail = apply_translations_to_entries(
-            entries=batch_entries,
-            parsed=parsed_translations,
-            start_index=(batch_num - 1) * batch_size + 1
-        )
-        print(f"    Applied translations: {success} successful, {fail} failed")
+        def submit_next_batch():
+            """Build the prompt for the next batch (if any) and send it to the executor"""
+            nonlocal next_batch_index
+            if next_batch_index < len(batches):
+                batch_entries = batches[next_batch_index]
+                next_batch_index += 1
+                batch_num = next_batch_index
+                start_index = (batch_num - 1) * batch_size + 1
+                batch_stats = {}
+                with timed(batch_stats, "prompt"):
+                    prompt = build_prompt_for_batch(
+                        entries=batch_entries,
+                        po_path=po_path,
+                        target_lang=target_lang,
+                        start_index=start_index,
+                        prompt_format=prompt_format,
+                        glossary=glossary,
+                        mask_markup=mask_markup
+                    )
+                streamed, on_entry = make_entry_collector(batch_entries, start_index) if stream else (None, None)
+                future = executor.submit(call_deepseek, client, prompt, max_retries=max_retries,
+                                         max_tokens=max_output_tokens, rate_limiter=rate_limiter, stream=stream,
+                                         on_entry=on_entry, stats=batch_stats)
+                pending.append((batch_num, batch_entries, start_index, future, batch_stats, streamed))
 
-        po_file.save(po_path)
-        print(f"    Saved updates to PO file: {po_path}")
+        def top_up_window():
+            # Only refill after the popped batch is handled so at most inflight_batches requests are outstanding
+            while len(pending) < inflight_batches and next_batch_index < len(batches):
+                submit_next_batch()
 
-        compile_po_to_mo(po_path, verbose=verbose)
-        save_response_debug(po_path, batch_num, target_lang, api_response)
-        time.sleep(sleep_secs)
+        top_up_window()
 
-    print(f"[Target Language: {target_lang}] Finished processing {po_path}")
+        attempts = {}  # id(entry) -> failed requests that included the entry
+        last_errors = {}
+        dead_letters = []
+        glossary_misses = []
+
+        def requeue_failed_entries(batch_entries, outcome, error, entry_errors=None):
+            """Schedule retries for the untranslated entries of a batch and top up the window"""
+            retry_batches, dead_entries = plan_entry_retries(
+                batch_entries, outcome, error, attempts, last_errors, max_entry_attempts, entry_errors
+            )
+            dead_letters.extend(dead_letter_record(entry, po_path, attempts, last_errors) for entry in dead_entries)
+            for retry_entries in retry_batches:
+                batches.append(retry_entries)
+                print(f"    Retrying {len(retry_entries)} failed entries as Batch {len(batches)}")
+            top_up_window()
+
+        def record_batch(batch_num, batch_entries, batch_stats, success, error=None):
+            if metrics is not None:
+                metrics.record_batch(target_lang, po_path, batch_num, len(batch_entries), batch_stats,
+                                     success, len(batch_entries) - success, error)
+
+        while pending:
+            batch_num, batch_entries, start_index, future, batch_stats, streamed = pending.popleft()
+            print(f"  Processing Batch {batch_num}/{len(batches)} ({len(batch_entries)} entries)...")
+
+            try:
+                api_response = future.result()
+            except Exception as e:
+                print(f"  Error: Batch {batch_num} API call failed: {str(e)}")
+                requeue_failed_entries(batch_entries, "api_error", f"API call failed: {str(e)}")
+                record_batch(batch_num, batch_entries, batch_stats, 0, "api_error")
+                continue
+
+            try:
+                with timed(batch_stats, "parse"):
+                    parsed_translations, complete = parse_batch_response(api_response, start_index, streamed)
+            except ValueError as e:
+                print(f"  Error: Batch {batch_num} JSON parsing failed: {str(e)}")
+                save_response_debug(po_path, batch_num, target_lang, api_response)
+                requeue_failed_entries(batch_entries, "unparseable", f"JSON parsing failed: {str(e)}")
+                record_batch(batch_num, batch_entries, batch_stats, 0, "unparseable")
+                continue
+
+            with timed(batch_stats, "apply"):
+                success, fail = apply_translations_to_entries(
+                    entries=batch_entries,
+                    parsed=parsed_translations,
+                    start_index=start_index
+                )
+                rejected = validate_batch_markup(batch_entries, mask_markup)
+            if rejected:
+                success, fail = success - len(rejected), fail + len(rejected)
+                batch_stats["markup_rejected"] = len(rejected)
+            print(f"    Applied translations: {success} successful, {fail} failed")
+            if rejected:
+                print(f"    Markup check: {len(rejected)} translations with broken markup rejected")
+            if glossary is not None:
+                with timed(batch_stats, "apply"):
+                    batch_misses = check_glossary(glossary, batch_entries, [po_path] * len(batch_entries), target_lang)
+                batch_stats["glossary_misses"] = len(batch_misses)
+                if batch_misses:
+                    print(f"    Glossary: {len(batch_misses)} translations miss expected terms")
+                    glossary_misses.extend(batch_misses)
+            if not complete:
+                save_response_debug(po_path, batch_num, target_lang, api_response)
+            if fail:
+                requeue_failed_entries(batch_entries, "partial" if success or rejected else "unparseable",
+                                       "Missing or invalid in response" if complete else "Response truncated",
+                                       rejected)
+            if memory is not None:
+                with timed(batch_stats, "save"):
+                    memory.store_entries(batch_entries, target_lang)
+                    if fuzzy_index is not None:
+                        # Later files of this process can reuse the new translations too
+                        fuzzy_index.add_entries(batch_entries)
+
+            if write_journal is not None:
+                with timed(batch_stats, "save"):
+                    write_journal.append(batch_entries)
+                if write_journal.checkpoint_due():
+                    # A checkpoint rewrites the PO file and recompiles it
+                    with timed(batch_stats, "compile"):
+                        write_journal.checkpoint(po_file, verbose=verbose)
+            else:
+                with timed(batch_stats, "save"):
+                    po_file.save(po_path)
+                print(f"    Saved updates to PO file: {po_path}")
+
+                with timed(batch_stats, "compile"):
+                    compile_po_to_mo(po_path, verbose=verbose, po_file=po_file)
+                save_response_debug(po_path, batch_num, target_lang, api_response)
+            record_batch(batch_num, batch_entries, batch_stats, success,
+                         None if complete else "truncated")
+            if sleep_secs:
+                time.sleep(sleep_secs)
+            top_up_window()
+
+    if write_journal is not None and write_journal.pending:
+        write_journal.checkpoint(po_file, verbose=verbose)
+    return dead_letters, glossary_misses
+
+
+# -------------------- Global Cross-File Batch Scheduler --------------------
+def translate_catalogs_global(
+    po_tasks: List[Tuple[str, str]],
+    max_workers: int,
+    batch_size: int = 10,
+    max_chars: int = None,
+    sleep_secs: float = 0.0,
+    dry_run: bool = False,
+    save_backup: bool = True,
+    verbose: bool = True,
+    tm_path: str = None,
+    max_input_tokens: int = 16000,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    tokenizer: str = "heuristic",
+    journal: bool = False,
+    checkpoint_secs: float = 60.0,
+    max_retries: int = 5,
+    rate_limiter: RateLimiter = None,
+    stream: bool = False,
+    max_entry_attempts: int = 3,
+    prompt_format: str = "compact",
+    metrics: MetricsRecorder = None,
+    client_options: Dict = None,
+    low_memory: bool = False,
+    glossary_path: str = None,
+    fuzzy_threshold: float = None,
+    mask_markup: bool = False,
+    client: "OpenAI" = None,
+    export_jobs: str = None,
+    inflight_batches: int = 1,
+    low_memory_window: int = LOW_MEMORY_WINDOW
+):
+    """
+    Translate many PO files at once: untranslated entries of every catalog are pooled per target
+    language, packed into full batches that may cross file boundaries and executed by a shared
+    thread pool. Each PO file is saved and compiled as soon as its last batch has landed.
+    With low_memory catalogs are streamed, so only their untranslated entries are held in memory.
+    With fuzzy_threshold, near-duplicates of strings translated in the memory or in catalogs loaded before
+    are filled without a request (see fill_fuzzy_matches).
+    With mask_markup, inline markup is sent as placeholders; broken markup is rejected and retried either way.
+    client is reused if given (watch mode), otherwise one is created from client_options.
+    With export_jobs, the batches are written to that bulk job file instead of being sent (see export_bulk_jobs).
+    inflight_batches and low_memory_window only apply to the per-file scheduler and are ignored here:
+    max_workers batches are in flight across all catalogs and a streamed catalog is read in one window.
+    """
+    memory = TranslationMemory(tm_path) if tm_path else None
+    glossary = load_glossary(glossary_path) if glossary_path else None
+    fuzzy_indexes = {}  # target_lang -> FuzzyIndex
+    journals = {}  # po_path -> WriteBackJournal (journal mode only)
+    try:
+        catalogs = {}  # po_path -> loaded POFile (or StreamingCatalog)
+        pending_by_lang = {}  # target_lang -> [(po_path, entry)]
+        loaded = []  # (po_path, lang, catalog, journal, untranslated entries) of catalogs with work left
+
+        for po_path, lang in po_tasks:
+            try:
+                po_file = load_catalog(po_path, low_memory)
+            except Exception as e:
+                print(f"  Error: Failed to load PO file {po_path}: {str(e)}")
+                continue
+
+            write_journal = None
+            if journal and not dry_run:
+                write_journal = journals[po_path] = WriteBackJournal(po_path, checkpoint_secs)
+                replayed = write_journal.replay(po_file)
+                if replayed:
+                    print(f"  Replayed {replayed} journaled translations from {write_journal.path}")
+
+            if low_memory:
+                untranslated_entries = next(po_file.untranslated_windows(), [])
+            else:
+                untranslated_entries = [entry for entry in po_file if (not entry.obsolete) and (not entry.translated())]
+            if untranslated_entries and save_backup and not dry_run:
+                backup_path = f"{po_path}.{lang}.bak"
+                if not os.path.exists(backup_path) or os.path.getmtime(po_path) > os.path.getmtime(backup_path):
+                    po_file.save(backup_path)
+
+            if memory is not None:
+                if not dry_run:
+                    memory.store_entries(po_file, lang, overwrite=False)
+                remaining_entries = memory.fill_entries(untranslated_entries, lang)
+                if metrics is not None and not dry_run:
+                    metrics.record("cache", lang=lang, po_path=po_path, misses=len(remaining_entries),
+                                   hits=len(untranslated_entries) - len(remaining_entries))
+                if len(remaining_entries) != len(untranslated_entries):
+                    if write_journal is not None:
+                        write_journal.append(untranslated_entries)
+                    elif not dry_run:
+                        po_file.save(po_path)
+                untranslated_entries = remaining_entries
+
+            if fuzzy_threshold:
+                # Every catalog is indexed before any is matched, so matches do not depend on the load order
+                if lang not in fuzzy_indexes:
+                    fuzzy_indexes[lang] = get_fuzzy_index(lang, memory)
+                fuzzy_indexes[lang].add_entries(po_file)
+            if untranslated_entries:
+                loaded.append((po_path, lang, po_file, write_journal, untranslated_entries))
+            elif write_journal is not None and write_journal.pending:
+                write_journal.checkpoint(po_file, verbose=verbose)
+            elif not dry_run:
+                compile_po_to_mo(po_path, verbose=verbose, po_file=po_file)
+
+        for po_path, lang, po_file, write_journal, untranslated_entries in loaded:
+            if fuzzy_threshold:
+                remaining_entries, adapted, marked = fill_fuzzy_matches(fuzzy_indexes[lang], untranslated_entries,
+                                                                        fuzzy_threshold)
+                if metrics is not None and not dry_run:
+                    metrics.record("fuzzy", lang=lang, po_path=po_path, adapted=adapted, marked=marked)
+                if adapted or marked:
+                    print(f"  {po_path}: {adapted} fuzzy matches adapted, {marked} marked fuzzy for review")
+                    remaining_ids = {id(entry) for entry in remaining_entries}
+                    reused_entries = [entry for entry in untranslated_entries if id(entry) not in remaining_ids]
+                    if memory is not None and not dry_run:
+                        memory.store_entries(reused_entries, lang)
+                    if write_journal is not None:
+                        write_journal.append(reused_entries)
+                    elif not dry_run:
+                        po_file.save(po_path)
+                untranslated_entries = remaining_entries
+
+            if not untranslated_entries:
+                if write_journal is not None and write_journal.pending:
+                    write_journal.checkpoint(po_file, verbose=verbose)
+                elif not dry_run:
+                    compile_po_to_mo(po_path, verbose=verbose, po_file=po_file)
+                continue
+
+            catalogs[po_path] = po_file
+            pending_by_lang.setdefault(lang, []).extend((po_path, entry) for entry in untranslated_entries)
+
+        # Pack entries of each language into batches regardless of which file they belong to
+        scheduled = []  # (target_lang, batch_num, entries, entry_po_paths)
+        remaining_batches = {}  # po_path -> number of batches still to land
+        entry_owner = {}  # id(entry) -> po_path
+        for lang, pending in pending_by_lang.items():
+            owners = {id(entry): po_path for po_path, entry in pending}
+            entry_owner.update(owners)
+            batches = chunk_entries(
+                [entry for _, entry in pending],
+                batch_size=batch_size,
+                max_chars=max_chars,
+                max_input_tokens=max_input_tokens,
+                max_output_tokens=max_output_tokens,
+                target_lang=lang,
+                entry_po_paths=[po_path for po_path, _ in pending],
+                tokenizer=tokenizer,
+                prompt_format=prompt_format,
+                glossary=glossary,
+                mask_markup=mask_markup
+            )
+            print(f"[Target Language: {lang}] {len(pending)} untranslated entries from "
+                  f"{len(set(owners.values()))} PO files → {len(batches)} batches")
+            for batch_num, batch_entries in enumerate(batches, start=1):
+                entry_po_paths = [owners[id(entry)] for entry in batch_entries]
+                for po_path in set(entry_po_paths):
+                    remaining_batches[po_path] = remaining_batches.get(po_path, 0) + 1
+                scheduled.append((lang, batch_num, batch_entries, entry_po_paths))
+
+        if export_jobs:
+            export_bulk_jobs(export_jobs, scheduled, prompt_format, glossary, mask_markup, max_output_tokens)
+            # The exported entries stay open; what memory and fuzzy matches filled in is written back now
+            for po_path, po_file in catalogs.items():
+                if po_path in journals:
+                    if journals[po_path].pending:
+                        journals[po_path].checkpoint(po_file, verbose=verbose)
+                elif not dry_run:
+                    compile_po_to_mo(po_path, verbose=verbose, po_file=po_file)
+            return
+
+        if not scheduled:
+            return
+
+        if dry_run:
+            for lang, batch_num, batch_entries, entry_po_paths in scheduled:
+                prompt = build_prompt_for_batch(batch_entries, entry_po_paths[0], lang, entry_po_paths=entry_po_paths,
+                                                prompt_format=prompt_format, glossary=glossary, mask_markup=mask_markup)
+                summary = prompt_token_summary(batch_entries, entry_po_paths[0], lang, 1, entry_po_paths,
+                                               prompt_format, tokenizer, glossary, mask_markup)
+                print(f"  [Dry-Run] {lang} Batch {batch_num}: {summary}")
+                print(f"  [Dry-Run] {lang} Batch {batch_num} Prompt Preview (first 1500 chars):\n{prompt[:1500]}...")
+            return
+
+        if client is None:
+            client = init_client(**(client_options or {}))
+
+        def run_batch(prompt: str, on_entry: Callable[[str, Any], None] = None, stats: Dict[str, Any] = None) -> str:
+            response = call_deepseek(client, prompt, max_retries=max_retries, max_tokens=max_output_tokens,
+                                     rate_limiter=rate_limiter, stream=stream, on_entry=on_entry, stats=stats)
+            if sleep_secs:
+                time.sleep(sleep_secs)
+            return response
+
+        print(f"Scheduling {len(scheduled)} batches on {max_workers} workers")
+        # Workers pull the next batch as soon as they are free; results are applied in the main thread
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+
+            def submit_batch(lang, batch_num, batch_entries, entry_po_paths):
+                batch_stats = {}
+                with timed(batch_stats, "prompt"):
+                    prompt = build_prompt_for_batch(batch_entries, entry_po_paths[0], lang, entry_po_paths=entry_po_paths,
+                                                    prompt_format=prompt_format, glossary=glossary,
+                                                    mask_markup=mask_markup)
+                streamed, on_entry = make_entry_collector(batch_entries, 1) if stream else (None, None)
+                future = executor.submit(run_batch, prompt, on_entry, batch_stats)
+                futures[future] = (lang, batch_num, batch_entries, entry_po_paths, batch_stats, streamed)
+
+            for batch in scheduled:
+                submit_batch(*batch)
+
+            attempts = {}  # id(entry) -> failed requests that included the entry
+            last_errors = {}
+            dead_letters = {}  # target_lang -> dead-letter records
+            glossary_misses = {}  # target_lang -> glossary report records
+
+            def requeue_failed_entries(lang, batch_entries, outcome, error, entry_errors=None):
+                """Schedule retries for the untranslated entries of a batch"""
+                retry_batches, dead_entries = plan_entry_retries(
+                    batch_entries, outcome, error, attempts, last_errors, max_entry_attempts, entry_errors
+                )
+                dead_letters.setdefault(lang, []).extend(
+                    dead_letter_record(entry, entry_owner[id(entry)], attempts, last_errors) for entry in dead_entries
+                )
+                for retry_entries in retry_batches:
+                    retry_batch = (lang, len(scheduled) + 1, retry_entries,
+                                   [entry_owner[id(entry)] for entry in retry_entries])
+                    scheduled.append(retry_batch)
+                    for po_path in set(retry_batch[3]):
+                        remaining_batches[po_path] += 1
+                    print(f"    Retrying {len(retry_entries)} failed entries as {lang} Batch {retry_batch[1]}")
+                    submit_batch(*retry_batch)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    lang, batch_num, batch_entries, entry_po_paths, batch_stats, streamed = futures.pop(future)
+                    debug_name = f"{lang}.global"
+                    parsed_translations = None
+                    success, error = 0, None
+                    try:
+                        api_response = future.result()
+                    except Exception as e:
+                        print(f"  Error: {lang} Batch {batch_num} API call failed: {str(e)}")
+                        requeue_failed_entries(lang, batch_entries, "api_error", f"API call failed: {str(e)}")
+                        error = "api_error"
+                    else:
+                        try:
+                            with timed(batch_stats, "parse"):
+                                parsed_translations, complete = parse_batch_response(api_response, streamed=streamed)
+                        except ValueError as e:
+                            print(f"  Error: {lang} Batch {batch_num} JSON parsing failed: {str(e)}")
+                            save_response_debug(debug_name, batch_num, lang, api_response)
+                            requeue_failed_entries(lang, batch_entries, "unparseable", f"JSON parsing failed: {str(e)}")
+                            error = "unparseable"
+
+                    if parsed_translations is not None:
+                        with timed(batch_stats, "apply"):
+                            success, fail = apply_translations_to_entries(batch_entries, parsed_translations)
+                            rejected = validate_batch_markup(batch_entries, mask_markup)
+                        if rejected:
+                            success, fail = success - len(rejected), fail + len(rejected)
+                            batch_stats["markup_rejected"] = len(rejected)
+                        print(f"  {lang} Batch {batch_num}: {success} successful, {fail} failed")
+                        if rejected:
+                            print(f"    Markup check: {len(rejected)} translations with broken markup rejected")
+                        if glossary is not None:
+                            with timed(batch_stats, "apply"):
+                                batch_misses = check_glossary(glossary, batch_entries, entry_po_paths, lang)
+                            batch_stats["glossary_misses"] = len(batch_misses)
+                            if batch_misses:
+                                print(f"    Glossary: {len(batch_misses)} translations miss expected terms")
+                                glossary_misses.setdefault(lang, []).extend(batch_misses)
+                        with timed(batch_stats, "save"):
+                            if memory is not None:
+                                memory.store_entries(batch_entries, lang)
+                            if journals:
+                                for po_path in set(entry_po_paths):
+                                    journals[po_path].append(
+                                        [entry for entry, owner in zip(batch_entries, entry_po_paths) if owner == po_path]
+                                    )
+                        if not journals or not complete:
+                            save_response_debug(debug_name, batch_num, lang, api_response)
+                        if not complete:
+                            error = "truncated"
+
+                        if fail:
+                            requeue_failed_entries(lang, batch_entries, "partial" if success or rejected else "unparseable",
+                                                   "Missing or invalid in response" if complete else "Response truncated",
+                                                   rejected)
+
+                    # Files whose last batch just landed (or whose checkpoint is due) are written here
+                    with timed(batch_stats, "compile"):
+                        for po_path in set(entry_po_paths):
+                            remaining_batches[po_path] -= 1
+                            if remaining_batches[po_path] == 0:
+                                if po_path in journals:
+                                    journals[po_path].checkpoint(catalogs[po_path], verbose=verbose)
+                                else:
+                                    catalogs[po_path].save(po_path)
+                                    print(f"    Saved updates to PO file: {po_path}")
+                                    compile_po_to_mo(po_path, verbose=verbose, po_file=catalogs[po_path])
+                            elif po_path in journals and journals[po_path].checkpoint_due():
+                                journals[po_path].checkpoint(catalogs[po_path], verbose=verbose)
+
+                    if metrics is not None:
+                        metrics.record_batch(lang, entry_po_paths[0], batch_num, len(batch_entries), batch_stats,
+                                             success, len(batch_entries) - success, error)
+
+        if isinstance(client, EndpointPool):
+            print(f"Endpoint pool: {client.summary()}")
+        for lang, records in dead_letters.items():
+            save_dead_letter_report("global", lang, records)
+        for lang, records in glossary_misses.items():
+            save_glossary_report("global", lang, records)
+    finally:
+        if memory is not None:
+            memory.close()
+        for write_journal in journals.values():
+            write_journal.close()
+
+
+# -------------------- Offline Bulk Jobs --------------------
+BULK_JOB_URL = "/v1/chat/completions"
+
+
+def bulk_job_index_path(jobs_path: str) -> str:
+    """Entry index written next to a bulk job file: jobs.jsonl -> jobs.index.jsonl"""
+    return os.path.splitext(jobs_path)[0] + ".index.jsonl"
+
+
+def bulk_job_id(target_lang: str, prompt: str, entry_po_paths: List[str]) -> str:
+    """Stable job ID: exporting the same batch again gives the same ID"""
+    digest = hashlib.sha256("\n".join([prompt] + entry_po_paths).encode("utf-8")).hexdigest()
+    return f"{target_lang}-{digest[:20]}"
+
+
+def _catalog_relpath(po_path: str) -> str:
+    """Path of a catalog below <locale-dir>/<lang>/LC_MESSAGES (unchanged if it is not in such a tree)"""
+    normalized = po_path.replace("\\", "/")
+    if "/LC_MESSAGES/" in normalized:
+        return normalized.split("/LC_MESSAGES/", 1)[1]
+    return po_path
+
+
+def export_bulk_jobs(jobs_path: str, scheduled: List[Tuple[str, int, List[polib.POEntry], List[str]]],
+                     prompt_format: str = "compact", glossary: Glossary = None, mask_markup: bool = False,
+                     max_output_tokens: int = MAX_OUTPUT_TOKENS, model: str = DEEPSEEK_MODEL,
+                     temperature: float = 0.0) -> int:
+    """
+    Write every scheduled batch (target_lang, batch_num, entries, entry_po_paths) as one request of an
+    OpenAI-compatible bulk job file: {"custom_id", "method", "url", "body"} per line, with the exact prompt
+    call_deepseek would send. The entries behind each custom_id go to the index file next to it
+    (see bulk_job_index_path), which ingest_bulk_results needs to apply the results. Returns the job count.
+    """
+    index_path = bulk_job_index_path(jobs_path)
+    os.makedirs(os.path.dirname(os.path.abspath(jobs_path)), exist_ok=True)
+    with open(jobs_path, "w", encoding="utf-8") as jobs, open(index_path, "w", encoding="utf-8") as index:
+        for lang, _, batch_entries, entry_po_paths in scheduled:
+            prompt = build_prompt_for_batch(batch_entries, entry_po_paths[0], lang, entry_po_paths=entry_po_paths,
+                                            prompt_format=prompt_format, glossary=glossary, mask_markup=mask_markup)
+            custom_id = bulk_job_id(lang, prompt, entry_po_paths)
+            jobs.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BULK_JOB_URL,
+                "body": {"model": model, "messages": [{"role": "user", "content": prompt}],
+                         "temperature": temperature, "max_tokens": max_output_tokens},
+            }, ensure_ascii=False) + "\n")
+            index.write(json.dumps({
+                "custom_id": custom_id,
+                "lang": lang,
+                "mask_markup": mask_markup,
+                "entries": [{"po_path": _catalog_relpath(po_path), "msgctxt": entry.msgctxt, "msgid": entry.msgid,
+                             "msgid_plural": entry.msgid_plural or None}
+                            for entry, po_path in zip(batch_entries, entry_po_paths)],
+            }, ensure_ascii=False) + "\n")
+    entry_count = sum(len(batch[2]) for batch in scheduled)
+    print(f"Exported {len(scheduled)} bulk jobs ({entry_count} entries) to {jobs_path}, entry index {index_path}")
+    return len(scheduled)
+
+
+def read_bulk_result(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    """
+    (custom_id, content, error) of one results line, either in the OpenAI batch output format
+    {"custom_id", "response": {"status_code", "body"}, "error"} or as {"custom_id", "content"} from a local runner
+    """
+    custom_id = record.get("custom_id")
+    if "content" in record:
+        return custom_id, record["content"], record.get("error")
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    if record.get("error") or response.get("status_code", 200) != 200:
+        error = record.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+        return custom_id, None, error if isinstance(error, str) else json.dumps(error, ensure_ascii=False)
+    choices = body.get("choices") or []
+    if not choices:
+        return custom_id, None, "No choices in response"
+    return custom_id, (choices[0].get("message") or {}).get("content"), None
+
+
+def ingest_bulk_results(results_path: str, index_path: str, locale_dir: str, tm_path: str = None,
+                        verbose: bool = True) -> Tuple[int, int]:
+    """
+    Apply a bulk job results file in one pass. Each result is parsed and applied to the entries its job
+    was exported with (parse_batch_response, apply_translations_to_entries, validate_batch_markup);
+    entries translated in the meantime or gone from their catalog are left alone. Every touched catalog
+    is saved and compiled once at the end. Returns (translated entries, entries still untranslated).
+    """
+    jobs = {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                job = json.loads(line)
+                jobs[job["custom_id"]] = job
+
+    catalogs = {}  # po_path -> (POFile, {(msgctxt, msgid): entry})
+    translated = {}  # po_path -> (target_lang, entries translated by this ingest)
+    failed = 0
+    unknown = 0
+    seen = set()
+
+    def find_entry(po_path: str, spec: Dict[str, Any]):
+        if po_path not in catalogs:
+            try:
+                po_file = polib.pofile(po_path, encoding="utf-8")
+            except (OSError, IOError, ValueError) as e:
+                print(f"  Warning: Cannot load {po_path}: {str(e)}")
+                po_file = None
+            lookup = {(entry.msgctxt, entry.msgid): entry for entry in (po_file or []) if not entry.obsolete}
+            catalogs[po_path] = (po_file, lookup)
+        return catalogs[po_path][1].get((spec["msgctxt"], spec["msgid"]))
+
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                custom_id, content, error = read_bulk_result(json.loads(line))
+            except (ValueError, AttributeError) as e:
+                print(f"  Warning: Skipping unreadable result on line {line_num}: {str(e)}")
+                continue
+            job = jobs.get(custom_id)
+            if job is None or custom_id in seen:
+                unknown += 1
+                continue
+            seen.add(custom_id)
+
+            # Stand-ins keep the entry numbering of the prompt for entries that are no longer open
+            entries, targets = [], []
+            for spec in job["entries"]:
+                po_path = os.path.join(locale_dir, job["lang"], "LC_MESSAGES", spec["po_path"])
+                entry = find_entry(po_path, spec)
+                if entry is None or entry.translated():
+                    entry = polib.POEntry(msgctxt=spec["msgctxt"], msgid=spec["msgid"],
+                                          msgid_plural=spec["msgid_plural"] or "")
+                else:
+                    targets.append((po_path, entry))
+                entries.append(entry)
+            if error or content is None:
+                print(f"  Error: Job {custom_id} failed: {error}")
+                failed += len(targets)
+                continue
+            try:
+                parsed, _ = parse_batch_response(content)
+            except ValueError as e:
+                print(f"  Error: Job {custom_id} JSON parsing failed: {str(e)}")
+                failed += len(targets)
+                continue
+            apply_translations_to_entries(entries, parsed)
+            rejected = validate_batch_markup(entries, job.get("mask_markup", False))
+            if rejected:
+                print(f"    Markup check: {len(rejected)} translations of job {custom_id} with broken markup rejected")
+            for po_path, entry in targets:
+                if entry.translated():
+                    translated.setdefault(po_path, (job["lang"], []))[1].append(entry)
+                else:
+                    failed += 1
+
+    memory = TranslationMemory(tm_path) if tm_path else None
+    try:
+        for po_path, (lang, entries) in translated.items():
+            po_file = catalogs[po_path][0]
+            po_file.save(po_path)
+            compile_po_to_mo(po_path, verbose=verbose, po_file=po_file)
+            if memory is not None:
+                memory.store_entries(entries, lang)
+    finally:
+        if memory is not None:
+            memory.close()
+
+    applied = sum(len(entries) for _, entries in translated.values())
+    print(f"Ingested {len(seen)} of {len(jobs)} jobs: {applied} entries translated in {len(translated)} PO files, "
+          f"{failed} left untranslated" + (f", {unknown} unknown or duplicate results skipped" if unknown else ""))
+    return applied, failed
 
 
 # -------------------- Batch Processing for Locale Directory --------------------
-def translate_locale_dir_batches(locale_dir: str, target_langs: List[str], max_workers: int = None, **kwargs):
-    """Batch process all PO files in parallel using multiprocessing"""
+def translate_locale_dir_batches(locale_dir: str, target_langs: List[str], max_workers: int = None,
+                                 tm_import: str = None, tm_export: str = None, tm_max_entries: int = None,
+                                 tm_max_age_days: float = None, scheduler: str = "global",
+                                 requests_per_minute: float = None, tokens_per_minute: float = None,
+                                 profile_dir: str = None, delta: bool = False, delta_manifest: str = None,
+                                 delta_pot_dir: str = None, delta_git_rev: str = None, client_options: Dict = None,
+                                 executor: str = "thread", po_paths: List[str] = None, client: "OpenAI" = None,
+                                 rate_limiter: RateLimiter = None, export_jobs: str = None, **kwargs):
+    """
+    Batch process all PO files in parallel, either with the global cross-file batch scheduler
+    or with one task per PO file ("per-file"), run by a thread pool or, with executor="process",
+    by a pool of spawned worker processes.
+    With a MetricsRecorder in kwargs['metrics'] an end-of-run summary is printed and recorded;
+    with profile_dir every worker process writes its cProfile stats there.
+    client_options (init_client() arguments) configure the one client each worker reuses.
+    In delta mode only catalogs that changed since the last complete pass recorded in the manifest
+    are loaded (see DeltaManifest); templates in delta_pot_dir and sources changed since the git
+    revision delta_git_rev are compared as well.
+    po_paths restricts the pass to those catalogs; client and rate_limiter are reused instead of created
+    when given (watch mode keeps both across passes).
+    With export_jobs the batches are written to that bulk job file instead of being sent, which needs
+    the global scheduler.
+    """
     if not os.path.exists(locale_dir):
         raise FileNotFoundError(f"Locale directory not found: {locale_dir}")
+    if export_jobs and scheduler != "global":
+        raise ValueError("Bulk job export needs the global scheduler")
+
+    tm_path = kwargs.get("tm_path")
+    if tm_path and (tm_import or tm_max_entries is not None or tm_max_age_days is not None):
+        memory = TranslationMemory(tm_path)
+        try:
+            if tm_import:
+                print(f"Imported {memory.import_jsonl(tm_import)} translation memory entries from {tm_import}")
+            removed = memory.evict(max_entries=tm_max_entries, max_age_days=tm_max_age_days)
+            if removed:
+                print(f"Evicted {removed} translation memory entries")
+        finally:
+            memory.close()
 
     max_workers = max_workers or multiprocessing.cpu_count()
     print(f"Using parallel processing with {max_workers} workers")
@@ -376,9 +3534,256 @@ def translate_locale_dir_batches(locale_dir: str, target_langs: List[str], max_w
                     # key modification: not passing client, will be initialized in subprocess
                     tasks.append((po_file_path, lang, kwargs))
 
-    if tasks:
-        with multiprocessing.Pool(processes=max_workers) as pool:
+    if po_paths is not None:
+        selected_paths = {os.path.abspath(po_path) for po_path in po_paths}
+        tasks = [task for task in tasks if os.path.abspath(task[0]) in selected_paths]
+
+    manifest = None
+    if delta and tasks:
+        manifest = DeltaManifest(delta_manifest or os.path.join(locale_dir, DELTA_MANIFEST_NAME))
+        changed_sources = git_changed_sources(os.path.dirname(os.path.abspath(locale_dir)), delta_git_rev) \
+            if delta_git_rev else None
+        selected = set(manifest.changed_catalogs([(po_path, lang) for po_path, lang, _ in tasks], locale_dir,
+                                                 pot_dir=delta_pot_dir, changed_sources=changed_sources))
+        print(f"Delta mode: {len(selected)} of {len(tasks)} catalogs changed since the last pass")
+        if len(selected) < len(tasks) and not kwargs.get("dry_run"):
+            # Unchanged catalogs are not loaded, but may still lack MO files (e.g. in a fresh checkout)
+            compile_locale_dir(locale_dir, sorted({lang for _, lang, _ in tasks}), max_workers=max_workers,
+                               verbose=kwargs.get("verbose", False))
+        tasks = [task for task in tasks if (task[0], task[1]) in selected]
+
+    # One limiter for the whole run, whichever scheduler executes the batches
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    run_start = time.perf_counter()
+    if tasks and scheduler == "global":
+        # Network calls run in worker threads; the profile covers the main thread that parses, applies and saves
+        profiler = cProfile.Profile() if profile_dir else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            translate_catalogs_global([(po_path, lang) for po_path, lang, _ in tasks], max_workers=max_workers,
+                                      rate_limiter=rate_limiter, client_options=client_options, client=client,
+                                      export_jobs=export_jobs, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                print(f"Profile written to {dump_profile(profiler, profile_dir, f'global-{os.getpid()}')}")
+    elif tasks and executor == "thread":
+        # Tasks mostly wait on the network: threads share this process's imports, client and rate limiter
+        if profile_dir:
+            print("Warning: --profile only covers worker processes, use --executor process to profile per-file runs")
+        init_pool_worker(rate_limiter, None, client_options)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(process_po_wrapper, tasks))
+        if isinstance(_WORKER_CLIENT, EndpointPool):
+            print(f"Endpoint pool: {_WORKER_CLIENT.summary()}")
+    elif tasks:
+        with MP_CONTEXT.Pool(processes=max_workers, initializer=init_pool_worker,
+                             initargs=(rate_limiter, profile_dir, client_options)) as pool:
             pool.map(process_po_wrapper, tasks)
+        if profile_dir:
+            print(f"Worker profiles written to {profile_dir}")
+
+    if manifest is not None and not kwargs.get("dry_run"):
+        # Only catalogs left without untranslated entries are recorded, the rest is retried next time
+        complete = 0
+        for po_path, _, _ in tasks:
+            try:
+                incomplete = any(not entry.obsolete and not entry.translated() for entry in iter_po_entries(po_path))
+            except Exception as e:
+                print(f"  Warning: Not recording {po_path} in the delta manifest: {str(e)}")
+                continue
+            if not incomplete:
+                manifest.record(po_path, locale_dir, delta_pot_dir)
+                complete += 1
+        manifest.save()
+        print(f"Delta manifest updated: {complete} of {len(tasks)} catalogs complete ({manifest.path})")
+
+    metrics = kwargs.get("metrics")
+    if metrics is not None and tasks and not kwargs.get("dry_run"):
+        summary = metrics.summarize(time.perf_counter() - run_start)
+        metrics.record("summary", **summary)
+        print_metrics_summary(summary)
+        print(f"  Metrics written to {metrics.path}")
+
+    if tm_path and tm_export:
+        export_translation_memory(tm_path, tm_export)
+
+
+def export_translation_memory(tm_path: str, tm_export: str):
+    """Write the translation memory at tm_path to the JSONL file tm_export"""
+    memory = TranslationMemory(tm_path)
+    try:
+        print(f"Exported {memory.export_jsonl(tm_export)} translation memory entries to {tm_export}")
+    finally:
+        memory.close()
+
+
+# -------------------- Watch (Daemon) Mode --------------------
+# Directories of the source tree that never hold documents
+WATCH_IGNORED_DIRS = ("build", "locale", "_static", "__pycache__")
+
+
+def _scan_files(root_dir: str, suffix: str, ignored_dirs: Tuple[str, ...] = ()) -> Dict[str, Tuple[int, int]]:
+    """(mtime_ns, size) of every file below root_dir whose name ends with suffix"""
+    found = {}
+    for root, dirs, files in os.walk(root_dir):
+        dirs[:] = [name for name in dirs if name not in ignored_dirs and not name.startswith(".")]
+        for file in files:
+            if file.endswith(suffix):
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # removed while scanning
+                found[path] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+
+class ChangeWatcher:
+    """
+    Polls the catalogs of the target languages (and optionally the .rst sources) for changes.
+    A poll only stats files, which takes milliseconds for the docs tree and works on every platform.
+    """
+
+    def __init__(self, locale_dir: str, target_langs: List[str], source_dir: str = None):
+        self.locale_dir = locale_dir
+        self.target_langs = target_langs
+        self.source_dir = source_dir
+        self.snapshot = self.scan()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        for lang in self.target_langs:
+            files.update(_scan_files(os.path.join(self.locale_dir, lang, "LC_MESSAGES"), ".po"))
+        if self.source_dir:
+            files.update(_scan_files(self.source_dir, ".rst", WATCH_IGNORED_DIRS))
+        return files
+
+    def poll(self) -> List[str]:
+        """Files created or modified since the previous poll"""
+        current = self.scan()
+        changed = [path for path, signature in current.items() if self.snapshot.get(path) != signature]
+        self.snapshot = current
+        return changed
+
+    def acknowledge(self, paths: List[str]):
+        """Adopt the current state of files this process wrote itself, so the next poll does not report them"""
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.snapshot.pop(path, None)
+                continue
+            self.snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+
+def wait_for_changes(watcher: ChangeWatcher, interval: float, debounce: float) -> List[str]:
+    """Block until files change, then until nothing changed for `debounce` seconds; returns all changed files"""
+    changed = set()
+    last_change = None
+    while True:
+        time.sleep(interval)
+        new_changes = watcher.poll()
+        if new_changes:
+            changed.update(new_changes)
+            last_change = time.monotonic()
+        elif changed and time.monotonic() - last_change >= debounce:
+            return sorted(changed)
+
+
+def update_catalogs_from_sources(source_dir: str, pot_dir: str, locale_dir: str, target_langs: List[str],
+                                 verbose: bool = False) -> bool:
+    """
+    Merge edited sources into the catalogs the way build_languange_version.sh does: re-extract the
+    templates with sphinx-build -b gettext (which only re-reads changed documents), then sphinx-intl update.
+    """
+    commands = [["sphinx-build", "-b", "gettext", "-q", source_dir, pot_dir]]
+    commands += [["sphinx-intl", "update", "-p", pot_dir, "-l", lang, "-d", locale_dir] for lang in target_langs]
+    for command in commands:
+        try:
+            result = subprocess.run(command, stdout=None if verbose else subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, universal_newlines=True)
+        except OSError as e:
+            print(f"  Warning: Cannot run {command[0]} ({str(e)}), source changes are not merged into the catalogs")
+            return False
+        if result.returncode != 0:
+            print(f"  Error: {' '.join(command)} failed with exit code {result.returncode}")
+            if result.stdout:
+                print(result.stdout[-2000:])
+            return False
+    return True
+
+
+def watch_locale_dir(locale_dir: str, target_langs: List[str], interval: float = 1.0, debounce: float = 2.0,
+                     source_dir: str = None, pot_dir: str = None, max_passes: int = None, **kwargs):
+    """
+    Watch mode: after a first full pass, translate and compile the catalogs of target_langs whenever
+    they change, until interrupted (or after max_passes passes). The client, rate limiter, glossary,
+    fuzzy index and parsed catalogs (see CatalogCache) stay in memory between passes, so a pass only
+    costs the work on the changed catalogs. With source_dir, edited .rst sources are merged into the
+    catalogs first (see update_catalogs_from_sources); the catalogs this rewrites are picked up as changes.
+    Bursts of edits are coalesced: a pass starts once nothing changed for `debounce` seconds.
+    The translation memory is imported and evicted by the first pass only and exported once on shutdown.
+    kwargs are the translate_locale_dir_batches() arguments.
+    """
+    global _CATALOG_CACHE
+    target_langs = [lang for lang in target_langs if lang.strip().lower() != "en"]
+    dry_run = kwargs.get("dry_run")
+    if not dry_run:
+        # A dry run fills entries from the translation memory without saving them, so it cannot reuse catalogs
+        _CATALOG_CACHE = CatalogCache()
+    client = init_client(**(kwargs.get("client_options") or {})) if not dry_run else None
+    rate_limiter = RateLimiter(kwargs.pop("requests_per_minute", None), kwargs.pop("tokens_per_minute", None))
+    tm_export = kwargs.pop("tm_export", None)
+    tm_maintenance = {key: kwargs.pop(key, None) for key in ("tm_import", "tm_max_entries", "tm_max_age_days")}
+
+    def run_pass(po_paths: List[str] = None, **pass_kwargs) -> bool:
+        try:
+            translate_locale_dir_batches(locale_dir, target_langs, po_paths=po_paths, client=client,
+                                         rate_limiter=rate_limiter, **kwargs, **pass_kwargs)
+            return True
+        except Exception as e:
+            print(f"  Error: Watch pass failed: {str(e)}")
+            if _CATALOG_CACHE is not None:
+                _CATALOG_CACHE.clear()
+            return False
+
+    run_pass(**tm_maintenance)
+    watcher = ChangeWatcher(locale_dir, target_langs, source_dir)
+    if _CATALOG_CACHE is not None:
+        _CATALOG_CACHE.mark_written(list(watcher.snapshot))
+    print(f"\n[Watch] Watching {locale_dir}" + (f" and the sources in {source_dir}" if source_dir else "") +
+          f" ({len(watcher.snapshot)} files, polled every {interval}s, Ctrl+C to stop)")
+
+    passes = 0
+    try:
+        while max_passes is None or passes < max_passes:
+            changed = wait_for_changes(watcher, interval, debounce)
+            start = time.perf_counter()
+            sources = [path for path in changed if path.endswith(".rst")]
+            catalogs = [path for path in changed if path.endswith(".po")]
+            if sources:
+                print(f"\n[Watch] {len(sources)} changed sources, updating catalogs from {pot_dir}")
+                update_catalogs_from_sources(source_dir, pot_dir, locale_dir, target_langs, kwargs.get("verbose"))
+            if catalogs:
+                print(f"\n[Watch] {len(catalogs)} changed catalogs: " +
+                      ", ".join(os.path.relpath(path, locale_dir) for path in catalogs[:5]) +
+                      (", ..." if len(catalogs) > 5 else ""))
+                run_pass(catalogs)
+                # What this pass wrote is not a change
+                if _CATALOG_CACHE is not None:
+                    _CATALOG_CACHE.mark_written(catalogs)
+                watcher.acknowledge(catalogs)
+                print(f"[Watch] Pass finished in {time.perf_counter() - start:.1f}s")
+            passes += 1
+    except KeyboardInterrupt:
+        print("\n[Watch] Stopped")
+    finally:
+        _CATALOG_CACHE = None
+        if kwargs.get("tm_path") and tm_export:
+            export_translation_memory(kwargs["tm_path"], tm_export)
 
 
 # -------------------- Command Line Interface & Main Function --------------------
@@ -391,10 +3796,128 @@ def parse_args():
                       help="Comma-separated list of target languages (e.g., 'en,zh_CN')")
     parser.add_argument('--batch-size', type=int, default=10, 
                       help="Maximum number of entries per API batch (default: 10)")
-    parser.add_argument('--max-chars', type=int, default=8000, 
-                      help="Maximum characters per batch (controls token usage, default: 8000)")
-    parser.add_argument('--sleep', type=float, default=1.0, 
-                      help="Seconds to sleep between batches (avoids rate limits, default: 1.0)")
+    parser.add_argument('--max-chars', type=int,
+                      help="Optional cap on source characters per batch (default: no cap, the token budgets "
+                           "apply; it was 8000 before batches were packed by tokens)")
+    parser.add_argument('--max-input-tokens', type=int, default=16000,
+                      help="Prompt token budget per batch, including instructions and entry framing (default: 16000)")
+    parser.add_argument('--max-output-tokens', type=int, default=MAX_OUTPUT_TOKENS,
+                      help=f"Completion token limit per batch; batches are packed to fit it (default: {MAX_OUTPUT_TOKENS})")
+    parser.add_argument('--tokenizer', default='heuristic',
+                      help="Tokenizer for batch packing: 'heuristic', 'tiktoken[:encoding]' or 'hf:<tokenizer.json>' "
+                           "(default: heuristic)")
+    parser.add_argument('--sleep', type=float, default=0.0,
+                      help="Extra fixed seconds to sleep after each batch (default: 0, pacing is done by the "
+                           "rate limiter; it was 1.0 before --rpm/--tpm)")
+    parser.add_argument('--prompt-format', choices=PROMPT_FORMATS, default='compact',
+                      help="'compact' sends a cache-friendly shared prefix and one line per entry; "
+                           "'legacy' the verbose per-entry layout (default: compact)")
+    parser.add_argument('--mask-markup', action='store_true',
+                      help="Send roles, literals, link targets and options as {N} placeholders instead of as they are "
+                           "(translations with broken markup are rejected and retried either way)")
+    parser.add_argument('--stream', action='store_true',
+                      help="Stream completions, keeping every entry that arrived complete when a response is cut off")
+    parser.add_argument('--max-entry-attempts', type=int, default=3,
+                      help="Requests per entry before it is written to the dead-letter report (default: 3)")
+    parser.add_argument('--rpm', type=float,
+                      help="Requests per minute allowed across all workers, per endpoint with --endpoints "
+                           "(default: unlimited, back off on 429 only)")
+    parser.add_argument('--tpm', type=float,
+                      help="Tokens per minute allowed across all workers, per endpoint with --endpoints "
+                           "(default: unlimited)")
+    parser.add_argument('--endpoints', metavar='ENDPOINTS_JSON',
+                      help="JSON list of OpenAI-compatible endpoints (base_url, api_key or api_key_env, weight, model, "
+                           "rpm, tpm) to balance requests over, with failover between them "
+                           "(default: the single DeepSeek endpoint)")
+    parser.add_argument('--max-retries', type=int, default=5,
+                      help="Attempts per API call before a batch is given up (default: 5)")
+    parser.add_argument('--scheduler', choices=['global', 'per-file'], default='global',
+                      help="'global' packs entries from all PO files into shared batches; "
+                           "'per-file' runs one worker per PO file, the only mode before (default: global)")
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                      help="Workers of --scheduler per-file: threads in this process, or spawned processes "
+                           "for CPU-heavy runs (default: thread)")
+    parser.add_argument('--inflight-batches', type=int, default=1,
+                      help="Number of batches kept in flight concurrently for each PO file "
+                           "with --scheduler per-file; the global scheduler keeps --max-workers batches "
+                           "in flight instead (default: 1)")
+    parser.add_argument('--http-pool-size', type=int,
+                      help="Maximum pooled keep-alive connections per worker client (default: SDK default)")
+    parser.add_argument('--http-keepalive-secs', type=float,
+                      help="Seconds an idle pooled connection is kept open (default: 5)")
+    parser.add_argument('--http2', action='store_true',
+                      help="Use HTTP/2 for API requests (needs the optional h2 package)")
+    parser.add_argument('--compile-only', action='store_true',
+                      help="Only refresh the .mo files of the target languages (in parallel, skipping unchanged catalogs)")
+    parser.add_argument('--journal', action='store_true',
+                      help="Record applied batches in an append-only journal and write .po/.mo files only on "
+                           "checkpoints and at the end (an interrupted run resumes from the journal)")
+    parser.add_argument('--checkpoint-secs', type=float, default=60.0,
+                      help="Seconds between PO/MO checkpoints in journal mode (default: 60)")
+    parser.add_argument('--low-memory', action='store_true',
+                      help="Stream PO files instead of loading them: only untranslated entries are kept in memory "
+                           "and saving rewrites just their msgstr lines (for very large catalogs)")
+    parser.add_argument('--low-memory-window', type=int, default=LOW_MEMORY_WINDOW,
+                      help="Untranslated entries read at a time per PO file with --low-memory and "
+                           f"--scheduler per-file (default: {LOW_MEMORY_WINDOW})")
+    parser.add_argument('--glossary',
+                      help="JSON glossary of technical terms; the terms occurring in a batch are listed in its prompt and "
+                           f"translations missing them are reported (default: <locale-dir>/{GLOSSARY_NAME} if present)")
+    parser.add_argument('--no-glossary', action='store_true',
+                      help="Do not use a glossary, even if <locale-dir> has one")
+    parser.add_argument('--fuzzy-threshold', type=float,
+                      help="Reuse the translation of a near-duplicate source string with at least this similarity "
+                           "(0-1, e.g. 0.85) instead of sending the entry: differing paths and literals are carried "
+                           "over, anything else is marked fuzzy for review (default: disabled)")
+    parser.add_argument('--tm-path',
+                      help="SQLite translation memory used to reuse earlier translations (default: disabled)")
+    parser.add_argument('--tm-import',
+                      help="JSONL file to import into the translation memory before translating")
+    parser.add_argument('--tm-export',
+                      help="JSONL file to export the translation memory to after translating")
+    parser.add_argument('--tm-max-entries', type=int,
+                      help="Keep at most this many translation memory entries (least recently used are evicted)")
+    parser.add_argument('--tm-max-age-days', type=float,
+                      help="Evict translation memory entries unused for this many days")
+    parser.add_argument('--delta', action='store_true',
+                      help="Only load and translate catalogs that changed since the last complete pass "
+                           f"(recorded in <locale-dir>/{DELTA_MANIFEST_NAME})")
+    parser.add_argument('--delta-manifest',
+                      help=f"Manifest file for --delta (default: <locale-dir>/{DELTA_MANIFEST_NAME})")
+    parser.add_argument('--delta-pot-dir',
+                      help="Gettext template directory (sphinx-build -b gettext output) compared against the manifest")
+    parser.add_argument('--delta-git-rev',
+                      help="Also treat catalogs of .rst/.md sources changed since this git revision as changed")
+    parser.add_argument('--watch', action='store_true',
+                      help="Keep running: translate and compile catalogs whenever they (or the .rst sources) change, "
+                           "keeping the client, caches and parsed catalogs in memory")
+    parser.add_argument('--watch-interval', type=float, default=1.0,
+                      help="Seconds between two polls for changes in watch mode (default: 1)")
+    parser.add_argument('--watch-debounce', type=float, default=2.0,
+                      help="Quiet seconds after the last change before a watch pass starts (default: 2)")
+    parser.add_argument('--watch-source-dir',
+                      help="Sphinx source directory whose .rst files are watched and merged into the catalogs "
+                           "(sphinx-build -b gettext + sphinx-intl update) (default: parent of --locale-dir)")
+    parser.add_argument('--no-watch-sources', action='store_true',
+                      help="Only watch the catalogs, not the .rst sources")
+    parser.add_argument('--export-jobs', metavar='JOBS_JSONL',
+                      help="Write every batch prompt to this OpenAI-compatible bulk job file (plus a .index.jsonl "
+                           "entry index next to it) instead of sending it")
+    parser.add_argument('--ingest-results', metavar='RESULTS_JSONL',
+                      help="Apply a bulk job results file to the catalogs and compile them, then exit")
+    parser.add_argument('--jobs-index',
+                      help="Entry index of the ingested jobs (default: the one next to --export-jobs)")
+    parser.add_argument('--metrics-path',
+                      help="Append per-batch metrics (phase timings, tokens, retries, cost) to this JSONL file "
+                           "and print a summary at the end of the run")
+    parser.add_argument('--price-input', type=float, default=PRICE_PER_M_INPUT_TOKENS,
+                      help=f"USD per million uncached input tokens for cost estimates (default: {PRICE_PER_M_INPUT_TOKENS})")
+    parser.add_argument('--price-cached-input', type=float, default=PRICE_PER_M_CACHED_INPUT_TOKENS,
+                      help=f"USD per million cached input tokens (default: {PRICE_PER_M_CACHED_INPUT_TOKENS})")
+    parser.add_argument('--price-output', type=float, default=PRICE_PER_M_OUTPUT_TOKENS,
+                      help=f"USD per million output tokens (default: {PRICE_PER_M_OUTPUT_TOKENS})")
+    parser.add_argument('--profile', metavar='DIR',
+                      help="Write cProfile stats of every worker process to DIR (view with `python -m pstats`)")
     parser.add_argument('--dry-run', action='store_true', 
                       help="Only print prompts (no API calls or file modifications)")
     parser.add_argument('--no-backup', dest='save_backup', action='store_false', 
@@ -413,20 +3936,115 @@ def main():
     if not target_langs:
         raise ValueError("No valid target languages provided. Check --target-langs argument.")
 
+    if args.compile_only:
+        langs = [lang for lang in target_langs if lang.lower() != "en"]
+        _, failed = compile_locale_dir(args.locale_dir, langs, max_workers=args.max_workers, verbose=args.verbose)
+        exit(1 if failed else 0)
+
+    if args.ingest_results:
+        index_path = args.jobs_index or (bulk_job_index_path(args.export_jobs) if args.export_jobs else None)
+        if not index_path:
+            raise ValueError("--ingest-results needs --jobs-index (or the --export-jobs file the results belong to)")
+        ingest_bulk_results(args.ingest_results, index_path, args.locale_dir, tm_path=args.tm_path,
+                            verbose=args.verbose)
+        exit(0)
+
+    # Fail before any catalog is touched instead of in every worker
+    needs_api = not (args.dry_run or args.export_jobs) and any(lang.lower() != "en" for lang in target_langs)
+    if needs_api and not args.endpoints and not os.environ.get("DEEPSEEK_API_KEY"):
+        print(f"Error: {API_KEY_MISSING}")
+        exit(1)
+
+    glossary_path = args.glossary
+    if glossary_path is None and os.path.exists(os.path.join(args.locale_dir, GLOSSARY_NAME)):
+        glossary_path = os.path.join(args.locale_dir, GLOSSARY_NAME)
+    if args.no_glossary:
+        glossary_path = None
+    elif glossary_path:
+        print(f"Using glossary {glossary_path} ({len(load_glossary(glossary_path).terms)} terms)")
+
     translation_kwargs = {
         'batch_size': args.batch_size,
         'max_chars': args.max_chars,
+        'max_input_tokens': args.max_input_tokens,
+        'max_output_tokens': args.max_output_tokens,
+        'tokenizer': args.tokenizer,
         'sleep_secs': args.sleep,
         'dry_run': args.dry_run,
         'save_backup': args.save_backup,
-        'verbose': args.verbose
+        'verbose': args.verbose,
+        'inflight_batches': args.inflight_batches,
+        'tm_path': args.tm_path,
+        'journal': args.journal,
+        'checkpoint_secs': args.checkpoint_secs,
+        'max_retries': args.max_retries,
+        'stream': args.stream,
+        'max_entry_attempts': args.max_entry_attempts,
+        'prompt_format': args.prompt_format,
+        'low_memory': args.low_memory,
+        'low_memory_window': args.low_memory_window,
+        'glossary_path': glossary_path,
+        'fuzzy_threshold': args.fuzzy_threshold,
+        'mask_markup': args.mask_markup
     }
+    client_options = {'pool_size': args.http_pool_size, 'keepalive_secs': args.http_keepalive_secs,
+                      'http2': args.http2}
+    requests_per_minute, tokens_per_minute = args.rpm, args.tpm
+    if args.endpoints:
+        # --rpm/--tpm become the limits of each endpoint instead of the whole run
+        client_options['endpoints'] = load_endpoint_specs(args.endpoints, args.rpm, args.tpm)
+        requests_per_minute = tokens_per_minute = None
+        print(f"Balancing requests over {len(client_options['endpoints'])} endpoints from {args.endpoints}")
+
+    scheduler = args.scheduler
+    if args.export_jobs:
+        translation_kwargs['export_jobs'] = args.export_jobs
+        if scheduler != "global":
+            print("Note: --export-jobs packs batches with the global scheduler")
+            scheduler = "global"
+    if scheduler == "global" and args.inflight_batches > 1:
+        print("Note: --inflight-batches only applies to --scheduler per-file, "
+              "the global scheduler keeps --max-workers batches in flight")
+    if scheduler == "global" and args.low_memory_window != LOW_MEMORY_WINDOW:
+        print("Note: --low-memory-window only applies to --scheduler per-file, "
+              "the global scheduler reads the untranslated entries of each catalog at once")
+    if args.metrics_path:
+        translation_kwargs['metrics'] = MetricsRecorder(
+            args.metrics_path, price_input=args.price_input, price_cached_input=args.price_cached_input,
+            price_output=args.price_output
+        )
+
+    if args.watch:
+        source_dir = None
+        if not args.no_watch_sources:
+            source_dir = args.watch_source_dir or os.path.dirname(os.path.abspath(args.locale_dir))
+        translation_kwargs.update(
+            interval=args.watch_interval,
+            debounce=args.watch_debounce,
+            source_dir=source_dir,
+            pot_dir=args.delta_pot_dir or (os.path.join(source_dir, "build", "gettext") if source_dir else None)
+        )
+    run = watch_locale_dir if args.watch else translate_locale_dir_batches
 
     try:
-        translate_locale_dir_batches(
+        run(
             locale_dir=args.locale_dir,
             target_langs=target_langs,
             max_workers=args.max_workers,
+            tm_import=args.tm_import,
+            tm_export=args.tm_export,
+            tm_max_entries=args.tm_max_entries,
+            tm_max_age_days=args.tm_max_age_days,
+            scheduler=scheduler,
+            executor=args.executor,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            profile_dir=args.profile,
+            delta=args.delta,
+            delta_manifest=args.delta_manifest,
+            delta_pot_dir=args.delta_pot_dir,
+            delta_git_rev=args.delta_git_rev,
+            client_options=client_options,
             **translation_kwargs
         )
     except Exception as e:
@@ -437,5 +4055,4 @@ def main():
 
 
 if __name__ == '__main__':
-    multiprocessing.set_start_method('spawn')  # For compatibility across platforms
     main()
\ No newline at end of file
@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import timeit
+import shutil
+import random
+import argparse
+import tempfile
+import resource
+import multiprocessing
+from collections import Counter
+from typing import Dict, List
+
+import polib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import translator
+from mock_translation_server import MockTranslationServer, mock_translate
+
+
+# -------------------- Synthetic Catalogs --------------------
+_WORDS = ["FPGA", "netlist", "bitstream", "routing", "channel", "switch", "block", "configuration", "timing",
+          "corner", "PDK", "fabric", "clock", "buffer", "tile", "architecture", "the", "of", "a", "is", "for",
+          "generate", "file", "option", "path", "module", "design", "verification", "layout", "pin"]
+# Shipped glossary, used for the glossary rows of the prompt size report and microbenchmarks
+DEFAULT_GLOSSARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locale", translator.GLOSSARY_NAME)
+_MARKUP = [":ref:`pdk_file`", "``arch.xml``", "**required**", ":doc:`/manual/index`", "`OpenFPGA <https://openfpga.org>`_"]
+
+
+def synthetic_msgid(rng: random.Random) -> str:
+    """Documentation-like sentence with occasional reStructuredText markup"""
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(4, 40))]
+    for _ in range(rng.randint(0, 2)):
+        words.insert(rng.randrange(len(words)), rng.choice(_MARKUP))
+    return " ".join(words).capitalize() + "."
+
+
+def make_synthetic_catalogs(locale_dir: str, lang: str, total_entries: int, entries_per_file: int = 200,
+                            seed: int = 0) -> List[str]:
+    """Write PO files totalling `total_entries` untranslated entries under locale_dir/lang/LC_MESSAGES"""
+    rng = random.Random(seed)
+    po_root_dir = os.path.join(locale_dir, lang, "LC_MESSAGES", "manual")
+    os.makedirs(po_root_dir, exist_ok=True)
+    po_paths = []
+    for file_index in range((total_entries + entries_per_file - 1) // entries_per_file):
+        po_file = polib.POFile()
+        po_file.metadata = {"Content-Type": "text/plain; charset=utf-8", "Language": lang}
+        count = min(entries_per_file, total_entries - file_index * entries_per_file)
+        for entry_index in range(count):
+            po_file.append(polib.POEntry(
+                msgid=f"{synthetic_msgid(rng)} [{file_index}.{entry_index}]",
+                msgstr="",
+                occurrences=[(f"../../manual/page_{file_index}.rst", str(entry_index + 1))]
+            ))
+        po_path = os.path.join(po_root_dir, f"page_{file_index}.po")
+        po_file.save(po_path)
+        po_paths.append(po_path)
+    return po_paths
+
+
+# -------------------- Pipeline Benchmark --------------------
+def _read_write_bytes() -> int:
+    """Bytes written by this process so far (Linux /proc), or -1 when unavailable"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return -1
+
+
+def _pipeline_child(work_dir: str, translation_kwargs: Dict, result_queue):
+    """Run one translation pass in a fresh process so peak RSS and I/O belong to this run only"""
+    os.chdir(work_dir)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    written_before = _read_write_bytes()
+    start = time.perf_counter()
+    translator.translate_locale_dir_batches(locale_dir=os.path.join(work_dir, "locale"), **translation_kwargs)
+    elapsed = time.perf_counter() - start
+    written_after = _read_write_bytes()
+
+    rss_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    result_queue.put({
+        "elapsed_secs": elapsed,
+        "bytes_written": written_after - written_before if written_before >= 0 else None,
+        "peak_rss_kb": max(rss_self, rss_children),
+    })
+
+
+def _sum_snapshots(servers: List[MockTranslationServer]) -> Dict[str, int]:
+    totals = Counter()
+    for server in servers:
+        totals.update(server.snapshot())
+    return totals
+
+
+def run_pipeline_benchmark(servers: List[MockTranslationServer], total_entries: int, lang: str = "zh_CN",
+                           entries_per_file: int = 200, **translation_kwargs) -> Dict:
+    """Translate a synthetic catalog against the mock servers and collect throughput figures"""
+    work_dir = tempfile.mkdtemp(prefix="translator_bench_")
+    try:
+        po_paths = make_synthetic_catalogs(os.path.join(work_dir, "locale"), lang, total_entries, entries_per_file)
+        stats_before = _sum_snapshots(servers)
+
+        ctx = multiprocessing.get_context("spawn")
+        result_queue = ctx.Queue()
+        translation_kwargs.setdefault("target_langs", [lang])
+        translation_kwargs.setdefault("verbose", False)
+        translation_kwargs.setdefault("save_backup", False)
+        child = ctx.Process(target=_pipeline_child, args=(work_dir, translation_kwargs, result_queue))
+        child.start()
+        result = result_queue.get()
+        child.join()
+
+        stats_after = _sum_snapshots(servers)
+        translated = sum(len(polib.pofile(po_path).translated_entries()) for po_path in po_paths)
+        result.update({
+            "entries": total_entries,
+            "files": len(po_paths),
+            "translated": translated,
+            "entries_per_sec": translated / result["elapsed_secs"] if result["elapsed_secs"] else 0.0,
+            "requests": stats_after["requests"] - stats_before["requests"],
+            "rate_limited": stats_after["rate_limited"] - stats_before["rate_limited"],
+            "server_errors": stats_after["errors"] - stats_before["errors"],
+        })
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# -------------------- Microbenchmarks --------------------
+def run_microbenchmarks(num_entries: int = 1000, repeat: int = 5) -> Dict[str, float]:
+    """Best-of-`repeat` seconds for the hot pure-Python stages of the pipeline"""
+    rng = random.Random(1)
+    entries = [polib.POEntry(msgid=synthetic_msgid(rng), occurrences=[("../../manual/page.rst", str(i))])
+               for i in range(num_entries)]
+    po_path = "locale/zh_CN/LC_MESSAGES/manual/page.po"
+    batch = entries[:40]
+    response = json.dumps({str(i + 1): {"translation": mock_translate(e.msgid)} for i, e in enumerate(batch)},
+                          ensure_ascii=False)
+    noisy_response = "Here you go:\n" + response + "\nLet me know if you need anything else."
+    parsed = translator.parse_json_from_response(response)
+
+    def best(func, number):
+        return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+    def apply():
+        for entry in batch:
+            entry.msgstr = ""
+        translator.apply_translations_to_entries(batch, parsed)
+
+    masked_parsed = {str(i + 1): {"translation": mock_translate(translator.mask_entry(e).msgid)}
+                     for i, e in enumerate(batch)}
+
+    def validate():
+        translator.apply_translations_to_entries(batch, masked_parsed)
+        translator.validate_batch_markup(batch, mask_markup=True)
+
+    results = {
+        f"chunk_entries[{num_entries}]": best(lambda: translator.chunk_entries(entries, batch_size=40, po_path=po_path), 3),
+        "build_prompt_for_batch[40]": best(lambda: translator.build_prompt_for_batch(batch, po_path, "zh_CN"), 50),
+        "parse_json_from_response[40]": best(lambda: translator.parse_json_from_response(response), 200),
+        "parse_json_from_response[40,noisy]": best(lambda: translator.parse_json_from_response(noisy_response), 200),
+        "apply_translations_to_entries[40]": best(apply, 200),
+        "mask_entry[40]": best(lambda: [translator.mask_entry(entry) for entry in batch], 200),
+        "validate_batch_markup[40,masked]": best(validate, 200),
+    }
+    if os.path.exists(DEFAULT_GLOSSARY):
+        glossary = translator.load_glossary(DEFAULT_GLOSSARY)
+        results["Glossary.terms_for_entries[40]"] = best(lambda: glossary.terms_for_entries(batch, "zh_CN"), 200)
+    return results
+
+
+# -------------------- Prompt Size Report --------------------
+def run_prompt_size_report(num_entries: int = 1000, batch_size: int = 40, lang: str = "zh_CN",
+                           tokenizer: str = "heuristic") -> Dict[str, Dict[str, float]]:
+    """
+    Input tokens per batch and per entry for every prompt layout, with and without the glossary and
+    markup masking, on a synthetic catalog
+    """
+    rng = random.Random(2)
+    po_path = os.path.join(os.getcwd(), "locale", lang, "LC_MESSAGES", "manual", "page.po")
+    entries = [polib.POEntry(msgid=synthetic_msgid(rng),
+                             occurrences=[(f"../../manual/page_{i // 200}.rst", str(i + 1))])
+               for i in range(num_entries)]
+    count_tokens = translator.get_tokenizer(tokenizer)
+    # Bytes every request of the language starts with, i.e. what a provider prefix cache can reuse
+    prefix_builders = {"compact": translator.build_compact_prompt_header, "legacy": translator.build_prompt_header}
+
+    glossary = translator.load_glossary(DEFAULT_GLOSSARY) if os.path.exists(DEFAULT_GLOSSARY) else None
+
+    report = {}
+    variants = [(prompt_format, None, False) for prompt_format in translator.PROMPT_FORMATS]
+    variants += [(prompt_format, None, True) for prompt_format in translator.PROMPT_FORMATS]
+    if glossary is not None:
+        variants += [(prompt_format, glossary, False) for prompt_format in translator.PROMPT_FORMATS]
+    for prompt_format, variant_glossary, mask_markup in variants:
+        batches = translator.chunk_entries(entries, batch_size=batch_size, po_path=po_path, target_lang=lang,
+                                           tokenizer=tokenizer, prompt_format=prompt_format, glossary=variant_glossary,
+                                           mask_markup=mask_markup)
+        tokens = [count_tokens(translator.build_prompt_for_batch(batch, po_path, lang, prompt_format=prompt_format,
+                                                                 glossary=variant_glossary, mask_markup=mask_markup))
+                  for batch in batches]
+        name = prompt_format + ("+glossary" if variant_glossary else "") + ("+mask" if mask_markup else "")
+        report[name] = {
+            "batches": len(batches),
+            "tokens_per_batch": sum(tokens) / len(tokens),
+            "tokens_per_entry": sum(tokens) / num_entries,
+            "shared_prefix_tokens": count_tokens(prefix_builders[prompt_format](lang, mask_markup)),
+        }
+    return report
+
+
+# -------------------- Command Line Interface & Main Function --------------------
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for translator.py against a mock server.")
+    parser.add_argument('--sizes', default="1000,10000",
+                        help="Comma-separated synthetic catalog sizes in entries (default: 1000,10000)")
+    parser.add_argument('--entries-per-file', type=int, default=200, help="Entries per synthetic PO file (default: 200)")
+    parser.add_argument('--scheduler', choices=['global', 'per-file'], default='global', help="Scheduler to benchmark")
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help="Workers of the per-file scheduler (default: thread)")
+    parser.add_argument('--low-memory', action='store_true', help="Benchmark streamed PO processing (--low-memory)")
+    parser.add_argument('--prompt-format', choices=translator.PROMPT_FORMATS, default='compact',
+                        help="Prompt layout used by the pipeline benchmark (default: compact)")
+    parser.add_argument('--glossary', action='store_true',
+                        help="Run the pipeline benchmark with the shipped glossary (prompt terms and checks)")
+    parser.add_argument('--fuzzy-threshold', type=float,
+                        help="Run the pipeline benchmark with fuzzy-match reuse at this similarity (--fuzzy-threshold)")
+    parser.add_argument('--mask-markup', action='store_true',
+                        help="Run the pipeline benchmark with reStructuredText markup sent as placeholders (--mask-markup)")
+    parser.add_argument('--max-workers', type=int, default=8, help="Parallel workers (default: 8)")
+    parser.add_argument('--batch-size', type=int, default=40, help="Maximum entries per batch (default: 40)")
+    parser.add_argument('--latency', type=float, default=0.2, help="Mock base latency in seconds (default: 0.2)")
+    parser.add_argument('--latency-per-entry', type=float, default=0.01, help="Mock latency per entry (default: 0.01)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Mock HTTP 500 rate")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Mock HTTP 429 rate")
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help="Mock truncated reply rate")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Mock malformed JSON rate")
+    parser.add_argument('--endpoints', type=int, default=0,
+                        help="Balance requests over this many mock servers as an endpoint pool (default: single endpoint)")
+    parser.add_argument('--rpm', type=float,
+                        help="Requests per minute of the run, or of each endpoint with --endpoints (default: unlimited)")
+    parser.add_argument('--skip-micro', action='store_true', help="Skip the microbenchmarks")
+    parser.add_argument('--json-out', help="Also write all results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {"pipeline": [], "micro": {}, "prompt": {}}
+
+    if not args.skip_micro:
+        print("Microbenchmarks (best of 5, seconds per call):")
+        results["micro"] = run_microbenchmarks()
+        for name, secs in results["micro"].items():
+            print(f"  {name:<40} {secs * 1000:10.3f} ms")
+
+    print("\nPrompt size (1000 synthetic entries, input tokens):")
+    results["prompt"] = run_prompt_size_report(batch_size=args.batch_size)
+    print(f"  {'layout':<18} {'batches':>8} {'per batch':>10} {'per entry':>10} {'shared prefix':>14}")
+    for prompt_format, row in results["prompt"].items():
+        print(f"  {prompt_format:<18} {row['batches']:>8} {row['tokens_per_batch']:>10.1f} "
+              f"{row['tokens_per_entry']:>10.1f} {row['shared_prefix_tokens']:>14}")
+
+    servers = []
+    for seed in range(max(1, args.endpoints)):
+        server = MockTranslationServer(
+            latency=args.latency, latency_per_entry=args.latency_per_entry, error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate, retry_after=0.5, truncate_rate=args.truncate_rate,
+            malformed_rate=args.malformed_rate, seed=seed
+        )
+        server.start_background()
+        servers.append(server)
+    os.environ["DEEPSEEK_BASE_URL"] = servers[0].base_url
+    os.environ["DEEPSEEK_API_KEY"] = "mock-key"
+    client_options, requests_per_minute = None, args.rpm
+    if args.endpoints:
+        # Same shape as translator.load_endpoint_specs(), one endpoint (and --rpm budget) per mock server
+        client_options = {"endpoints": [
+            {"name": f"mock-{position}", "base_url": server.base_url, "api_key": "mock-key", "model": None,
+             "weight": 1.0, "rate_limiter": translator.RateLimiter(args.rpm) if args.rpm else None}
+            for position, server in enumerate(servers, start=1)
+        ]}
+        requests_per_minute = None
+
+    executor = f", {args.executor} executor" if args.scheduler == "per-file" else ""
+    mocks = f"{len(servers)} mock endpoints" if args.endpoints else f"mock at {servers[0].base_url}"
+    print(f"\nPipeline benchmark ({args.scheduler} scheduler{executor}, {args.max_workers} workers, {mocks}):")
+    print(f"  {'entries':>8} {'files':>6} {'secs':>8} {'entries/s':>10} {'requests':>9} {'translated':>10} "
+          f"{'MB written':>10} {'peak RSS MB':>11}")
+    try:
+        for size in [int(size) for size in args.sizes.split(",") if size.strip()]:
+            result = run_pipeline_benchmark(
+                servers, size, entries_per_file=args.entries_per_file, scheduler=args.scheduler,
+                executor=args.executor, max_workers=args.max_workers, batch_size=args.batch_size,
+                prompt_format=args.prompt_format, low_memory=args.low_memory,
+                glossary_path=DEFAULT_GLOSSARY if args.glossary else None, fuzzy_threshold=args.fuzzy_threshold,
+                mask_markup=args.mask_markup, requests_per_minute=requests_per_minute, client_options=client_options
+            )
+            results["pipeline"].append(result)
+            written = f"{result['bytes_written'] / 1e6:10.2f}" if result["bytes_written"] is not None else f"{'n/a':>10}"
+            print(f"  {result['entries']:>8} {result['files']:>6} {result['elapsed_secs']:>8.2f} "
+                  f"{result['entries_per_sec']:>10.1f} {result['requests']:>9} {result['translated']:>10} "
+                  f"{written} {result['peak_rss_kb'] / 1024:>11.1f}")
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json_out}")
+
+
+if __name__ == '__main__':
+    main()
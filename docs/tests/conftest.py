@@ -0,0 +1,62 @@
+import os
+import sys
+
+import polib
+import pytest
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "source")
+# translator.py and mock_translation_server.py are scripts, not an installed package
+sys.path.insert(0, SOURCE_DIR)
+
+import translator  # noqa: E402
+from mock_translation_server import MockTranslationServer  # noqa: E402
+
+
+def make_po(path: str, entries, metadata=None) -> polib.POFile:
+    """Write a catalog holding entries (polib.POEntry objects or msgid strings) and return it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    po = polib.POFile()
+    po.metadata = metadata or {"Content-Type": "text/plain; charset=utf-8"}
+    for entry in entries:
+        po.append(entry if isinstance(entry, polib.POEntry) else polib.POEntry(msgid=entry))
+    po.save(path)
+    return po
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """Start a MockTranslationServer; call it with the fault rates and get its base URL exported"""
+    servers = []
+
+    def start(**options):
+        options.setdefault("latency", 0.0)
+        options.setdefault("jitter", 0.0)
+        options.setdefault("seed", 1)
+        server = MockTranslationServer(**options)
+        server.start_background()
+        servers.append(server)
+        monkeypatch.setenv("DEEPSEEK_BASE_URL", server.base_url)
+        monkeypatch.setenv("DEEPSEEK_API_KEY", "mock-key")
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Retry failed requests right away instead of after seconds of jittered backoff"""
+    monkeypatch.setattr(translator, "RETRY_BACKOFF_BASE_SECS", 0.001)
+    monkeypatch.setattr(translator, "RETRY_BACKOFF_CAP_SECS", 0.01)
+
+
+@pytest.fixture(autouse=True)
+def fresh_worker_state(monkeypatch):
+    """Drop the client and indexes cached by an earlier test; its client still points at a stopped server"""
+    monkeypatch.setattr(translator, "_WORKER_CLIENT", None)
+    monkeypatch.setattr(translator, "_WORKER_CLIENT_OPTIONS", {})
+    monkeypatch.setattr(translator, "_WORKER_RATE_LIMITER", None)
+    monkeypatch.setattr(translator, "_FUZZY_INDEXES", {})
+    monkeypatch.setattr(translator, "_CATALOG_CACHE", None)
@@ -0,0 +1,115 @@
+import polib
+
+from translator import build_prompt_for_batch, chunk_entries, estimate_tokens, plan_entry_retries
+
+
+def make_entries(count: int, words: int = 5):
+    return [polib.POEntry(msgid=" ".join(f"word{n}" for n in range(words)) + f" entry {pos}.",
+                          occurrences=[(f"page{pos // 3}.rst", str(pos))])
+            for pos in range(count)]
+
+
+# -------------------- chunk_entries --------------------
+def test_batch_size_caps_entries():
+    batches = chunk_entries(make_entries(25), batch_size=10)
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+
+def test_batches_keep_entry_order():
+    entries = make_entries(30)
+    batches = chunk_entries(entries, batch_size=7, max_input_tokens=300)
+    assert [entry for batch in batches for entry in batch] == entries
+
+
+def test_prompts_stay_within_the_input_budget():
+    entries = make_entries(60, words=20)
+    budget = 600
+    batches = chunk_entries(entries, batch_size=1000, max_input_tokens=budget, po_path="manual/page.po")
+    assert len(batches) > 1
+    for batch in batches:
+        assert estimate_tokens(build_prompt_for_batch(batch, "manual/page.po", "zh_CN")) <= budget
+
+
+def test_output_budget_splits_batches():
+    entries = make_entries(40, words=30)
+    unbounded = chunk_entries(entries, batch_size=1000, max_input_tokens=10 ** 6, max_output_tokens=10 ** 6)
+    bounded = chunk_entries(entries, batch_size=1000, max_input_tokens=10 ** 6, max_output_tokens=500)
+    assert len(unbounded) == 1
+    assert len(bounded) > 1
+
+
+def test_cjk_text_costs_more_than_its_length_suggests():
+    cjk = [polib.POEntry(msgid="中文文本" * 30) for _ in range(20)]
+    latin = [polib.POEntry(msgid="text" * 30) for _ in range(20)]
+    assert len(chunk_entries(cjk, batch_size=100, max_input_tokens=2000)) > \
+        len(chunk_entries(latin, batch_size=100, max_input_tokens=2000))
+
+
+def test_max_chars_is_an_extra_cap():
+    batches = chunk_entries(make_entries(10), batch_size=100, max_chars=80)
+    assert all(sum(len(entry.msgid) for entry in batch) <= 80 for batch in batches)
+
+
+def test_an_oversized_entry_still_gets_its_own_batch():
+    entries = make_entries(2) + [polib.POEntry(msgid="huge " * 5000)] + make_entries(2)
+    batches = chunk_entries(entries, batch_size=100, max_input_tokens=1000)
+    assert [entries[2]] in batches
+
+
+# -------------------- plan_entry_retries --------------------
+def test_unparseable_batch_is_bisected_without_charging_attempts():
+    entries = make_entries(5)
+    attempts, last_errors = {}, {}
+    retries, dead = plan_entry_retries(entries, "unparseable", "bad JSON", attempts, last_errors)
+    assert retries == [entries[:2], entries[2:]]
+    assert dead == []
+    assert attempts == {}
+    assert set(last_errors.values()) == {"bad JSON"}
+
+
+def test_partial_batch_resends_only_the_leftovers():
+    entries = make_entries(4)
+    entries[0].msgstr = entries[2].msgstr = "译文"
+    attempts = {}
+    retries, dead = plan_entry_retries(entries, "partial", "missing", attempts, {})
+    assert retries == [[entries[1], entries[3]]]
+    assert dead == []
+    assert attempts == {id(entries[1]): 1, id(entries[3]): 1}
+
+
+def test_single_unparseable_entry_is_charged():
+    entry = make_entries(1)
+    attempts = {}
+    retries, _ = plan_entry_retries(entry, "unparseable", "bad JSON", attempts, {})
+    assert retries == [entry]
+    assert attempts == {id(entry[0]): 1}
+
+
+def test_entries_out_of_attempts_are_dead_lettered():
+    entries = make_entries(2)
+    attempts, last_errors = {id(entries[0]): 2}, {}
+    retries, dead = plan_entry_retries(entries, "api_error", "timeout", attempts, last_errors, max_entry_attempts=3,
+                                       entry_errors={id(entries[0]): "Broken markup"})
+    assert dead == [entries[0]]
+    assert retries == [[entries[1]]]
+    assert last_errors == {id(entries[0]): "Broken markup", id(entries[1]): "timeout"}
+
+
+def test_repeated_bisection_isolates_a_poison_entry():
+    entries = make_entries(8)
+    poison = entries[5]
+    attempts, last_errors = {}, {}
+    queue, dead = [entries], []
+    while queue:
+        batch = queue.pop(0)
+        for entry in batch:
+            if entry is not poison:
+                entry.msgstr = "译文"
+        # The poison entry makes every batch holding it unparseable
+        outcome = "unparseable" if poison in batch else "partial"
+        retries, batch_dead = plan_entry_retries(batch, outcome, "bad JSON", attempts, last_errors)
+        queue.extend(retries)
+        dead.extend(batch_dead)
+    assert dead == [poison]
+    assert attempts == {id(poison): 3}
+    assert all(entry.translated() for entry in entries if entry is not poison)
@@ -0,0 +1,104 @@
+import os
+
+import polib
+import pytest
+
+import translator
+from conftest import make_po
+from mock_translation_server import mock_translate
+
+MSGIDS = [
+    "Use :ref:`pdk_file` and ``make all`` to build the bitstream.",
+    "Plain text without any markup.",
+    "Set ``--flag`` to ``1`` and see `QuickLogic <https://example.org/a>`_.",
+    "A **bold** word and *emphasis*.",
+    "Run the ``openfpga`` shell.",
+]
+FAULTS = {"error_rate": 0.1, "rate_limit_rate": 0.1, "retry_after": 0.01, "truncate_rate": 0.15, "malformed_rate": 0.1}
+# Process workers import a fresh translator module, so backoff cannot be shortened there
+PARSE_FAULTS = {"truncate_rate": 0.2, "malformed_rate": 0.15}
+
+
+def build_locale(root: str, langs=("zh_CN", "ja"), files=3, entries=12):
+    for lang in langs:
+        for name in range(files):
+            make_po(os.path.join(root, lang, "LC_MESSAGES", f"page{name}.po"),
+                    [f"{MSGIDS[pos % len(MSGIDS)]} [{name}.{pos}]" for pos in range(entries)])
+
+
+def assert_fully_translated(root: str, langs=("zh_CN", "ja")):
+    for lang in langs:
+        lc_dir = os.path.join(root, lang, "LC_MESSAGES")
+        for name in sorted(os.listdir(lc_dir)):
+            if not name.endswith(".po"):
+                continue
+            po_path = os.path.join(lc_dir, name)
+            for entry in polib.pofile(po_path):
+                assert entry.msgstr == mock_translate(entry.msgid), (po_path, entry.msgid)
+            assert os.path.exists(po_path[:-3] + ".mo")
+
+
+@pytest.mark.parametrize("scheduler, executor, options, faults", [
+    ("global", "thread", {}, FAULTS),
+    ("global", "thread", {"stream": True, "mask_markup": True, "journal": True, "checkpoint_secs": 0}, FAULTS),
+    ("per-file", "thread", {"inflight_batches": 3}, FAULTS),
+    ("per-file", "thread", {"stream": True, "mask_markup": True, "low_memory": True, "low_memory_window": 5}, FAULTS),
+    ("per-file", "process", {"mask_markup": True}, PARSE_FAULTS),
+], ids=["global", "global-stream-mask-journal", "per-file-thread", "per-file-thread-stream-lowmem", "per-file-process"])
+def test_translates_locale_dir_despite_faults(tmp_path, monkeypatch, mock_server, no_backoff,
+                                              scheduler, executor, options, faults):
+    monkeypatch.chdir(tmp_path)  # debug responses and reports are written below the working directory
+    server = mock_server(**faults)
+    build_locale("locale")
+    # A burst of injected faults may trip the circuit breaker; keep its pause short
+    rate_limiter = translator.RateLimiter(cooldown_secs=0.05)
+
+    translator.translate_locale_dir_batches("locale", ["zh_CN", "ja"], max_workers=2, scheduler=scheduler,
+                                            executor=executor, batch_size=4, save_backup=False, verbose=False,
+                                            max_retries=10, max_entry_attempts=10, tm_path="tm.sqlite",
+                                            rate_limiter=rate_limiter, **options)
+
+    assert_fully_translated("locale")
+    stats = server.snapshot()
+    assert stats["truncated"] + stats["malformed"] > 0
+    if scheduler == "global":
+        # 72 entries in batches of 4 need at least 18 requests; cross-file packing needs no more than that
+        assert stats["requests"] - sum(stats[key] for key in ("errors", "rate_limited", "truncated", "malformed")) \
+            <= 18 + stats["truncated"] + stats["malformed"]
+
+
+def test_second_run_is_served_from_the_translation_memory(tmp_path, monkeypatch, mock_server):
+    monkeypatch.chdir(tmp_path)
+    server = mock_server()
+    build_locale("locale", langs=("zh_CN",), files=2, entries=5)
+    translator.translate_locale_dir_batches("locale", ["zh_CN"], max_workers=1, save_backup=False, verbose=False,
+                                            tm_path="tm.sqlite")
+    requests = server.snapshot()["requests"]
+
+    build_locale("again", langs=("zh_CN",), files=2, entries=5)
+    translator.translate_locale_dir_batches("again", ["zh_CN"], max_workers=1, save_backup=False, verbose=False,
+                                            tm_path="tm.sqlite")
+    assert server.snapshot()["requests"] == requests
+    assert_fully_translated("again", langs=("zh_CN",))
+
+
+def test_dry_run_sends_and_writes_nothing(tmp_path, monkeypatch, mock_server):
+    monkeypatch.chdir(tmp_path)
+    server = mock_server()
+    build_locale("locale", langs=("zh_CN",), files=1, entries=5)
+    po_path = os.path.join("locale", "zh_CN", "LC_MESSAGES", "page0.po")
+    with open(po_path, "rb") as f:
+        before = f.read()
+
+    for scheduler in ("global", "per-file"):
+        translator.translate_locale_dir_batches("locale", ["zh_CN"], max_workers=1, scheduler=scheduler, dry_run=True,
+                                                save_backup=False, verbose=False, tm_path="tm.sqlite")
+
+    assert server.snapshot()["requests"] == 0
+    with open(po_path, "rb") as f:
+        assert f.read() == before
+    memory = translator.TranslationMemory("tm.sqlite")
+    try:
+        assert memory.conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0] == 0
+    finally:
+        memory.close()
@@ -0,0 +1,70 @@
+import polib
+import pytest
+
+from translator import mask_entry, markup_errors, validate_batch_markup
+
+SOURCE = "Use :ref:`pdk_file` and ``make all`` with `QuickLogic <https://x.org/a>`_, then ``make all`` again."
+
+
+def masked_translation(entry: polib.POEntry) -> str:
+    """What a model that keeps every placeholder would send back"""
+    return "译文 " + mask_entry(entry).msgid
+
+
+def test_mask_replaces_markup_with_shared_placeholders():
+    masked = mask_entry(polib.POEntry(msgid=SOURCE))
+    # The title of a hyperlink stays translatable, only its target is masked
+    assert masked.msgid == "Use {1} and {2} with `QuickLogic{3}, then {2} again."
+    assert masked.placeholders == {"{1}": ":ref:`pdk_file`", "{2}": "``make all``", "{3}": " <https://x.org/a>`_"}
+
+
+def test_text_that_already_has_placeholders_is_not_masked():
+    masked = mask_entry(polib.POEntry(msgid="Replace {1} with ``value``."))
+    assert masked.msgid == "Replace {1} with ``value``."
+    assert masked.placeholders == {}
+
+
+def test_round_trip_restores_the_markup():
+    entry = polib.POEntry(msgid=SOURCE)
+    entry.msgstr = masked_translation(entry)
+    assert validate_batch_markup([entry], mask_markup=True) == {}
+    assert entry.msgstr == "译文 " + SOURCE
+
+
+def test_round_trip_of_plural_entries():
+    entry = polib.POEntry(msgid="Run ``make``.", msgid_plural="Run ``make`` twice.")
+    entry.msgstr_plural = {0: "译 {1}。", 1: "译 {1} 两次。"}
+    assert validate_batch_markup([entry], mask_markup=True) == {}
+    assert entry.msgstr_plural == {0: "译 ``make``。", 1: "译 ``make`` 两次。"}
+
+
+@pytest.mark.parametrize("translation, error", [
+    ("译文 Use {1} with `QuickLogic{3}, then {2} again.", "missing ``make all``"),
+    ("译文 Use {1} and {2} and {2} with `QuickLogic{3}, then {2} again.", "unexpected ``make all``"),
+    ("译文 Use {1} and {2} with `QuickLogic{3}, then {2} again {4}.", "unexpected {4}"),
+])
+def test_lost_or_duplicated_markup_is_rejected(translation, error):
+    entry = polib.POEntry(msgid=SOURCE, msgstr=translation)
+    rejected = validate_batch_markup([entry], mask_markup=True)
+    assert error in rejected[id(entry)]
+    assert not entry.translated()
+
+
+def test_unbalanced_emphasis_is_rejected_without_masking():
+    assert markup_errors("A **bold** word.", "一个 **粗体 词。") == ["2 '*' instead of 4"]
+    entry = polib.POEntry(msgid="A **bold** word.", msgstr="一个 **粗体 词。")
+    assert id(entry) in validate_batch_markup([entry])
+    assert entry.msgstr == ""
+
+
+def test_untranslated_entries_get_their_markup_back_too():
+    entry = polib.POEntry(msgid=SOURCE, flags=["fuzzy"])
+    entry.msgstr = masked_translation(entry)
+    assert validate_batch_markup([entry], mask_markup=True) == {}
+    assert entry.msgstr == "译文 " + SOURCE
+
+
+def test_markup_next_to_cjk_text_is_escaped():
+    entry = polib.POEntry(msgid="Run ``make`` now.", msgstr="运行{1}命令。")
+    assert validate_batch_markup([entry], mask_markup=True) == {}
+    assert entry.msgstr == "运行\\ ``make``\\ 命令。"
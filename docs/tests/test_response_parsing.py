@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from translator import IncrementalEntryParser, parse_batch_response, salvage_json_entries
+
+RESPONSE = {
+    "1": {"translation": "带 {花括号} 和 \"引号\" 的文本"},
+    "2": {"translation": "反斜杠 \\ 与 } ] 符号"},
+    "3": {"translation": "复数", "plural": ["一个", "多个"]},
+}
+
+
+def feed_in_chunks(text: str, size: int, start_index: int = None):
+    parser = IncrementalEntryParser(start_index)
+    entries = []
+    for pos in range(0, len(text), size):
+        entries.extend(parser.feed(text[pos:pos + size]))
+    return entries
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1000])
+def test_chunked_feed_yields_every_entry_once(size):
+    text = json.dumps(RESPONSE, ensure_ascii=False)
+    assert feed_in_chunks(text, size) == list(RESPONSE.items())
+
+
+def test_braces_and_quotes_inside_strings_do_not_end_an_entry():
+    text = '{"1": {"translation": "a } b { c \\" ] ["}, "2": {"translation": "\\\\"}}'
+    assert dict(feed_in_chunks(text, 3)) == {"1": {"translation": 'a } b { c " ] ['}, "2": {"translation": "\\"}}
+
+
+def test_entries_are_reported_as_soon_as_they_are_complete():
+    parser = IncrementalEntryParser()
+    assert parser.feed('{"1": {"translation": "one"}, "2": {"trans') == [("1", {"translation": "one"})]
+    assert parser.feed('lation": "two"}') == [("2", {"translation": "two"})]
+    assert parser.feed("}") == []
+
+
+def test_top_level_array_is_keyed_from_start_index():
+    text = '[{"translation": "a"}, {"translation": "b"}]'
+    assert feed_in_chunks(text, 4, start_index=11) == [("11", {"translation": "a"}), ("12", {"translation": "b"})]
+
+
+def test_truncated_response_keeps_the_complete_entries():
+    text = json.dumps(RESPONSE, ensure_ascii=False)
+    cut = text[:text.index('"3"') + 20]
+    assert salvage_json_entries(cut) == {"1": RESPONSE["1"], "2": RESPONSE["2"]}
+
+    parsed, complete = parse_batch_response(cut)
+    assert not complete
+    assert parsed == {"1": RESPONSE["1"], "2": RESPONSE["2"]}
+
+
+def test_complete_response_with_surrounding_text():
+    parsed, complete = parse_batch_response("Here you go:\n" + json.dumps(RESPONSE) + "\nDone.")
+    assert complete
+    assert parsed == RESPONSE
+
+
+def test_unusable_response_raises_unless_streamed_entries_arrived():
+    with pytest.raises(ValueError):
+        parse_batch_response('{"1": {"transl')
+
+    streamed = {"1": {"translation": "one"}}
+    parsed, complete = parse_batch_response('{"1": {"transl', streamed=streamed)
+    assert not complete
+    assert parsed == streamed
+
+
+def test_streamed_entries_fill_in_what_the_final_text_lacks():
+    parsed, complete = parse_batch_response('{"2": {"translation": "two"}}', streamed={"1": {"translation": "one"},
+                                                                                     "2": {"translation": "old"}})
+    assert complete
+    assert parsed == {"1": {"translation": "one"}, "2": {"translation": "two"}}
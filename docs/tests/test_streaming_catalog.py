@@ -0,0 +1,86 @@
+import polib
+import pytest
+
+from conftest import make_po
+from translator import StreamingCatalog
+
+
+def sample_entries():
+    return [
+        polib.POEntry(msgid="Translated already.", msgstr="已翻译。", occurrences=[("index.rst", "3")]),
+        polib.POEntry(msgid="Plain untranslated text.", occurrences=[("index.rst", "5"), ("intro.rst", "1")],
+                      comment="Extracted comment", tcomment="Translator comment"),
+        polib.POEntry(msgid="Same text, other context.", msgctxt="button"),
+        polib.POEntry(msgid="One file", msgid_plural="%d files", msgstr_plural={0: "", 1: ""}),
+        polib.POEntry(msgid="Needs review.", msgstr="旧译文", flags=["fuzzy"], previous_msgid="Needs a review."),
+        polib.POEntry(msgid="A long paragraph " * 12 + "that polib wraps over several lines.",
+                      flags=["python-format"]),
+        polib.POEntry(msgid="Line one\nline two with \"quotes\" and a \\ backslash."),
+        polib.POEntry(msgid="Gone.", msgstr="没了。", obsolete=True),
+    ]
+
+
+def translate(entry):
+    if entry.msgid_plural:
+        entry.msgstr_plural = {0: "译 " + entry.msgid, 1: "译 " + entry.msgid_plural}
+    else:
+        entry.msgstr = "译 " + entry.msgid + (" 很长" * 20 if len(entry.msgid) > 100 else "")
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = str(tmp_path / "source.po")
+    make_po(path, sample_entries(), metadata={
+        "Project-Id-Version": "docs 1.0",
+        "Content-Type": "text/plain; charset=utf-8",
+        "Plural-Forms": "nplurals=1; plural=0;",
+    })
+    return path
+
+
+def polib_reference(catalog_path, tmp_path):
+    po = polib.pofile(catalog_path)
+    for entry in po:
+        if not entry.obsolete and not entry.translated():
+            translate(entry)
+    po_path, mo_path = str(tmp_path / "polib.po"), str(tmp_path / "polib.mo")
+    po.save(po_path)
+    po.save_as_mofile(mo_path)
+    return po_path, mo_path
+
+
+@pytest.mark.parametrize("window_size", [None, 1, 2])
+def test_save_and_mo_are_byte_identical_to_polib(catalog_path, tmp_path, window_size):
+    reference_po, reference_mo = polib_reference(catalog_path, tmp_path)
+
+    catalog = StreamingCatalog(catalog_path)
+    for window in catalog.untranslated_windows(window_size):
+        for entry in window:
+            translate(entry)
+    po_path, mo_path = str(tmp_path / "streamed.po"), str(tmp_path / "streamed.mo")
+    catalog.save(po_path)
+    catalog.save_as_mofile(mo_path)
+
+    with open(reference_po, "rb") as expected, open(po_path, "rb") as written:
+        assert written.read() == expected.read()
+    with open(reference_mo, "rb") as expected, open(mo_path, "rb") as written:
+        assert written.read() == expected.read()
+
+
+def test_in_place_save_keeps_untouched_lines(catalog_path, tmp_path):
+    reference_po, _ = polib_reference(catalog_path, tmp_path)
+
+    catalog = StreamingCatalog(catalog_path)
+    for window in catalog.untranslated_windows():
+        for entry in window:
+            translate(entry)
+    catalog.save()
+
+    with open(reference_po, "rb") as expected, open(catalog_path, "rb") as written:
+        assert written.read() == expected.read()
+    untranslated = [entry.msgid for entry in polib.pofile(catalog_path) if not entry.obsolete and not entry.translated()]
+    assert untranslated == ["Needs review."]
+
+
+def test_metadata_matches_polib(catalog_path):
+    assert StreamingCatalog(catalog_path).metadata == polib.pofile(catalog_path).metadata
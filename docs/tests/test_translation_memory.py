@@ -0,0 +1,98 @@
+import time
+
+import polib
+import pytest
+
+from translator import TranslationMemory
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm" / "memory.sqlite"))
+    yield memory
+    memory.close()
+
+
+def entry(msgid, msgstr="", **fields):
+    return polib.POEntry(msgid=msgid, msgstr=msgstr, **fields)
+
+
+def test_key_covers_everything_that_determines_a_translation():
+    base = TranslationMemory.make_key("Open", None, None, "zh_CN", "deepseek-chat")
+    assert base == TranslationMemory.make_key("Open", "", "", "zh_CN", "deepseek-chat")
+    assert len({
+        base,
+        TranslationMemory.make_key("Open", None, "menu", "zh_CN", "deepseek-chat"),
+        TranslationMemory.make_key("Open", "Opens", None, "zh_CN", "deepseek-chat"),
+        TranslationMemory.make_key("Open", None, None, "ja", "deepseek-chat"),
+        TranslationMemory.make_key("Open", None, None, "zh_CN", "other-model"),
+    }) == 5
+
+
+def test_fill_reuses_stored_translations_by_context_and_language(memory):
+    memory.store_entries([entry("Open", "打开"), entry("Open", "开放", msgctxt="state")], "zh_CN")
+
+    plain, in_context, other_lang = entry("Open"), entry("Open", msgctxt="state"), entry("Open")
+    assert memory.fill_entries([plain, in_context], "zh_CN") == []
+    assert (plain.msgstr, in_context.msgstr) == ("打开", "开放")
+    assert memory.fill_entries([other_lang], "ja") == [other_lang]
+    assert other_lang.msgstr == ""
+
+
+def test_untranslated_fuzzy_and_obsolete_entries_are_not_stored(memory):
+    memory.store_entries([entry("A"), entry("B", "乙", flags=["fuzzy"]), entry("C", "丙", obsolete=True)], "zh_CN")
+    assert memory.conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0] == 0
+
+
+def test_plural_entries_round_trip(memory):
+    stored = polib.POEntry(msgid="file", msgid_plural="files", msgstr_plural={"0": "个文件", "1": "多个文件"})
+    memory.store_entries([stored], "zh_CN")
+    wanted = polib.POEntry(msgid="file", msgid_plural="files", msgstr_plural={"0": "", "1": ""})
+    assert memory.fill_entries([wanted], "zh_CN") == []
+    assert wanted.msgstr_plural == {"0": "个文件", "1": "多个文件"}
+
+
+def test_overwrite_false_keeps_the_stored_translation(memory):
+    memory.store_entries([entry("Save", "保存")], "zh_CN")
+    memory.store_entries([entry("Save", "存储")], "zh_CN", overwrite=False)
+    filled = entry("Save")
+    memory.fill_entries([filled], "zh_CN")
+    assert filled.msgstr == "保存"
+
+
+def test_evict_drops_old_then_least_recently_used_entries(memory):
+    memory.store_entries([entry(f"msg {n}", f"译 {n}") for n in range(5)], "zh_CN")
+    now = time.time()
+    # msg 0 is 10 days old; the others were used in order, msg 4 last
+    memory.conn.executemany("UPDATE tm SET last_used = ? WHERE msgid = ?",
+                            [(now - 10 * 86400, "msg 0")] + [(now - 10 + n, f"msg {n}") for n in range(1, 5)])
+    memory.conn.commit()
+
+    assert memory.evict(max_age_days=1) == 1
+    assert memory.evict(max_entries=2) == 2
+    remaining = sorted(row[0] for row in memory.conn.execute("SELECT msgid FROM tm"))
+    assert remaining == ["msg 3", "msg 4"]
+
+
+def test_a_hit_refreshes_last_used(memory):
+    memory.store_entries([entry("old", "旧"), entry("new", "新")], "zh_CN")
+    memory.conn.execute("UPDATE tm SET last_used = 0")
+    memory.conn.commit()
+    memory.fill_entries([entry("old")], "zh_CN")
+    assert memory.evict(max_entries=1) == 1
+    assert [row[0] for row in memory.conn.execute("SELECT msgid FROM tm")] == ["old"]
+
+
+def test_export_and_import_round_trip(memory, tmp_path):
+    memory.store_entries([entry("Open", "打开"), entry("Close", "关闭", msgctxt="menu")], "zh_CN")
+    path = str(tmp_path / "export.jsonl")
+    assert memory.export_jsonl(path) == 2
+
+    copy = TranslationMemory(str(tmp_path / "copy.sqlite"))
+    try:
+        assert copy.import_jsonl(path) == 2
+        wanted = [entry("Open"), entry("Close", msgctxt="menu")]
+        assert copy.fill_entries(wanted, "zh_CN") == []
+        assert [e.msgstr for e in wanted] == ["打开", "关闭"]
+    finally:
+        copy.close()